@@ -7,7 +7,7 @@ if os.path.exists(README_PATH):
     with open(README_PATH) as readme:
         LONG_DESC = readme.read()
 
-INSTALL_REQUIRES = ["networkx", "matplotlib"]
+INSTALL_REQUIRES = ["networkx", "matplotlib", "numpy", "scipy"]
 PACKAGE_NAME = "pymanifold"
 PACKAGE_DIR = "src"
 
@@ -17,12 +17,19 @@ setup(
 
     package_dir={PACKAGE_NAME: "src"},
     packages=[PACKAGE_NAME],
+    # Fluid library, see fluids.py
+    package_data={PACKAGE_NAME: ["data/*.json"]},
 
     # This project requires matplotlib to show the designed microfluidic
     # circuit and dReal SMT solver, however it's Python3 support is still
     # experimental so you need to build it from source or use the docker image
     install_requires=INSTALL_REQUIRES,
 
+    # pymanifold command to solve a library of designs, see cli.py
+    entry_points={
+        "console_scripts": ["pymanifold = pymanifold.cli:main"],
+    },
+
     # metadata for upload to PyPI
     author="Josh Reid",
     author_email="js2reid@uwaterloo.ca",
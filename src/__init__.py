@@ -1 +1 @@
-from src.pymanifold import Schematic
+from .pymanifold import Schematic
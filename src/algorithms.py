@@ -1,12 +1,32 @@
 import math
-from dreal.symbolic import logical_and
+from dreal.symbolic import Variable, logical_and
+
+from . import paths
+
+# Attributes of nodes and channels that hold a dReal Variable for the solver
+# to find a value for, every other attribute is a plain value provided by the
+# user (or its default) so they can be copied and serialized freely
+NODE_VARIABLES = ('pressure', 'flow_rate', 'viscosity', 'density', 'x', 'y')
+CHANNEL_VARIABLES = ('length', 'width', 'height', 'depth', 'resolution',
+                     'flow_rate', 'droplet_volume', 'viscosity', 'resistance',
+                     'x_detector')
 
 
 def retrieve(dg, port_in, attr):
+    """Get an attribute of a node or channel, the dReal Variables of a
+    component are only created the first time they are retrieved so
+    schematics loaded from disk don't pay for Variables they never use
+    """
     if isinstance(port_in, tuple):
-        return dg.edges[port_in][attr]
+        attrs = dg.edges[port_in]
+        if attr not in attrs and attr in CHANNEL_VARIABLES:
+            attrs[attr] = Variable('_'.join([*port_in, attr]))
+        return attrs[attr]
     elif isinstance(port_in, str):
-        return dg.nodes[port_in][attr]
+        attrs = dg.nodes[port_in]
+        if attr not in attrs and attr in NODE_VARIABLES:
+            attrs[attr] = Variable(port_in + '_' + attr)
+        return attrs[attr]
     else:
         raise ValueError("Tried to retrieve node or edge type and name\
                 wasn't tuple or string")
@@ -45,9 +65,9 @@ def channels_in_straight_line(dg, node1_name, node2_name, node3_name):
             (retrieve(dg, node1_name, 'y') - retrieve(dg, node3_name, 'y'))) / 2 == 0)
 
 
-# TODO: In Manifold this has the option for worst case analysis, which is
-#       used to adjust the constraints in the case when there is no
-#       solution to try and still find a solution, should implement
+# In Manifold this has the option for worst case analysis, here that's done
+# by tolerance.worst_case which solves the schematic at the corners of the
+# parameter ranges where this and the resistance bound each constraint
 def simple_pressure_flow(dg, channel_name):
     """Assert difference in pressure at the two end nodes for a channel
     equals the flow rate in the channel times the channel resistance
@@ -99,6 +119,21 @@ def calculate_channel_resistance(dg, channel_name):
             ((12 * (mu * chL)) / (w * ((h ** 3) * (1 - (0.63 * (h / w)))))))
 
 
+def channel_resistance_terms(dg, channel_name):
+    """The resistance of calculate_channel_resistance as a numerator and
+    denominator without any divisions, the w in the denominator is
+    multiplied through to give R = (12 * mu * L) / (h^3 * (w - 0.630 h))
+
+    :param str channel_name: Name of the channel
+    :returns: tuple -- numerator and denominator SMT expressions
+    """
+    w = retrieve(dg, channel_name, 'width')
+    h = retrieve(dg, channel_name, 'height')
+    mu = retrieve(dg, channel_name, 'viscosity')
+    chL = retrieve(dg, channel_name, 'length')
+    return (12 * (mu * chL)), ((h ** 3) * (w - (0.63 * h)))
+
+
 def pythagorean_length(dg, channel_name):
     """Use Pythagorean theorem to assert that the channel length
     (hypoteneuse) squared is equal to the legs squared so channel
@@ -139,7 +174,7 @@ def cosine_law_crit_angle(dg, node1_name, node2_name, node3_name):
     return (a_dot_b_squared / a_squared_b_squared)
 
 
-def calculate_droplet_volume(dg, h, w, wIn, epsilon, qD, qC):
+def calculate_droplet_volume(dg, h, w, wIn, epsilon, qD, qC, radicals=None, nonzero=False):
     """From paper DOI:10.1039/c002625e.
     Calculating the droplet volume created in a T-junction
     Unit is volume in m^3
@@ -151,22 +186,30 @@ def calculate_droplet_volume(dg, h, w, wIn, epsilon, qD, qC):
                            channels join
     :param Variable qD: Flow rate in dispersed_channel
     :param Variable qC: Flow rate in continuous_channel
+    :param Radicals radicals: Replaces the square root when normalizing
+    :param bool nonzero: True if the constraints already created prove h, w
+        and qC are positive, then radicals also replaces the divisions
     """
+    sqrt = radicals.sqrt if radicals else (lambda x: x ** 0.5)
+    divide = radicals.divide if radicals else (lambda n, d, nonzero: n / d)
     q_gutter = 0.1
     # normalizedVFill = 3pi/8 - (pi/2)(1 - pi/4)(h/w)
-    v_fill_simple = (3 * (math.pi) / 8) - (math.pi / 2) * (1 - math.pi / 4) * (h / w)
+    h_w = divide(h, w, nonzero)
+    v_fill_simple = (3 * (math.pi) / 8) - (math.pi / 2) * (1 - math.pi / 4) * h_w
 
-    hw_parallel = ((h * w) / (h + w))
+    hw_parallel = divide(h * w, h + w, nonzero)
 
     # r_pinch = w+((wIn-(hw_parallel - eps))+sqrt(2*((wIn-hw_parallel)*(w-hw_parallel))))
     r_pinch = w + ((wIn - (hw_parallel - epsilon)) +
-                   (2 * ((wIn - hw_parallel) * (w - hw_parallel))) ** 0.5)
+                   sqrt(2 * ((wIn - hw_parallel) * (w - hw_parallel))))
     r_fill = w
+    pinch_w = divide(r_pinch, w, nonzero)
+    fill_w = divide(r_fill, w, nonzero)
     alpha = (1 - (math.pi / 4)) * (((1 - q_gutter) ** -1) *
-                                   ((((r_pinch / w) ** 2) - ((r_fill / w) ** 2)) +
-                                    ((math.pi / 4) * (r_pinch / w) - (r_fill / w)) * (h / w)))
+                                   (((pinch_w ** 2) - (fill_w ** 2)) +
+                                    ((math.pi / 4) * pinch_w - fill_w) * h_w))
 
-    return ((h * (w * w)) * (v_fill_simple + (alpha * (qD / qC))))
+    return ((h * (w * w)) * (v_fill_simple + (alpha * divide(qD, qC, nonzero))))
 
 
 def calculate_port_flow_rate(dg, port_name):
@@ -201,7 +244,9 @@ def calculate_port_flow_rate(dg, port_name):
 
 
 def find_path(dg, start_node, end_node):
-	""" Find a path between two nodes in the directed graph
+	""" Find the shortest path between two nodes in the graph, the direction of
+	the channels is ignored so a path against the flow is found as well, see
+	paths.PathService
 
 	:param str start_node: name of node from which path should start
 	:param str end_node: name of node where path should end
@@ -210,23 +255,10 @@ def find_path(dg, start_node, end_node):
 
              ** returns None if no path is found
 	"""
-	path = [];
-	path = path + [start_node]
-
-	if start_node == end_node:
-		return path
-
-	else:
-		successor_nodes = list((dg.successors(start_node))) #successor_nodes = dict(dg[start_node]).keys();
-		#print(successor_nodes)
-		for node in successor_nodes:
-			if node not in path:
-				extended_path = find_path(dg, node, end_node)
-
-			if extended_path:
-				path = path + extended_path
-				return path
-	return None
+	try:
+		return paths.service(dg).path(start_node, end_node)
+	except ValueError:
+		return None
 
 
 def calculate_electric_field(dg, anode_node_name, cathode_node_name):
@@ -239,15 +271,27 @@ def calculate_electric_field(dg, anode_node_name, cathode_node_name):
 	:param str anode_node_name: Name of the node with the higher voltage
 	:param str cathode_node_name: Name of the node with the lower voltage
 	:returns: strength of the electric field between the two nodes
+	:raises: ValueError if the nodes aren't connected
+	"""
+	delta_voltage, length = electric_field_terms(dg, anode_node_name, cathode_node_name)
+	return (delta_voltage / length)
+
+
+def electric_field_terms(dg, anode_node_name, cathode_node_name):
+	"""The voltage difference and the length of the path between 2 nodes,
+	the electric field of calculate_electric_field is their ratio
+
+	:param str anode_node_name: Name of the node with the higher voltage
+	:param str cathode_node_name: Name of the node with the lower voltage
+	:returns: tuple -- voltage difference and SMT expression for the length
+	:raises: ValueError if the nodes aren't connected
 	"""
 	voltage_1 = retrieve(dg, cathode_node_name, 'voltage')
 	voltage_2 = retrieve(dg, anode_node_name, 'voltage')
 	delta_voltage = voltage_2 - voltage_1
 
 	# find path between the 2 nodes (there should only be 1 possible path)
-	channel_path = dg.edges( find_path(dg, cathode_node_name, anode_node_name) )
-	if channel_path is None:
-		raise ValueError("No path found between %s and %s" %(cathode_node_name, anode_node_name))
+	channel_path = paths.service(dg).channels(cathode_node_name, anode_node_name)
 
 	# add check to make sure the path is a straight line?
 
@@ -256,7 +300,7 @@ def calculate_electric_field(dg, anode_node_name, cathode_node_name):
 	for edge in channel_path:
 		length = length + retrieve(dg, edge, 'length')
 
-	return (delta_voltage / length)
+	return delta_voltage, length
 
 
 def calculate_mobility(dg, channel_name, q, r):
@@ -330,7 +374,7 @@ def erf_approximation(x):
 
     return (1 - (1 + a1*x + a2*x**2 + a3*x**3 + a4*x**4)**(-4) )
 
-def calculate_concentration(dg, C0, D, W, v, x, t):
+def calculate_concentration(dg, C0, D, W, v, x, t, radicals=None):
     """Calculate the concentration of a sample at time t (since being injected)
     and at position x in the channel.
     This is the equation for  rectangular channel, and assumes the sample is
@@ -342,10 +386,12 @@ def calculate_concentration(dg, C0, D, W, v, x, t):
     :param Variable v: velocity of particles in sample, moving in the (separation) channel
     :param Variable x: coordinate in channel (m)
     :param Variable? t: time since injection (s)
+    :param Radicals radicals: Replaces the square root when normalizing
     :returns: concentration
     """
 
     # note the square root(will hopefully work with SMT solver)
-    return C0/2.0 * ( erf_approximation( (W - x + v*t)/(2*(D*t)**(0.5)) ) +
-                      erf_approximation( (W + x - v*t)/(2*(D*t)**(0.5)) )
+    spread = 2*(radicals.sqrt(D*t) if radicals else (D*t)**(0.5))
+    return C0/2.0 * ( erf_approximation( (W - x + v*t)/spread ) +
+                      erf_approximation( (W + x - v*t)/spread )
                  )
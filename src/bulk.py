@@ -0,0 +1,355 @@
+from numbers import Real
+
+import numpy as np
+
+from . import fluids
+
+
+def column_table(data, required, optional):
+    """Read the columns of a bulk insert from a dict of lists or NumPy arrays
+    or a pandas DataFrame, filling in missing optional columns with defaults
+
+    :param data: Mapping of column name to the values of that column
+    :param tuple required: Columns that must be provided
+    :param dict optional: Default value of each optional column
+    :returns: tuple -- number of rows and dict of column name to NumPy array
+    :raises: ValueError if a required column is missing or the columns
+             have different lengths
+    """
+    provided = set(data.keys())
+    missing = [key for key in required if key not in provided]
+    if missing:
+        raise ValueError("Missing required columns %s" % missing)
+    unknown = provided - set(required) - set(optional)
+    if unknown:
+        raise ValueError("Unknown columns %s" % sorted(unknown))
+
+    columns = {}
+    for key in provided:
+        column = np.asarray(data[key])
+        # NumPy turns lists of mixed types into strings, False among numbers
+        # into 0 and lists of lists into 2D arrays, keep the original values
+        # of each row instead
+        listed = not isinstance(data[key], np.ndarray)
+        if (listed and column.dtype.kind in 'US') or column.ndim != 1 or \
+                (listed and column.dtype.kind in 'iuf' and
+                 any(isinstance(value, bool) for value in data[key])):
+            column = np.empty(len(data[key]), dtype=object)
+            for row, value in enumerate(data[key]):
+                column[row] = value
+        columns[key] = column
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("All columns must have the same length")
+    n = lengths.pop() if lengths else 0
+    for key, default in optional.items():
+        if key not in columns:
+            # False marks a parameter the user didn't define
+            columns[key] = np.full(n, np.nan if default is False else default)
+    return n, columns
+
+
+def number_column(column):
+    """Convert a column of user provided numbers to floats where False, None
+    and NaN mean the user didn't define a value
+
+    :param column: NumPy array of the values
+    :returns: tuple -- float array with NaN where unset, and a bool array that
+              is True where the value is not a number
+    """
+    if column.dtype.kind in 'iuf':
+        return column.astype(float), np.zeros(len(column), dtype=bool)
+    numbers = np.full(len(column), np.nan)
+    wrong_type = np.zeros(len(column), dtype=bool)
+    for idx, value in enumerate(column.tolist()):
+        if value is None or value is False:
+            continue
+        # NumPy scalars such as np.int64 are numbers too
+        if isinstance(value, Real):
+            numbers[idx] = value
+        else:
+            wrong_type[idx] = True
+    return numbers, wrong_type
+
+
+def string_column(column):
+    """Returns a bool array that is True where the value is not a string
+    """
+    if column.dtype.kind == 'U':
+        return np.zeros(len(column), dtype=bool)
+    return np.array([not isinstance(value, str) for value in column.tolist()], dtype=bool)
+
+
+class _Errors():
+    """Collects the problems found for each row of a bulk insert
+    """
+
+    def __init__(self, n):
+        self.bad = np.zeros(n, dtype=bool)
+        self.messages = []
+
+    def flag(self, mask, message, names):
+        """Record message for every row where mask is True, message is
+        formatted with the name of the component in that row
+        """
+        for row in np.flatnonzero(mask):
+            self.messages.append((int(row), message % (names[row],)))
+        self.bad |= mask
+
+    def report(self):
+        return sorted(self.messages)
+
+
+def _check_numbers(errors, columns, names, component, signs):
+    """Validate the numeric columns, equivalent to Schematic.validate_params,
+    columns with a numeric dtype are checked as whole arrays while columns of
+    mixed values are checked row by row
+
+    :returns: dict -- column name to float array, NaN where unset
+    """
+    numbers = {}
+    for key, sign in signs.items():
+        values, wrong_type = number_column(columns[key])
+        errors.flag(wrong_type, "%s '%%s' parameter '%s' must be int or float" %
+                    (component, key), names)
+        if sign == 'positive number':
+            errors.flag(values < 0, "%s '%%s' parameter '%s' must be >= 0" %
+                        (component, key), names)
+        numbers[key] = values
+    return numbers
+
+
+def _check_lists(errors, columns, names, component, keys):
+    """Validate columns where each value is False or a list of numbers
+    """
+    for key in keys:
+        wrong_type = np.array([value is not False and value is not None and
+                               not (isinstance(value, (list, tuple)) and
+                                    all(isinstance(item, Real) for item in value))
+                               for value in columns[key].tolist()], dtype=bool)
+        errors.flag(wrong_type, "%s '%%s' %s must be a list of numbers" % (component, key), names)
+
+
+def _check_names(errors, sch, names, component):
+    """Names must be strings that aren't already used by the schematic or
+    earlier rows of the same insert
+    """
+    errors.flag(string_column(names), "%s '%%s' name must be a string" % component, names)
+    seen = set(sch.dg.nodes)
+    duplicate = np.zeros(len(names), dtype=bool)
+    for row, name in enumerate(names.tolist()):
+        if name in seen:
+            duplicate[row] = True
+        seen.add(name)
+    errors.flag(duplicate, "%s '%%s' must have a unique name" % component, names)
+
+
+def _check_kinds(errors, sch, kinds, names, component):
+    valid = {strat[len('translate_'):] for strat in sch.translation_strats
+             if strat.startswith('translate_')}
+    wrong_type = string_column(kinds)
+    errors.flag(wrong_type, "%s '%%s' kind must be a string" % component, names)
+    unknown = np.array([not wrong and kind.lower() not in valid
+                        for kind, wrong in zip(kinds.tolist(), wrong_type)], dtype=bool)
+    errors.flag(unknown, "%s '%%s' kind must be either %s" % (component, sorted(valid)), names)
+
+
+def _values(numbers, unset):
+    """Convert a number column back to the values stored in the graph, unset
+    values are stored the same way as the single insert methods
+
+    :param numbers: Float array with NaN where unset
+    :param unset: Value stored where the user didn't define one, a single
+        value or an array of one per row
+    :returns: list -- Python floats, or unset where NaN
+    """
+    values = numbers.astype(object)
+    missing = np.isnan(numbers)
+    values[missing] = unset[missing] if isinstance(unset, np.ndarray) else unset
+    return values.tolist()
+
+
+def _records(columns):
+    """Turn columns of attribute values into one attribute dict per row,
+    the Variables are left for algorithms.retrieve to create when used
+
+    :param dict columns: Attribute name to a list of its values
+    :returns: list -- dict of attributes of each row
+    """
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+def add_ports(sch, data):
+    """Add many ports to the schematic at once, see Schematic.add_ports
+
+    :returns: list -- (row, message) for every row that couldn't be added
+    """
+    n, columns = column_table(data, ('name', 'kind'),
+                              {'min_pressure': False,
+                               'min_flow_rate': False,
+                               'x': False,
+                               'y': False,
+                               'fluid_name': 'default',
+                               'temperature': False,
+                               'min_viscosity': False,
+                               'min_density': False,
+                               'min_resistivity': False,
+                               'analyte_diffusivities': None,
+                               'analyte_initial_concentrations': None,
+                               'analyte_radii': None,
+                               'analyte_charges': None})
+    names = columns['name']
+    errors = _Errors(n)
+    _check_names(errors, sch, names, 'port')
+    _check_kinds(errors, sch, columns['kind'], names, 'port')
+    numbers = _check_numbers(errors, columns, names, 'port',
+                             {'min_pressure': 'positive number',
+                              'min_flow_rate': 'positive number',
+                              'x': 'positive number',
+                              'y': 'positive number',
+                              'temperature': 'positive number',
+                              'min_viscosity': 'positive number',
+                              'min_density': 'positive number',
+                              'min_resistivity': 'positive number'})
+    analytes = ('analyte_diffusivities', 'analyte_initial_concentrations',
+                'analyte_radii', 'analyte_charges')
+    _check_lists(errors, columns, names, 'port', analytes)
+    fluid_names = columns['fluid_name']
+    errors.flag(string_column(fluid_names), "port '%s' fluid_name must be a string", names)
+    known = set(fluids.names())
+    unknown = np.array([name not in known for name in fluid_names.tolist()], dtype=bool)
+    errors.flag(unknown, "port '%%s' fluid_name must be one of %s" % sorted(known), names)
+    temperatures = numbers['temperature']
+    named = np.flatnonzero(~unknown)
+    outside = np.zeros(n, dtype=bool)
+    outside[named] = ~fluids.in_range(fluid_names[named].tolist(), temperatures[named])
+    errors.flag(outside, "port '%s' fluid has no properties at its temperature", names)
+
+    # Every port with the same fluid and temperature shares the same Fluid
+    valid = np.flatnonzero(~errors.bad)
+    port_fluids = fluids.lookup(fluid_names[valid].tolist(), temperatures[valid])
+    defaults = {key: np.array([getattr(fluid, key) for fluid in port_fluids], dtype=object)
+                for key in ('min_viscosity', 'min_density', 'min_resistivity')}
+    attributes = {'kind': [kind.lower() for kind in columns['kind'][valid].tolist()],
+                  'min_viscosity': _values(numbers['min_viscosity'][valid],
+                                           defaults['min_viscosity']),
+                  'min_pressure': _values(numbers['min_pressure'][valid], False),
+                  'min_flow_rate': _values(numbers['min_flow_rate'][valid], False),
+                  'min_density': _values(numbers['min_density'][valid], defaults['min_density']),
+                  'min_resistivity': _values(numbers['min_resistivity'][valid],
+                                             defaults['min_resistivity']),
+                  'min_x': _values(numbers['x'][valid], False),
+                  'min_y': _values(numbers['y'][valid], False)}
+    fluid_analytes = [fluid.analytes() for fluid in port_fluids]
+    for key in analytes:
+        attributes[key] = [analyte[key] if value is None else value for value, analyte in
+                           zip(columns[key][valid].tolist(), fluid_analytes)]
+    sch.dg.add_nodes_from(zip((str(name) for name in names[valid].tolist()),
+                              _records(attributes)))
+    return errors.report()
+
+
+def add_nodes(sch, data):
+    """Add many nodes to the schematic at once, see Schematic.add_nodes
+
+    :returns: list -- (row, message) for every row that couldn't be added
+    """
+    n, columns = column_table(data, ('name',),
+                              {'x': False,
+                               'y': False,
+                               'kind': 'node',
+                               'c': 0.4,
+                               'p': 0.5,
+                               'qf': 0.9,
+                               'droplet_surrogate': None})
+    names = columns['name']
+    errors = _Errors(n)
+    _check_names(errors, sch, names, 'node')
+    _check_kinds(errors, sch, columns['kind'], names, 'node')
+    numbers = _check_numbers(errors, columns, names, 'node',
+                             {'x': 'positive number',
+                              'y': 'positive number',
+                              'c': 'positive number',
+                              'p': 'positive number',
+                              'qf': 'positive number'})
+    surrogates = columns['droplet_surrogate']
+    wrong_type = np.array([value is not None and not isinstance(value, (bool, str))
+                           for value in surrogates.tolist()], dtype=bool)
+    errors.flag(wrong_type, "node '%s' droplet_surrogate must be True or a path", names)
+    valid = np.flatnonzero(~errors.bad)
+    attributes = {'kind': [kind.lower() for kind in columns['kind'][valid].tolist()],
+                  'min_pressure': [None] * len(valid),
+                  'min_flow_rate': [None] * len(valid),
+                  'min_viscosity': [None] * len(valid),
+                  'min_density': [None] * len(valid),
+                  # 0 is unset for node positions like Schematic.node
+                  'min_x': [x or None for x in _values(numbers['x'][valid], None)],
+                  'min_y': [y or None for y in _values(numbers['y'][valid], None)],
+                  'c': _values(numbers['c'][valid], 0.4),
+                  'p': _values(numbers['p'][valid], 0.5),
+                  'qf': _values(numbers['qf'][valid], 0.9),
+                  'droplet_surrogate': [surrogate or False
+                                        for surrogate in surrogates[valid].tolist()]}
+    sch.dg.add_nodes_from(zip((str(name) for name in names[valid].tolist()),
+                              _records(attributes)))
+    return errors.report()
+
+
+def add_channels(sch, data):
+    """Add many channels to the schematic at once, see Schematic.add_channels
+
+    :returns: list -- (row, message) for every row that couldn't be added
+    """
+    n, columns = column_table(data, ('port_from', 'port_to'),
+                              {'min_length': False,
+                               'min_width': False,
+                               'min_height': False,
+                               'min_depth': False,
+                               'min_resolution': False,
+                               'kind': 'rectangle',
+                               'phase': 'None',
+                               'min_sampling_rate': 1})
+    port_from = columns['port_from']
+    port_to = columns['port_to']
+    names = np.empty(n, dtype=object)
+    names[:] = list(zip(port_from.tolist(), port_to.tolist()))
+    errors = _Errors(n)
+    errors.flag(string_column(port_from) | string_column(port_to),
+                "Channel %s ports must be strings", names)
+    missing = np.array([a not in sch.dg.nodes or b not in sch.dg.nodes
+                        for a, b in names.tolist()], dtype=bool)
+    errors.flag(missing, "Channel %s connects to a node that doesn't exist", names)
+    seen = set(sch.dg.edges)
+    duplicate = np.zeros(n, dtype=bool)
+    for row, name in enumerate(names.tolist()):
+        if name in seen:
+            duplicate[row] = True
+        seen.add(name)
+    errors.flag(duplicate, "Channel already exists between these nodes %s", names)
+    # Collection of the kinds for which there are methods to calculate their
+    # channel resistance
+    errors.flag(columns['kind'] != 'rectangle', "Channel %s kind must be rectangle", names)
+    errors.flag(string_column(columns['phase']), "Channel %s phase must be a string", names)
+    numbers = _check_numbers(errors, columns, names, 'Channel',
+                             {'min_length': 'positive number',
+                              'min_width': 'positive number',
+                              'min_height': 'positive number',
+                              'min_depth': 'positive number',
+                              'min_resolution': 'positive number',
+                              'min_sampling_rate': 'positive number'})
+    valid = np.flatnonzero(~errors.bad)
+    edges = [(str(a), str(b)) for a, b in names[valid].tolist()]
+    attributes = {'kind': ['channel'] * len(valid),
+                  'min_length': _values(numbers['min_length'][valid], False),
+                  'min_width': _values(numbers['min_width'][valid], False),
+                  'min_height': _values(numbers['min_height'][valid], False),
+                  'min_depth': _values(numbers['min_depth'][valid], False),
+                  'min_resolution': _values(numbers['min_resolution'][valid], False),
+                  'phase': [phase.lower() for phase in columns['phase'][valid].tolist()],
+                  'port_from': [a for a, _ in edges],
+                  'port_to': [b for _, b in edges],
+                  'min_sampling_rate': _values(numbers['min_sampling_rate'][valid], 1)}
+    sch.dg.add_edges_from((a, b, attrs) for (a, b), attrs in zip(edges, _records(attributes)))
+    sch.paths.invalidate()
+    return errors.report()
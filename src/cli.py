@@ -0,0 +1,354 @@
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.connection import wait
+
+from . import hierarchy, solution
+
+# Extensions of the design files that are solved, Manifold IR and the
+# native format written by Schematic.save
+DESIGN_EXTENSIONS = ('.json', '.npz')
+# Status of a design that couldn't be loaded or solved
+ERROR = 'error'
+# Increment when the layout of the cached results changes
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(hierarchy.DEFAULT_CACHE_DIR, 'designs')
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Hash of the package's source, computed once per process by source_hash
+_source_digest = None
+
+
+def find_designs(patterns):
+    """Expand the files, directories and globs given on the command line
+
+    :param list patterns: Paths of designs or directories to search, or globs
+    :returns: list -- sorted paths of every design found, without duplicates
+    """
+    found = set()
+    for pattern in patterns:
+        paths = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    found.update(os.path.join(root, name) for name in files
+                                 if name.endswith(DESIGN_EXTENSIONS))
+            elif path.endswith(DESIGN_EXTENSIONS):
+                found.add(path)
+    return sorted(found)
+
+
+def load_design(path, dim=None):
+    """Read a design in either format
+
+    :param str path: Path of a Manifold IR .json file or a .npz from Schematic.save
+    :param list dim: Chip dimensions, needed for Manifold IR which doesn't store them
+    :returns: Schematic
+    :raises: ValueError if a Manifold IR design is given without dim
+    """
+    # Imported here so the command starts without loading dReal until needed
+    from .pymanifold import Schematic
+
+    if path.endswith('.npz'):
+        return Schematic.load(path)
+    if dim is None:
+        raise ValueError("%s is Manifold IR which needs the chip dimensions, use --dim" % path)
+    return Schematic.from_json(path, dim)
+
+
+def source_hash():
+    """Hash the package's modules and data files, so results cached by a
+    different version of pymanifold aren't reused
+
+    :returns: str -- hex digest
+    """
+    global _source_digest
+    if _source_digest is None:
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(PACKAGE_DIR):
+            dirs[:] = sorted(name for name in dirs if name != '__pycache__')
+            for name in sorted(files):
+                if not name.endswith(('.py', '.json')):
+                    continue
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, PACKAGE_DIR).encode('utf-8'))
+                with open(path, 'rb') as infile:
+                    digest.update(infile.read())
+        _source_digest = digest.hexdigest()
+    return _source_digest
+
+
+def cache_key(path, options):
+    """Hash a design file's contents with the options it's solved with and
+    the package source, so a cached result is only used while none of them
+    have changed
+
+    :param str path: Path of the design
+    :param dict options: Solve options from the command line
+    :returns: str -- hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(1 << 20), b''):
+            digest.update(chunk)
+    return hierarchy.fingerprint({'design': digest.hexdigest(), 'options': options,
+                                  'version': CACHE_VERSION, 'source': source_hash()})
+
+
+def solve_design(path, options):
+    """Load and solve one design
+
+    :param str path: Path of the design
+    :param dict options: dim, normalize and scale from the command line
+    :returns: dict -- status, load and solve times (s), the name, lower and
+        upper bound of every variable and the design rules it broke
+    """
+    start = time.perf_counter()
+    sch = load_design(path, options['dim'])
+    loaded = time.perf_counter()
+    sol = sch.solve(normalize=options['normalize'], scale=options['scale'])
+    return {'status': sol.status,
+            'load_time': loaded - start,
+            'solve_time': time.perf_counter() - loaded,
+            'names': sol.names,
+            'lb': sol.lb.tolist(),
+            'ub': sol.ub.tolist(),
+            'violations': [violation.message for violation in sol.violations]}
+
+
+def _solve_to_pipe(path, options, conn):
+    """Worker process body, errors are sent back as a result"""
+    try:
+        result = solve_design(path, options)
+    except Exception as e:
+        result = {'status': ERROR, 'error': '%s: %s' % (type(e).__name__, e)}
+    conn.send(result)
+    conn.close()
+
+
+def run_jobs(paths, options, jobs=None, timeout=None):
+    """Solve designs in worker processes, one process per design so a design
+    taking longer than the timeout can be stopped without affecting the rest
+
+    :param list paths: Designs to solve
+    :param dict options: Solve options passed to solve_design
+    :param int jobs: Number of designs solved at once, defaults to the number
+        of CPUs
+    :param float timeout: Seconds each design may take, None for no limit
+    :returns: dict -- path to its result from solve_design, with the wall
+        time it took
+    """
+    jobs = jobs or os.cpu_count() or 1
+    results = {}
+    if jobs == 1 and timeout is None:
+        for path in paths:
+            start = time.perf_counter()
+            try:
+                results[path] = solve_design(path, options)
+            except Exception as e:
+                results[path] = {'status': ERROR, 'error': '%s: %s' % (type(e).__name__, e)}
+            results[path]['wall_time'] = time.perf_counter() - start
+        return results
+
+    pending = list(reversed(paths))
+    # Receiving end of each running design's pipe to (path, process, start)
+    running = {}
+    while pending or running:
+        while pending and len(running) < jobs:
+            path = pending.pop()
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_solve_to_pipe,
+                                              args=(path, options, sender), daemon=True)
+            process.start()
+            sender.close()
+            running[receiver] = (path, process, time.perf_counter())
+
+        now = time.perf_counter()
+        wait_time = None
+        if timeout is not None:
+            wait_time = max(0, min(start + timeout for _, _, start in running.values()) - now)
+        for receiver in wait(list(running), wait_time):
+            path, process, start = running.pop(receiver)
+            try:
+                result = receiver.recv()
+            except EOFError:
+                result = {'status': ERROR, 'error': 'Worker exited with code %s' %
+                          process.exitcode}
+            result['wall_time'] = time.perf_counter() - start
+            results[path] = result
+            receiver.close()
+            process.join()
+
+        if timeout is not None:
+            now = time.perf_counter()
+            for receiver, (path, process, start) in list(running.items()):
+                if now - start >= timeout:
+                    process.terminate()
+                    process.join()
+                    receiver.close()
+                    del running[receiver]
+                    results[path] = {'status': solution.TIMEOUT, 'wall_time': now - start}
+    return results
+
+
+def _read_cache(cache_dir, key):
+    """Returns the result of a previous run of this design if there is one"""
+    try:
+        with open(os.path.join(cache_dir, key + '.json')) as infile:
+            return json.load(infile)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(cache_dir, key, result):
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, key + '.json'), 'w') as outfile:
+        json.dump(result, outfile)
+
+
+def _write_bounds(results_dir, path, result):
+    """Write the bounds of every variable of a solved design next to the others
+
+    :returns: str -- path of the file written
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]
+    output = os.path.join(results_dir, '%s-%s.json' % (stem, digest))
+    with open(output, 'w') as outfile:
+        json.dump({name: [lb, ub] for name, lb, ub in
+                   zip(result['names'], result['lb'], result['ub'])}, outfile)
+    return output
+
+
+def solve_batch(patterns, jobs=None, timeout=None, dim=None, normalize=False, scale=False,
+                cache_dir=DEFAULT_CACHE_DIR, results_dir=None, summary_path=None):
+    """Solve every design found, reusing cached results of designs that
+    haven't changed since they were last solved with the same options
+
+    :param list patterns: Paths of designs or directories, or globs
+    :param int jobs: Number of designs solved at once
+    :param float timeout: Seconds each design may take
+    :param list dim: Chip dimensions for Manifold IR designs
+    :param bool normalize: Solve with normalized constraints
+    :param bool scale: Solve in scaled units
+    :param str cache_dir: Directory of cached results, False to disable
+    :param str results_dir: Directory to write the bounds of each solved
+        design to, None to skip
+    :param str summary_path: Path of the JSON summary to write, None to skip
+    :returns: dict -- summary with the count of each status, the total time
+        and a record of each design's status and timings
+    """
+    start = time.perf_counter()
+    options = {'dim': [float(value) for value in dim] if dim is not None else None,
+               'normalize': bool(normalize), 'scale': bool(scale)}
+    paths = find_designs(patterns)
+    keys = {}
+    results = {}
+    todo = []
+    for path in paths:
+        if cache_dir:
+            keys[path] = cache_key(path, options)
+            cached = _read_cache(cache_dir, keys[path])
+            if cached is not None:
+                results[path] = dict(cached, cached=True)
+                continue
+        todo.append(path)
+
+    for path, result in run_jobs(todo, options, jobs, timeout).items():
+        results[path] = dict(result, cached=False)
+        # Timeouts and errors are retried next run
+        if cache_dir and result['status'] in (solution.SAT, solution.UNSAT):
+            _write_cache(cache_dir, keys[path], result)
+
+    designs = []
+    for path in paths:
+        result = results[path]
+        record = {'path': path, 'status': result['status'], 'cached': result['cached']}
+        for key in ('load_time', 'solve_time', 'wall_time', 'error', 'violations'):
+            if result.get(key) not in (None, []):
+                record[key] = result[key]
+        if result['status'] == solution.SAT:
+            record['variables'] = len(result['names'])
+            if results_dir:
+                record['result'] = _write_bounds(results_dir, path, result)
+        designs.append(record)
+
+    counts = {status: 0 for status in solution.STATUSES + (ERROR,)}
+    for record in designs:
+        counts[record['status']] += 1
+    summary = {'designs': designs,
+               'counts': counts,
+               'cached': sum(record['cached'] for record in designs),
+               'options': options,
+               'jobs': jobs or os.cpu_count() or 1,
+               'timeout': timeout,
+               'total_time': time.perf_counter() - start}
+    if summary_path:
+        with open(summary_path, 'w') as outfile:
+            json.dump(summary, outfile, indent=2)
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pymanifold',
+        description="Solve microfluidic designs, Manifold IR .json or .npz files from "
+                    "Schematic.save, and summarize the results")
+    parser.add_argument('designs', nargs='+',
+                        help="design files, directories to search or globs")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of designs solved at once (default: number of CPUs)")
+    parser.add_argument('-t', '--timeout', type=float, default=None,
+                        help="seconds each design may take before it's stopped")
+    parser.add_argument('--dim', type=float, nargs=4, default=None,
+                        metavar=('X_MIN', 'Y_MIN', 'X_MAX', 'Y_MAX'),
+                        help="chip dimensions for Manifold IR designs (m)")
+    parser.add_argument('--normalize', action='store_true',
+                        help="emit constraints in polynomial form")
+    parser.add_argument('--scale', action='store_true',
+                        help="solve in units scaled to the design")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help="directory of cached results (default: %(default)s)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="solve every design even if a cached result is valid")
+    parser.add_argument('--results-dir', default=None,
+                        help="directory to write the bounds of each solved design to")
+    parser.add_argument('-o', '--summary', default='pymanifold-summary.json',
+                        help="path of the JSON summary (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.timeout is not None and args.timeout <= 0:
+        parser.error("--timeout must be positive")
+    return args
+
+
+def main(argv=None):
+    """Entry point of the pymanifold command
+
+    :param list argv: Command line arguments, defaults to sys.argv
+    :returns: int -- exit code, 0 if every design has a solution
+    """
+    args = parse_args(argv)
+    summary = solve_batch(args.designs, args.jobs, args.timeout, args.dim, args.normalize,
+                          args.scale, False if args.no_cache else args.cache_dir,
+                          args.results_dir, args.summary)
+    if not summary['designs']:
+        print("No designs found", file=sys.stderr)
+        return 2
+    for record in summary['designs']:
+        timing = ' (cached)' if record['cached'] else ' %.3fs' % record.get('wall_time', 0)
+        detail = ': ' + record['error'] if 'error' in record else ''
+        print('%s %s%s%s' % (record['status'], record['path'], timing, detail))
+    print(', '.join('%s %s' % (count, status) for status, count in summary['counts'].items()) +
+          ' in %.3fs' % summary['total_time'])
+    return 0 if summary['counts'][solution.SAT] == len(summary['designs']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,290 @@
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+
+from dreal.api import CheckSatisfiability
+
+from . import drc, geometry, scaling, solution
+
+# Group of the expressions keeping channels from crossing, which belong to a
+# pair of channels rather than to one component
+NON_CROSSING = 'non_crossing'
+
+# Schematic and groups of a worker process, set by _init_worker
+_worker = None
+
+
+def group_expressions(sch):
+    """Translate the schematic recording which node or channel emitted each
+    expression. Translation is recursive, so the translate function of a
+    channel returns before the one of the input that reached it and claims
+    its expressions first
+
+    :param Schematic sch: Schematic to translate, its exprs are replaced
+    :returns: OrderedDict -- node name or channel tuple, or NON_CROSSING, to
+        the list of its expressions in the order they were translated
+    """
+    owner = {}
+    # Holds on to the expressions so their ids aren't reused while recording
+    keep = []
+
+    def recorder(name, exprs):
+        for expr in exprs:
+            if id(expr) not in owner:
+                owner[id(expr)] = name
+                keep.append(expr)
+
+    sch.exprs = []
+    sch.translate_schematic(recorder)
+
+    groups = OrderedDict()
+    for expr in sch.exprs:
+        groups.setdefault(owner.get(id(expr), NON_CROSSING), []).append(expr)
+    return groups
+
+
+def check_expressions(dg, dim, exprs):
+    """Solve a subset of the expressions of a schematic the way
+    invoke_backend would
+
+    :param DiGraph dg: Graph of the schematic
+    :param list dim: dimensions of the overall chip
+    :param list exprs: SMT expressions to solve
+    :returns: str -- solution.SAT or solution.UNSAT
+    """
+    if not exprs:
+        return solution.SAT
+    formula, _, delta = scaling.solver_formula(dg, dim, exprs)
+    return solution.SAT if CheckSatisfiability(formula, delta) else solution.UNSAT
+
+
+def _init_worker(spec):
+    """Translate the schematic once in each worker process, dReal expressions
+    can't be pickled so every worker builds its own
+    """
+    # Imported here since pymanifold imports this module
+    from .pymanifold import Schematic
+
+    global _worker
+    sch = Schematic.from_plain(spec['dim'], spec['nodes'], spec['edges'])
+    sch.dg.graph.update(spec['graph'])
+    sch.model = spec['model']
+    groups = group_expressions(sch)
+    _worker = (sch, [groups.get(key, []) for key in spec['keys']])
+
+
+def _check_in_worker(subset):
+    sch, groups = _worker
+    return check_expressions(sch.dg, sch.dim, [expr for idx in subset for expr in groups[idx]])
+
+
+class ConflictSearch():
+    """Delta debugging over groups of expressions, finding a subset that is
+    UNSAT on its own but satisfiable once any one group is removed. The
+    subsets of each step are solved together and every result is cached, a
+    subset containing one known to be UNSAT is UNSAT and one inside a known
+    satisfiable subset is satisfiable so neither is solved again
+    """
+
+    def __init__(self, check_many, deadline=None):
+        """
+        :param check_many: Function solving a list of frozensets of group
+            indices, given the seconds left or None, and returning their
+            statuses in order, None for those not finished in time
+        :param float deadline: time.perf_counter() to stop searching at, None
+            to search until a minimal subset is found
+        """
+        self.check_many = check_many
+        self.deadline = deadline
+        self.cache = {}
+        self.solver_calls = 0
+        self.cache_hits = 0
+
+    def _remaining(self):
+        if self.deadline is None:
+            return None
+        return self.deadline - time.perf_counter()
+
+    def _known(self, subset):
+        if subset in self.cache:
+            return self.cache[subset]
+        for known, status in self.cache.items():
+            if status == solution.UNSAT and known <= subset:
+                return solution.UNSAT
+            if status == solution.SAT and subset <= known:
+                return solution.SAT
+        return None
+
+    def statuses(self, subsets):
+        """Status of each subset, solving those the cache doesn't decide
+
+        :param list subsets: frozensets of group indices
+        :returns: list -- solution.SAT, solution.UNSAT or None if the time
+            ran out before it was solved
+        """
+        results = {}
+        todo = []
+        for subset in subsets:
+            status = self._known(subset)
+            if status is not None:
+                self.cache_hits += 1
+                results[subset] = status
+            elif subset not in todo:
+                todo.append(subset)
+        remaining = self._remaining()
+        if todo and (remaining is None or remaining > 0):
+            for subset, status in zip(todo, self.check_many(todo, remaining)):
+                if status is not None:
+                    self.solver_calls += 1
+                    self.cache[subset] = results[subset] = status
+        return [results.get(subset) for subset in subsets]
+
+    def minimize(self, size):
+        """Narrow every group down to a minimal conflicting subset, the whole
+        set must already be known to be UNSAT
+
+        :param int size: Number of groups
+        :returns: tuple -- sorted group indices of a conflicting subset and
+            whether it's minimal, it isn't if the time ran out first
+        """
+        current = frozenset(range(size))
+        n = 2
+        while len(current) >= 2:
+            remaining = self._remaining()
+            if remaining is not None and remaining <= 0:
+                return sorted(current), False
+            ordered = sorted(current)
+            chunks = [frozenset(ordered[len(ordered) * i // n:len(ordered) * (i + 1) // n])
+                      for i in range(n)]
+            # With two chunks each one is the complement of the other
+            complements = [current - chunk for chunk in chunks] if n > 2 else []
+            statuses = self.statuses(chunks + complements)
+            if solution.UNSAT in statuses[:n]:
+                current = chunks[statuses.index(solution.UNSAT)]
+                n = 2
+            elif solution.UNSAT in statuses[n:]:
+                current = complements[statuses[n:].index(solution.UNSAT)]
+                n = max(n - 1, 2)
+            elif None in statuses:
+                return sorted(current), False
+            elif n >= len(current):
+                break
+            else:
+                n = min(2 * n, len(current))
+        return sorted(current), True
+
+
+def _check_locally(dg, dim, groups):
+    def check_many(subsets, remaining):
+        deadline = None if remaining is None else time.perf_counter() + remaining
+        statuses = []
+        for subset in subsets:
+            if deadline is not None and time.perf_counter() >= deadline:
+                statuses.append(None)
+                continue
+            statuses.append(check_expressions(
+                dg, dim, [expr for idx in subset for expr in groups[idx]]))
+        return statuses
+    return check_many
+
+
+def _check_in_pool(pool):
+    def check_many(subsets, remaining):
+        deadline = None if remaining is None else time.perf_counter() + remaining
+        pending = [pool.apply_async(_check_in_worker, (sorted(subset),)) for subset in subsets]
+        statuses = []
+        for result in pending:
+            timeout = None if deadline is None else max(0, deadline - time.perf_counter())
+            try:
+                statuses.append(result.get(timeout))
+            except multiprocessing.TimeoutError:
+                statuses.append(None)
+        return statuses
+    return check_many
+
+
+def parameters(dg, component):
+    """The min_ parameters the user set on a component
+
+    :param DiGraph dg: Graph of the schematic
+    :param component: Node name or channel tuple
+    :returns: dict -- parameter name to its value
+    """
+    if component == NON_CROSSING:
+        return {}
+    attrs = dg.edges[component] if isinstance(component, tuple) else dg.nodes[component]
+    return {key: value for key, value in attrs.items()
+            if key.startswith('min_') and geometry.is_set(value)}
+
+
+def diagnose(sch, processes=None, time_budget=None, check=True):
+    """Find the components responsible for a schematic being UNSAT, see
+    Schematic.diagnose
+    """
+    start = time.perf_counter()
+    dg = sch.dg
+    deadline = None if time_budget is None else start + time_budget
+    report = {'status': solution.SAT,
+              'components': [],
+              'parameters': {},
+              'violations': [],
+              'minimal': True,
+              'groups': 0,
+              'solver_calls': 0,
+              'cache_hits': 0}
+
+    if check:
+        report['violations'] = drc.check(dg, sch.dim)
+    if report['violations']:
+        # The design rules already name the components, no solve needed
+        report['status'] = solution.UNSAT
+        components = [violation.component for violation in report['violations']]
+        report['components'] = list(OrderedDict.fromkeys(components))
+    else:
+        groups = group_expressions(sch)
+        keys = list(groups)
+        exprs = list(groups.values())
+        report['groups'] = len(keys)
+        processes = processes or os.cpu_count() or 1
+        if processes == 1 or len(keys) <= 2:
+            search = ConflictSearch(_check_locally(dg, sch.dim, exprs), deadline)
+            conflict, minimal = _search(search, len(keys))
+        else:
+            nodes, edges = sch.to_plain()
+            spec = {'dim': list(sch.dim), 'nodes': nodes, 'edges': edges,
+                    'graph': dict(dg.graph), 'model': sch.model, 'keys': keys}
+            # Leaving the block terminates workers still solving past the budget
+            with multiprocessing.Pool(processes, _init_worker, (spec,)) as pool:
+                search = ConflictSearch(_check_in_pool(pool), deadline)
+                conflict, minimal = _search(search, len(keys))
+        report['solver_calls'] = search.solver_calls
+        report['cache_hits'] = search.cache_hits
+        report['minimal'] = minimal
+        if conflict is None:
+            report['status'] = solution.TIMEOUT
+            report['minimal'] = False
+        elif conflict:
+            report['status'] = solution.UNSAT
+            report['components'] = [keys[idx] for idx in conflict]
+        report['expressions'] = sum(len(exprs[idx]) for idx in conflict or ())
+
+    report['parameters'] = {component: parameters(dg, component)
+                            for component in report['components']}
+    report['elapsed'] = time.perf_counter() - start
+    return report
+
+
+def _search(search, size):
+    """Check the whole schematic then minimize it if it's UNSAT
+
+    :returns: tuple -- the group indices of the conflict, empty if
+        the schematic is satisfiable or None if it couldn't be solved in
+        time, and whether the conflict is minimal
+    """
+    status, = search.statuses([frozenset(range(size))])
+    if status is None:
+        return None, False
+    if status == solution.SAT:
+        return [], True
+    return search.minimize(size)
@@ -0,0 +1,179 @@
+from collections import namedtuple
+import numpy as np
+
+# A broken rule, component is the node name or channel tuple
+Violation = namedtuple('Violation', ['rule', 'component', 'message'])
+Rule = namedtuple('Rule', ['name', 'table', 'check', 'message'])
+
+TABLES = ('nodes', 'channels')
+
+
+class Table():
+    """Attributes of every node or every channel as NumPy columns, built the
+    first time a rule asks for them. Numeric columns hold NaN where the user
+    left the parameter for the solver, as False, None or 0
+    """
+
+    def __init__(self, names, rows):
+        """
+        :param list names: Name of each node or channel tuple
+        :param list rows: Attribute dict of each
+        """
+        self.names = names
+        self.rows = rows
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, key):
+        if key not in self._columns:
+            values = [attrs.get(key) for attrs in self.rows]
+            if key == 'kind':
+                self._columns[key] = np.array([value or '' for value in values], dtype=object)
+            else:
+                self._columns[key] = np.array(
+                    [value if isinstance(value, (int, float)) and not isinstance(value, bool)
+                     and value else np.nan for value in values], dtype=float)
+        return self._columns[key]
+
+    def __setitem__(self, key, column):
+        self._columns[key] = np.asarray(column)
+
+
+_RULES = []
+
+
+def register(name, table, message):
+    """Decorator adding a rule checked before every solve. The rule is given
+    the Table of every node or channel and the chip dimensions and returns a
+    boolean array marking the ones breaking it, comparisons with NaN are
+    False so parameters left to the solver pass
+
+    :param str name: Name of the rule, a rule of the same name is replaced
+    :param str table: 'nodes' or 'channels'
+    :param str message: Description of a violation, %s is replaced by the
+        component's name
+    :returns: function -- decorator returning the check unchanged
+    :raises: ValueError if table isn't one of TABLES
+    """
+    if table not in TABLES:
+        raise ValueError("table must be one of %s" % ', '.join(TABLES))
+
+    def decorator(check):
+        unregister(name)
+        _RULES.append(Rule(name, table, check, message))
+        return check
+    return decorator
+
+
+def unregister(name):
+    """Remove a rule added with register
+
+    :param str name: Name of the rule
+    :returns: bool -- whether there was a rule of that name
+    """
+    for idx, rule in enumerate(_RULES):
+        if rule.name == name:
+            del _RULES[idx]
+            return True
+    return False
+
+
+def rules():
+    """Every rule checked before solving, built in ones first
+
+    :returns: list -- Rule tuples
+    """
+    return list(_RULES)
+
+
+def tables(dg):
+    """Build the node and channel tables of a schematic, with the number of
+    analytes reaching each electrophoretic cross as the analytes column and
+    its c, p and qf columns holding 0 where they were given as 0
+
+    :param DiGraph dg: Graph of the schematic
+    :returns: dict -- 'nodes' and 'channels' Tables
+    """
+    nodes = Table(list(dg.nodes), [attrs for _, attrs in dg.nodes(data=True)])
+    channels = Table(list(dg.edges), [attrs for _, _, attrs in dg.edges(data=True)])
+    analytes = np.full(len(nodes), np.nan)
+    # The constants of a cross are always numbers, so unlike parameters left
+    # to the solver a 0 is kept to be checked
+    constants = {key: nodes[key].copy() for key in ('c', 'p', 'qf')}
+    for idx, (name, attrs) in enumerate(zip(nodes.names, nodes.rows)):
+        if attrs.get('kind') == 'ep_cross':
+            for key, column in constants.items():
+                value = attrs.get(key)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    column[idx] = value
+            # The injection channel is the one into the cross without a phase
+            for port in dg.pred[name]:
+                if dg.edges[port, name].get('phase') is None:
+                    diffusivities = dg.nodes[port].get('analyte_diffusivities')
+                    if isinstance(diffusivities, (list, tuple)):
+                        analytes[idx] = len(diffusivities)
+    nodes['analytes'] = analytes
+    for key, column in constants.items():
+        nodes[key] = column
+    return {'nodes': nodes, 'channels': channels}
+
+
+def check(dg, dim, rules=None):
+    """Check every rule against every node and channel
+
+    :param DiGraph dg: Graph of the schematic
+    :param list dim: dimensions of the overall chip, [X_min, Y_min, X_max, X_min] (m)
+    :param list rules: Rules to check, defaults to every registered rule
+    :returns: list -- Violation of every rule broken, empty if there are none
+    """
+    built = tables(dg)
+    violations = []
+    for rule in (_RULES if rules is None else rules):
+        table = built[rule.table]
+        if not len(table):
+            continue
+        broken = np.asarray(rule.check(table, dim), dtype=bool)
+        for idx in np.flatnonzero(broken):
+            name = table.names[idx]
+            violations.append(Violation(rule.name, name, rule.message % (name,)))
+    return violations
+
+
+@register('height_below_width', 'channels',
+          "Channel %s must be wider than it is tall for its resistance")
+def _height_below_width(channels, dim):
+    # calculate_channel_resistance asserts h < w
+    return channels['min_height'] >= channels['min_width']
+
+
+@register('width_below_resolution', 'channels',
+          "Channel %s must be narrower than its min_resolution")
+def _width_below_resolution(channels, dim):
+    return channels['min_width'] >= channels['min_resolution']
+
+
+@register('height_below_depth', 'channels',
+          "Channel %s must be shallower than its min_depth")
+def _height_below_depth(channels, dim):
+    return channels['min_height'] >= channels['min_depth']
+
+
+@register('position_on_chip', 'nodes', "Node %s is placed outside of the chip")
+def _position_on_chip(nodes, dim):
+    x = nodes['min_x']
+    y = nodes['min_y']
+    return (x < dim[0]) | (x > dim[2]) | (y < dim[1]) | (y > dim[3])
+
+
+@register('ep_cross_constants', 'nodes',
+          "Electrophoretic Cross %s needs 0 < c < 1, 0 < p < 1 and 2/(n-1) < qf < 1 "
+          "for its n analytes")
+def _ep_cross_constants(nodes, dim):
+    ep_cross = nodes['kind'] == 'ep_cross'
+    c, p, qf, n = nodes['c'], nodes['p'], nodes['qf'], nodes['analytes']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        qf_low = np.where(n > 1, 2 / (n - 1), -np.inf)
+    return ep_cross & ((c <= 0) | (c >= 1) | (p <= 0) | (p >= 1) | (qf >= 1) |
+                       ((n >= 0) & (qf <= qf_low)))
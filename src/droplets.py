@@ -0,0 +1,193 @@
+import heapq
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+from . import numeric, transient
+
+
+class _Network():
+    """Steady pressure driven flow through the channels with the ports held
+    at fixed pressures, solved with a sparse LU factorization
+    """
+
+    def __init__(self, dg, channels, boundary):
+        """
+        :param DiGraph dg: Graph of the schematic
+        :param list channels: Channel tuples in the order of the resistances
+        :param dict boundary: Port name to the pressure it's held at
+        """
+        interior = [name for name in dg.nodes if name not in boundary]
+        index = {name: i for i, name in enumerate(interior)}
+        rows, cols, data = [], [], []
+        # Pressure difference each channel gets from the fixed pressures at its ends
+        self.fixed = np.zeros(len(channels))
+        for e, (port_from, port_to) in enumerate(channels):
+            for end, sign in ((port_from, 1), (port_to, -1)):
+                if end in index:
+                    rows.append(index[end])
+                    cols.append(e)
+                    data.append(sign)
+                else:
+                    self.fixed[e] += sign * boundary[end]
+        # Incidence of the interior nodes, +1 where a channel leaves a node
+        self.B = sparse.csr_matrix((data, (rows, cols)), shape=(len(interior), len(channels)))
+
+    def flows(self, resistance):
+        """Flow rate of each channel for the given resistances
+
+        :param ndarray resistance: Resistance of each channel
+        :returns: ndarray -- flow rate of each channel
+        """
+        g = 1 / resistance
+        if self.B.shape[0]:
+            L = (self.B @ sparse.diags(g) @ self.B.T).tocsc()
+            try:
+                pressure = splu(L).solve(-(self.B @ (g * self.fixed)))
+            except RuntimeError:
+                raise ValueError("Every node must be connected to a port to find its pressure")
+            return g * (self.B.T @ pressure + self.fixed)
+        return g * self.fixed
+
+
+def simulate_droplets(sch, t_end, model=None, droplet_resistance=1.0, resolve_interval=None):
+    """Generate droplets at every T-junction and follow them through the
+    channels downstream, see Schematic.simulate_droplets
+    """
+    dg = sch.dg
+    values = numeric.box_values(model) if model else {}
+    channels = list(dg.edges)
+    index = {channel_name: e for e, channel_name in enumerate(channels)}
+    w, h, mu, length = (np.array([numeric.solved_value(dg, values, channel_name, key)
+                                  for channel_name in channels], dtype=float)
+                        for key in ('width', 'height', 'viscosity', 'length'))
+    area = w * h
+    base_resistance = numeric.channel_resistance(w, h, mu, length)
+    network = _Network(dg, channels, transient.port_pressures(dg, values))
+    epsilon = values.get('epsilon', 0)
+
+    generators = []
+    for name, attrs in dg.nodes(data=True):
+        if attrs['kind'] != 'tjunc':
+            continue
+        phases = {dg.edges[channel_name].get('phase'): index[channel_name]
+                  for channel_name in dg.in_edges(name)}
+        if 'continuous' not in phases or 'dispersed' not in phases or len(dg.succ[name]) != 1:
+            raise ValueError("T-junction %s needs continuous and dispersed channels in and "
+                             "one channel out" % name)
+        generators.append((name, phases['continuous'], phases['dispersed'],
+                           index[(name, next(iter(dg.succ[name])))]))
+
+    added = np.zeros(len(channels))
+    counts = np.zeros(len(channels), dtype=int)
+    occupancy = np.zeros(len(channels))
+    flow_rate = network.flows(base_resistance)
+    resolves = 1
+    if resolve_interval is None:
+        resolve_interval = t_end / 100
+
+    created = []
+    generator_of = []
+    exited = []
+    exit_port = []
+    weights = []
+    generated = {name: {'times': [], 'volumes': [], 'spacings': []} for name, *_ in generators}
+
+    # Events are (time, order, kind, data), order keeps events at the same
+    # time in the order they were scheduled
+    events = []
+    order = 0
+
+    def schedule(time, kind, data):
+        nonlocal order
+        heapq.heappush(events, (time, order, kind, data))
+        order += 1
+
+    def enter(droplet, e, time):
+        """Move a droplet into a channel and schedule when it reaches the end"""
+        counts[e] += 1
+        added[e] += weights[droplet] / area[e] / length[e] * base_resistance[e]
+        velocity = flow_rate[e] / area[e]
+        if velocity > 0:
+            schedule(time + length[e] / velocity, 'arrive', (droplet, e))
+
+    for generator in generators:
+        schedule(0, 'generate', generator)
+
+    now = 0
+    last_resolve = 0
+    changed = False
+    processed = 0
+    while events and events[0][0] <= t_end:
+        time, _, kind, data = heapq.heappop(events)
+        occupancy += counts * (time - now)
+        now = time
+        processed += 1
+        if kind == 'generate':
+            name, continuous, dispersed, out = data
+            qD, qC = flow_rate[dispersed], flow_rate[continuous]
+            if qD <= 0 or qC <= 0:
+                # Not generating at these flow rates, check again after the next re-solve
+                schedule(time + resolve_interval, 'generate', data)
+                continue
+            volume = float(numeric.droplet_volume(h[out], w[out], w[dispersed], epsilon, qD, qC))
+            if not volume > 0:
+                raise ValueError("T-junction %s has no valid droplet volume" % name)
+            period = volume / qD
+            droplet = len(created)
+            created.append(time)
+            generator_of.append(name)
+            exited.append(np.nan)
+            exit_port.append(None)
+            # Droplets add resistance in proportion to the length of channel they fill
+            weights.append(droplet_resistance * volume)
+            generated[name]['times'].append(time)
+            generated[name]['volumes'].append(volume)
+            generated[name]['spacings'].append(flow_rate[out] / area[out] * period)
+            enter(droplet, out, time)
+            changed = True
+            schedule(time + period, 'generate', data)
+        else:
+            droplet, e = data
+            counts[e] -= 1
+            added[e] -= weights[droplet] / area[e] / length[e] * base_resistance[e]
+            changed = True
+            node = channels[e][1]
+            # A droplet follows the channel out of a node with the highest flow
+            outs = [index[(node, node_out)] for node_out in dg.succ[node]]
+            outs = [out for out in outs if flow_rate[out] > 0]
+            if not outs:
+                exited[droplet] = time
+                exit_port[droplet] = node
+            else:
+                enter(droplet, max(outs, key=lambda out: flow_rate[out]), time)
+
+        if changed and time - last_resolve >= resolve_interval:
+            flow_rate = network.flows(base_resistance + np.maximum(added, 0))
+            resolves += 1
+            last_resolve = time
+            changed = False
+    occupancy += counts * (t_end - now)
+
+    generator_results = {}
+    for name, records in generated.items():
+        times = np.array(records['times'])
+        generator_results[name] = {
+            'count': len(times),
+            'frequency': (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 else 0.0,
+            'period': np.diff(times).mean() if len(times) > 1 else np.nan,
+            'volume': np.mean(records['volumes']) if len(times) else np.nan,
+            'spacing': np.mean(records['spacings']) if len(times) else np.nan}
+    channel_results = {channel_name: {'mean_droplets': occupancy[e] / t_end if t_end else 0.0,
+                                      'droplets': int(counts[e]),
+                                      'added_resistance': max(added[e], 0.0),
+                                      'flow_rate': flow_rate[e]}
+                       for e, channel_name in enumerate(channels)}
+    return {'generators': generator_results,
+            'channels': channel_results,
+            'droplets': {'generator': generator_of,
+                         'created': np.array(created),
+                         'exited': np.array(exited),
+                         'exit_port': exit_port},
+            'resolves': resolves,
+            'events': processed}
@@ -0,0 +1,199 @@
+from collections import defaultdict
+import networkx as nx
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.sparse.linalg import splu
+
+from . import numeric
+
+# Channel geometry the conductance is found from
+GEOMETRY = ('length', 'width', 'height')
+
+
+def electrodes(dg):
+    """Nodes where a voltage can be applied, the elec_ports
+
+    :param DiGraph dg: Graph of the schematic
+    :returns: list -- names of the electrodes in the order of the graph
+    """
+    return [name for name, attrs in dg.nodes(data=True) if 'voltage' in attrs]
+
+
+def _voltage(value):
+    """Applied voltage of an electrode, NaN where it's left floating"""
+    if value is None or isinstance(value, bool):
+        return np.nan
+    return float(value)
+
+
+def configuration_table(dg, names, configurations=None):
+    """Voltages of every electrode in every configuration as an array
+
+    :param DiGraph dg: Graph of the schematic
+    :param list names: Electrodes, the columns of the table
+    :param configurations: list of dicts of electrode to voltage (V), or an
+        array with a row per configuration and a column per electrode, None,
+        False or NaN leave the electrode floating. Defaults to one
+        configuration with the voltages the elec_ports were given
+    :returns: ndarray -- (configurations, electrodes) with NaN where floating
+    :raises: ValueError if an electrode isn't an elec_port or the array has
+        the wrong number of columns
+    """
+    if configurations is None:
+        configurations = [{name: dg.nodes[name]['voltage'] for name in names}]
+    if isinstance(configurations, np.ndarray) or \
+            (len(configurations) and not isinstance(configurations[0], dict)):
+        table = np.array([[_voltage(value) for value in row] for row in configurations],
+                         dtype=float).reshape(len(configurations), -1)
+        if table.shape[1] != len(names):
+            raise ValueError("Expected a voltage for each of the %s electrodes %s" %
+                             (len(names), names))
+        return table
+    table = np.full((len(configurations), len(names)), np.nan)
+    column = {name: idx for idx, name in enumerate(names)}
+    for row, configuration in enumerate(configurations):
+        for name, value in configuration.items():
+            if name not in column:
+                raise ValueError("%s is not an electrical port" % (name,))
+            table[row, column[name]] = _voltage(value)
+    return table
+
+
+def _resistivities(dg, channels, resistivity):
+    """Resistivity of the fluid in each channel, given or the one shared by
+    the ports of the part of the chip the channel is in
+
+    :returns: ndarray -- resistivity of each channel (Ohm*m)
+    """
+    if isinstance(resistivity, dict):
+        missing = [channel for channel in channels if channel not in resistivity]
+        if missing:
+            raise ValueError("No resistivity given for channels %s" % missing)
+        return np.array([resistivity[channel] for channel in channels], dtype=float)
+    if resistivity is not None:
+        return np.full(len(channels), float(resistivity))
+
+    component = {}
+    found = defaultdict(set)
+    for idx, nodes in enumerate(nx.connected_components(dg.to_undirected(as_view=True))):
+        for name in nodes:
+            component[name] = idx
+            value = dg.nodes[name].get('min_resistivity')
+            if value and not isinstance(value, bool):
+                found[idx].add(value)
+    values = np.empty(len(channels))
+    for idx, channel in enumerate(channels):
+        shared = found[component[channel[0]]]
+        if len(shared) != 1:
+            raise ValueError("The ports connected to channel %s have %s resistivities, give the "
+                             "resistivity of each channel instead" %
+                             (channel, 'different' if shared else 'no'))
+        values[idx] = next(iter(shared))
+    return values
+
+
+def analyze(sch, configurations=None, model=None, resistivity=None):
+    """Solve the electrical network of the fluid filled channels, see
+    Schematic.analyze_electrical
+    """
+    dg = sch.dg
+    if model is None:
+        model = sch.model
+    values = numeric.box_values(model) if model else {}
+    nodes = list(dg.nodes)
+    channels = list(dg.edges)
+    names = electrodes(dg)
+    table = configuration_table(dg, names, configurations)
+    index = {name: idx for idx, name in enumerate(nodes)}
+
+    geometry = {key: np.array([numeric.solved_value(dg, values, channel, key)
+                               for channel in channels], dtype=float)
+                for key in GEOMETRY}
+    area = geometry['width'] * geometry['height']
+    rho = _resistivities(dg, channels, resistivity)
+    conductance = area / (rho * geometry['length'])
+    if np.any(~np.isfinite(conductance)) or np.any(conductance <= 0):
+        raise ValueError("Every channel needs a positive length, width, height and resistivity")
+
+    # Nodal analysis, the Laplacian of the conductances relates the voltage
+    # of every node to the current leaving it
+    n = len(nodes)
+    starts = np.array([index[port_from] for port_from, _ in channels], dtype=int)
+    ends = np.array([index[port_to] for _, port_to in channels], dtype=int)
+    rows = np.concatenate((starts, ends, starts, ends))
+    cols = np.concatenate((ends, starts, starts, ends))
+    data = np.concatenate((-conductance, -conductance, conductance, conductance))
+    laplacian = sparse.csr_matrix((data, (rows, cols)), shape=(n, n))
+    _, labels = csgraph.connected_components(laplacian, directed=False)
+
+    voltages = np.full((len(table), n), np.nan)
+    columns = np.array([index[name] for name in names], dtype=int)
+    # Configurations fixing the same electrodes share one factorization and
+    # are solved together as the columns of the right hand side
+    patterns = defaultdict(list)
+    for row, fixed in enumerate(~np.isnan(table)):
+        patterns[tuple(fixed)].append(row)
+    for pattern, config_rows in patterns.items():
+        fixed = columns[np.array(pattern, dtype=bool)]
+        # Parts of the chip without a fixed electrode have no defined voltage
+        grounded = np.isin(labels, labels[fixed])
+        free = np.flatnonzero(grounded & ~np.isin(np.arange(n), fixed))
+        applied = table[np.ix_(config_rows, np.array(pattern, dtype=bool))]
+        voltages[np.ix_(config_rows, fixed)] = applied
+        if len(free):
+            rhs = -(laplacian[free][:, fixed] @ applied.T)
+            solved = splu(laplacian[free][:, free].tocsc()).solve(np.asarray(rhs, dtype=float))
+            voltages[np.ix_(config_rows, free)] = solved.T
+
+    drop = voltages[:, starts] - voltages[:, ends]
+    currents = conductance * drop
+    power = currents * drop
+    return {'nodes': nodes,
+            'channels': channels,
+            'electrodes': names,
+            'configurations': table,
+            'conductance': conductance,
+            'voltages': voltages,
+            'currents': currents,
+            'fields': drop / geometry['length'],
+            'power': power,
+            'power_density': power / (area * geometry['length']),
+            'electrode_currents': (laplacian @ voltages.T).T[:, columns]}
+
+
+def field_bounds(result, configurations=None):
+    """Range of the field in each channel over some of the configurations
+
+    :param dict result: Result of analyze
+    :param configurations: Indices of the configurations, defaults to all
+    :returns: dict -- channel to [lowest, highest] field (V/m), channels
+        without a defined field are left out
+    """
+    fields = result['fields']
+    if configurations is not None:
+        fields = fields[np.atleast_1d(configurations)]
+    bounds = {}
+    for idx, channel in enumerate(result['channels']):
+        column = fields[:, idx]
+        if len(column) and not np.any(np.isnan(column)):
+            bounds[channel] = [float(column.min()), float(column.max())]
+    return bounds
+
+
+def apply(sch, result, configurations=None):
+    """Constrain the field translation uses for each channel, an
+    electrophoretic cross takes the field of its separation channel from
+    these bounds instead of assuming it's uniform between the electrodes
+
+    :param Schematic sch: Schematic that was analyzed
+    :param dict result: Result of analyze
+    :param configurations: Indices of the configurations the field may come
+        from, a single one fixes it, defaults to all
+    :returns: dict -- channel to the [lowest, highest] field (V/m) set as
+        its field_bounds
+    """
+    bounds = field_bounds(result, configurations)
+    for channel, channel_bounds in bounds.items():
+        sch.dg.edges[channel]['field_bounds'] = channel_bounds
+    return bounds
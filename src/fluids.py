@@ -0,0 +1,354 @@
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+
+# Fluids shipped with pymanifold, more can be added with load
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'fluids.json')
+# Properties of each fluid, False where it isn't known
+PROPERTIES = ('density', 'resistivity', 'viscosity')
+# Properties that can be interpolated from a table of the fluid at
+# different temperatures
+TEMPERATURE_PROPERTIES = ('density', 'viscosity')
+# Properties of each analyte of a sample, lists with a value per analyte
+ANALYTE_PROPERTIES = ('diffusivities', 'initial_concentrations', 'radii', 'charges')
+
+# Fluid name to its properties and arrays of its temperature tables
+_fluids = {}
+# Analyte name to its properties
+_analytes = {}
+# Most Fluids kept for sharing, sweeping the temperature would otherwise
+# keep one for every temperature ever used
+MAX_INSTANCES = 4096
+# (fluid name, temperature) to the shared Fluid, least recently used first
+_instances = OrderedDict()
+_loaded = False
+
+
+def _number_list(values, what):
+    if not isinstance(values, list) or \
+            not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        raise ValueError("%s must be a list of numbers" % what)
+    return values
+
+
+def load(path):
+    """Add the fluids and analytes of a JSON data file to the library,
+    replacing any of the same name. The file has a 'fluids' object mapping
+    each name to its density (kg/m^3), resistivity (Ohm*m), viscosity (Pa*s)
+    and the name of its analyte, false where unknown, and optionally
+    'tables' of 'temperature' (K) with the 'density' and 'viscosity' at each
+    temperature. An 'analytes' object maps each analyte name to lists of its
+    diffusivities, initial_concentrations, radii and charges
+
+    :param str path: Path of the data file
+    :returns: list -- names of the fluids added
+    :raises: ValueError if the file isn't laid out as described
+    """
+    _ensure_loaded()
+    return _load(path)
+
+
+def _load(path):
+    with open(path) as infile:
+        data = json.load(infile)
+    if not isinstance(data, dict):
+        raise ValueError("%s must hold a JSON object" % path)
+
+    analytes = {}
+    for name, record in data.get('analytes', {}).items():
+        analytes[name] = {}
+        for key in ANALYTE_PROPERTIES:
+            value = record.get(key, False)
+            if value is not False:
+                value = tuple(_number_list(value, "analyte '%s' %s" % (name, key)))
+            analytes[name][key] = value
+
+    fluids = {}
+    for name, record in data.get('fluids', {}).items():
+        fluid = {key: record.get(key, False) for key in PROPERTIES}
+        for key, value in fluid.items():
+            if value is not False and (not isinstance(value, (int, float)) or
+                                       isinstance(value, bool) or value <= 0):
+                raise ValueError("fluid '%s' %s must be a positive number or false" % (name, key))
+        fluid['analyte'] = record.get('analyte', 'none')
+        if fluid['analyte'] not in analytes and fluid['analyte'] not in _analytes:
+            raise ValueError("fluid '%s' has unknown analyte '%s'" % (name, fluid['analyte']))
+
+        # Viscosity falls off roughly exponentially with temperature so its
+        # logarithm is interpolated, density is close to linear
+        fluid['tables'] = {}
+        tables = record.get('tables')
+        if tables is not None:
+            temperature = np.array(_number_list(tables.get('temperature'),
+                                                "fluid '%s' temperature table" % name), dtype=float)
+            if len(temperature) < 2 or np.any(np.diff(temperature) <= 0):
+                raise ValueError("fluid '%s' temperature table must be increasing with at least "
+                                 "two entries" % name)
+            fluid['tables']['temperature'] = temperature
+            for key in TEMPERATURE_PROPERTIES:
+                if key not in tables:
+                    continue
+                values = np.array(_number_list(tables[key], "fluid '%s' %s table" % (name, key)),
+                                  dtype=float)
+                if len(values) != len(temperature) or np.any(values <= 0):
+                    raise ValueError("fluid '%s' %s table must have a positive value at each "
+                                     "temperature" % (name, key))
+                fluid['tables'][key] = np.log(values) if key == 'viscosity' else values
+        fluids[name] = fluid
+
+    _analytes.update(analytes)
+    _fluids.update(fluids)
+    # Fluids made from the replaced records are no longer handed out
+    for key in [key for key in _instances if key[0] in fluids]:
+        del _instances[key]
+    return list(fluids)
+
+
+def _ensure_loaded():
+    global _loaded
+    if not _loaded:
+        _loaded = True
+        _load(DATA_PATH)
+
+
+def names():
+    """Names of every fluid in the library
+
+    :returns: list -- sorted names
+    """
+    _ensure_loaded()
+    return sorted(_fluids)
+
+
+def temperature_range(name):
+    """Temperatures a fluid's properties can be interpolated between
+
+    :param str name: Name of the fluid
+    :returns: tuple -- (lowest, highest) temperature (K), None if the fluid
+        has no temperature tables
+    :raises: ValueError if the fluid isn't in the library
+    """
+    tables = _record(name)['tables']
+    if not tables:
+        return None
+    return float(tables['temperature'][0]), float(tables['temperature'][-1])
+
+
+def in_range(fluid_names, temperatures):
+    """Whether each fluid has tables covering its temperature, for checking
+    many ports at once
+
+    :param list fluid_names: Name of each port's fluid, all in the library
+    :param temperatures: Temperature of each (K), NaN or None for the
+        nominal properties which are always available
+    :returns: ndarray -- bool for each port
+    """
+    temperatures = np.array([np.nan if t is None else t for t in temperatures], dtype=float)
+    valid = np.isnan(temperatures)
+    for name in set(fluid_names):
+        rows = np.array([fluid == name for fluid in fluid_names], dtype=bool) & ~valid
+        limits = temperature_range(name)
+        if limits is not None:
+            valid[rows] = (temperatures[rows] >= limits[0]) & (temperatures[rows] <= limits[1])
+    return valid
+
+
+def _record(name):
+    _ensure_loaded()
+    try:
+        return _fluids[name]
+    except KeyError:
+        raise ValueError("Unknown fluid '%s', must be one of %s" % (name, sorted(_fluids)))
+
+
+def _interpolate(name, temperatures):
+    """Density and viscosity of a fluid at each temperature
+
+    :returns: dict -- property to array of its values, properties without a
+        table keep their nominal value
+    """
+    record = _record(name)
+    tables = record['tables']
+    limits = temperature_range(name)
+    if limits is None:
+        raise ValueError("fluid '%s' has no properties at different temperatures" % name)
+    if np.any(temperatures < limits[0]) or np.any(temperatures > limits[1]):
+        raise ValueError("fluid '%s' properties are only known from %s K to %s K" %
+                         (name, limits[0], limits[1]))
+    values = {}
+    for key in TEMPERATURE_PROPERTIES:
+        if key not in tables:
+            values[key] = np.full(len(temperatures), record[key])
+        else:
+            values[key] = np.interp(temperatures, tables['temperature'], tables[key])
+            if key == 'viscosity':
+                values[key] = np.exp(values[key])
+    return values
+
+
+def _trim():
+    """Forget the least recently used Fluids beyond MAX_INSTANCES, ports
+    keep the values of their Fluid so nothing is lost but the sharing
+    """
+    while len(_instances) > MAX_INSTANCES:
+        _instances.popitem(last=False)
+
+
+def _create(name, temperature, properties):
+    record = _record(name)
+    analyte = _analytes[record['analyte']]
+    fluid = object.__new__(Fluid)
+    values = {'name': name,
+              'temperature': temperature,
+              'min_density': record['density'],
+              'min_resistivity': record['resistivity'],
+              'min_viscosity': record['viscosity'],
+              'min_pressure': False}
+    values.update(('min_' + key, value) for key, value in properties.items())
+    values.update(('analyte_' + key, analyte[key]) for key in ANALYTE_PROPERTIES)
+    for key, value in values.items():
+        object.__setattr__(fluid, key, value)
+    return fluid
+
+
+class Fluid():
+    """Properties of one of the fluids in the library at a temperature, so
+    researchers can simply provide the fluid name instead of several of its
+    properties. There is a single Fluid for each name and temperature which
+    is shared by every port using it, so it can't be changed
+    """
+
+    __slots__ = ('name', 'temperature', 'min_density', 'min_resistivity', 'min_viscosity',
+                 'min_pressure', 'analyte_diffusivities', 'analyte_initial_concentrations',
+                 'analyte_radii', 'analyte_charges')
+
+    def __new__(cls, name='default', temperature=None):
+        """
+        :param str name: Name of the fluid in the library
+        :param float temperature: Temperature of the fluid (K), its density
+            and viscosity are interpolated from its tables, None for its
+            nominal properties
+        :raises: ValueError if the fluid isn't in the library or has no
+            tables covering the temperature
+        """
+        if temperature is not None:
+            temperature = float(temperature)
+        key = (name, temperature)
+        fluid = _instances.get(key)
+        if fluid is None:
+            properties = {}
+            if temperature is not None:
+                properties = {prop: float(values[0]) for prop, values in
+                              _interpolate(name, np.array([temperature])).items()}
+            fluid = _instances[key] = _create(name, temperature, properties)
+            _trim()
+        else:
+            _instances.move_to_end(key)
+        return fluid
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Fluid is shared by every port using it and can't be changed, "
+                             "use with_properties to make a modified copy")
+
+    def __delattr__(self, key):
+        raise AttributeError("Fluid is shared by every port using it and can't be changed")
+
+    def __reduce__(self):
+        if _instances.get((self.name, self.temperature)) is self:
+            return (Fluid, (self.name, self.temperature))
+        return (_modified, ({key: getattr(self, key) for key in self.__slots__},))
+
+    def updateFluidProperties(self, *args, **kwargs):
+        """Fluids are shared by every port using them so they can't be
+        updated in place, use with_properties and keep the Fluid it returns
+
+        :raises: AttributeError always, so callers relying on the update
+            don't silently keep the old values
+        """
+        raise AttributeError("Fluid is shared by every port using it and can't be updated, "
+                             "use fluid = fluid.with_properties(...) instead")
+
+    def with_properties(self,
+                        min_density=False,
+                        min_viscosity=False,
+                        min_pressure=False,
+                        min_resistivity=False
+                        ):
+        """If the user wants to tweek the values of the fluids manually, call
+        this method. Fluids are shared so a new one is returned with these
+        values rather than changing this one
+        TODO: Currently all parameters have to be provided, make it so only the ones
+              provided are updated
+              Currently there is no way to update the analyte parameters
+              (diffusivity, concentration, etc)
+
+        :returns: Fluid -- copy of this fluid with the given properties
+        """
+        values = {key: getattr(self, key) for key in self.__slots__}
+        values.update(min_density=min_density, min_viscosity=min_viscosity,
+                      min_pressure=min_pressure, min_resistivity=min_resistivity)
+        return _modified(values)
+
+    def analytes(self):
+        """Analyte properties as they're stored on a port, each port gets its
+        own lists so changing them doesn't change the fluid
+
+        :returns: dict -- analyte_ attribute to a list, or False if unknown
+        """
+        analytes = {}
+        for key in ANALYTE_PROPERTIES:
+            value = getattr(self, 'analyte_' + key)
+            analytes['analyte_' + key] = False if value is False else list(value)
+        return analytes
+
+    def __repr__(self):
+        """Representation of this object is all of the parameters together in a tuple
+        """
+        return repr((self.min_density, self.min_resistivity, self.min_viscosity, self.min_pressure))
+
+
+def _modified(values):
+    """Fluid outside of the library with the given values"""
+    fluid = object.__new__(Fluid)
+    for key, value in values.items():
+        object.__setattr__(fluid, key, value)
+    return fluid
+
+
+def lookup(fluid_names, temperatures=None):
+    """The shared Fluid of every port at once, the properties of each fluid
+    are interpolated at all of its new temperatures in one call
+
+    :param list fluid_names: Name of each port's fluid
+    :param temperatures: Temperature of each port (K), NaN or None for the
+        nominal properties, defaults to nominal for every port
+    :returns: list -- Fluid of each port
+    :raises: ValueError if a fluid isn't in the library or a temperature
+        isn't covered by its tables
+    """
+    fluid_names = [str(name) for name in fluid_names]
+    if temperatures is None:
+        keys = [(name, None) for name in fluid_names]
+    else:
+        keys = [(name, None if t is None or np.isnan(t) else float(t))
+                for name, t in zip(fluid_names, temperatures)]
+
+    # Only create the Fluids that aren't shared yet, grouped by fluid
+    missing = {}
+    for name, temperature in set(keys) - set(_instances):
+        missing.setdefault(name, []).append(temperature)
+    for name, temps in missing.items():
+        if None in temps:
+            temps.remove(None)
+            _instances[(name, None)] = _create(name, None, {})
+        if temps:
+            values = _interpolate(name, np.array(temps))
+            for idx, temperature in enumerate(temps):
+                _instances[(name, temperature)] = _create(
+                    name, temperature, {key: float(column[idx]) for key, column in values.items()})
+    port_fluids = [_instances[key] for key in keys]
+    for key in set(keys):
+        _instances.move_to_end(key)
+    _trim()
+    return port_fluids
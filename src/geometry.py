@@ -0,0 +1,182 @@
+import math
+from collections import defaultdict
+from dreal.symbolic import logical_or
+
+from . import algorithms
+
+
+def enabled(dg):
+    """Whether channels of this schematic are kept from crossing each other
+
+    :param DiGraph dg: Graph of the schematic
+    :returns: bool
+    """
+    return bool(dg.graph.get('non_crossing', False))
+
+
+def is_set(value):
+    """Whether a coordinate or length was given by the user, 0 and False
+    both mean it's left to the solver
+
+    :returns: bool
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and bool(value)
+
+
+def node_boxes(dg, dim, model=None):
+    """Region each node can be placed in, a point for nodes the user placed,
+    the interval found by an earlier solve or else the whole chip
+
+    :param DiGraph dg: Graph of the schematic
+    :param list dim: dimensions of the overall chip, [X_min, Y_min, X_max, X_min] (m)
+    :param model: Solved model whose intervals bound the node positions
+    :returns: dict -- node name to (x_min, y_min, x_max, y_max)
+    """
+    intervals = {str(var): (interval.lb(), interval.ub())
+                 for var, interval in model.items()} if model else {}
+    boxes = {}
+    for name, attrs in dg.nodes(data=True):
+        bounds = []
+        for key, low, high in (('x', dim[0], dim[2]), ('y', dim[1], dim[3])):
+            if is_set(attrs.get('min_' + key)):
+                bounds.append((attrs['min_' + key],) * 2)
+            else:
+                var = algorithms.retrieve(dg, name, key)
+                bounds.append(intervals.get(str(var), (low, high)))
+        boxes[name] = (bounds[0][0], bounds[1][0], bounds[0][1], bounds[1][1])
+    return boxes
+
+
+class GridIndex():
+    """Uniform grid over the chip where each channel is stored in every cell
+    its bounding box touches, so only channels sharing a cell are compared
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        self.boxes = {}
+
+    def _cells(self, box):
+        x_min, y_min, x_max, y_max = (int(math.floor(bound / self.cell_size)) for bound in box)
+        for i in range(x_min, x_max + 1):
+            for j in range(y_min, y_max + 1):
+                yield i, j
+
+    def insert(self, key, box):
+        self.boxes[key] = box
+        for cell in self._cells(box):
+            self.cells[cell].append(key)
+
+    def pairs(self):
+        """Find every pair of stored items whose bounding boxes overlap
+
+        :returns: set -- (key, key) pairs in insertion order
+        """
+        order = {key: i for i, key in enumerate(self.boxes)}
+        found = set()
+        for keys in self.cells.values():
+            for i, first in enumerate(keys):
+                for second in keys[i + 1:]:
+                    pair = (first, second) if order[first] < order[second] else (second, first)
+                    if pair in found:
+                        continue
+                    a, b = self.boxes[first], self.boxes[second]
+                    if a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]:
+                        found.add(pair)
+        return found
+
+
+def candidate_pairs(dg, dim, model=None, clearance=0, cell_size=None):
+    """Find the pairs of channels that could come near each other, channels
+    sharing a node are left out since they meet there by design
+
+    :param DiGraph dg: Graph of the schematic
+    :param list dim: dimensions of the overall chip
+    :param model: Solved model whose intervals bound the node positions
+    :param float clearance: Distance the channels' bounding boxes are grown by
+    :param float cell_size: Size of the grid cells, by default the larger of
+        the typical channel extent and the chip size over the square root of
+        the number of channels
+    :returns: list -- sorted ((port_from, port_to), (port_from, port_to)) pairs
+    """
+    nodes = node_boxes(dg, dim, model)
+    boxes = {}
+    for port_from, port_to in dg.edges:
+        a, b = nodes[port_from], nodes[port_to]
+        boxes[(port_from, port_to)] = (min(a[0], b[0]) - clearance, min(a[1], b[1]) - clearance,
+                                       max(a[2], b[2]) + clearance, max(a[3], b[3]) + clearance)
+    if not boxes:
+        return []
+    if cell_size is None:
+        extents = sorted(max(box[2] - box[0], box[3] - box[1]) for box in boxes.values())
+        chip = max(dim[2] - dim[0], dim[3] - dim[1])
+        cell_size = max(extents[len(extents) // 2], chip / math.sqrt(len(boxes)))
+        if cell_size <= 0:
+            cell_size = 1
+    index = GridIndex(cell_size)
+    for channel_name, box in boxes.items():
+        index.insert(channel_name, box)
+    return sorted((first, second) for first, second in index.pairs()
+                  if not set(first) & set(second))
+
+
+def _orientation(dg, p, q, r):
+    """Twice the signed area of the triangle p, q, r, positive if counter
+    clockwise"""
+    px, py = algorithms.retrieve(dg, p, 'x'), algorithms.retrieve(dg, p, 'y')
+    qx, qy = algorithms.retrieve(dg, q, 'x'), algorithms.retrieve(dg, q, 'y')
+    rx, ry = algorithms.retrieve(dg, r, 'x'), algorithms.retrieve(dg, r, 'y')
+    return (qx - px) * (ry - py) - (qy - py) * (rx - px)
+
+
+def _crosses(boxes, first, second):
+    """Whether two channels between fixed points cross"""
+    def orientation(p, q, r):
+        return (boxes[q][0] - boxes[p][0]) * (boxes[r][1] - boxes[p][1]) - \
+            (boxes[q][1] - boxes[p][1]) * (boxes[r][0] - boxes[p][0])
+    a, b = first
+    c, d = second
+    return orientation(a, b, c) * orientation(a, b, d) < 0 and \
+        orientation(c, d, a) * orientation(c, d, b) < 0
+
+
+def translate_non_crossing(dg, dim, model=None, clearance=0, cell_size=None):
+    """Create SMT expressions keeping channels that could come near each other
+    from crossing, the ends of one channel can't be strictly on opposite sides
+    of the other channel while the other's ends are on opposite sides of it
+
+    The intervals a model found for the free coordinates prune pairs as well
+    as the coordinates the user placed, and are asserted again so no node
+    can leave its box and cross a channel it wasn't paired with. Without a
+    model a free node can be anywhere on the chip so each of its channels is
+    paired with every other channel.
+
+    :param DiGraph dg: Graph of the schematic
+    :param list dim: dimensions of the overall chip
+    :param model: Solved model whose intervals bound the node positions
+    :param float clearance: Distance the channels' bounding boxes are grown by
+    :param float cell_size: Size of the grid cells
+    :returns: list -- SMT expressions, the bounds from the model and one per
+        pair of channels that could cross
+    """
+    exprs = []
+    if model:
+        intervals = {str(var): interval for var, interval in model.items()}
+        for name, attrs in dg.nodes(data=True):
+            for key in ('x', 'y'):
+                var = algorithms.retrieve(dg, name, key)
+                if not is_set(attrs.get('min_' + key)) and str(var) in intervals:
+                    exprs.append(var >= intervals[str(var)].lb())
+                    exprs.append(var <= intervals[str(var)].ub())
+    boxes = node_boxes(dg, dim, model)
+    for first, second in candidate_pairs(dg, dim, model, clearance, cell_size):
+        if all(boxes[name][0] == boxes[name][2] and boxes[name][1] == boxes[name][3]
+               for name in first + second) and not _crosses(boxes, first, second):
+            # Both channels are placed already and don't cross
+            continue
+        a, b = first
+        c, d = second
+        exprs.append(logical_or(_orientation(dg, a, b, c) * _orientation(dg, a, b, d) >= 0,
+                                _orientation(dg, c, d, a) * _orientation(dg, c, d, b) >= 0))
+    return exprs
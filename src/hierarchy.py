@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from . import algorithms, solution
+
+# Attributes of the nodes connecting a subcircuit to the rest of the chip
+# whose bounds are passed up to the top level problem
+INTERFACE_ATTRIBUTES = ('pressure', 'flow_rate')
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pymanifold')
+# Times the top level is solved again with the witnesses of the subcircuits
+# that had no solution at its interface values before the whole schematic is
+# solved at once instead
+MAX_ROUNDS = 3
+
+
+def fingerprint(data):
+    """Hash plain data (as returned by Schematic.to_plain) so identical
+    subcircuits or designs map to the same cache entry
+
+    :param data: JSON serializable data, anything else is hashed by its repr
+    :returns: str -- hex digest of the data
+    """
+    encoded = json.dumps(data, sort_keys=True, default=repr)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def split_subcircuit(dg, members):
+    """Find the nodes of a subcircuit that have channels to the rest of the
+    chip and the kind they take when the subcircuit is solved on its own,
+    a node only fed from outside becomes an input and a node only draining
+    to the outside becomes an output, any other node keeps its kind
+
+    :param DiGraph dg: Graph of the whole schematic
+    :param set members: Names of the nodes in the subcircuit
+    :returns: dict -- interface node name to its kind within the subcircuit
+    """
+    interface = {}
+    for name in members:
+        outside_in = any(node not in members for node in dg.pred[name])
+        outside_out = any(node not in members for node in dg.succ[name])
+        if not (outside_in or outside_out):
+            continue
+        inside_in = any(node in members for node in dg.pred[name])
+        inside_out = any(node in members for node in dg.succ[name])
+        kind = dg.nodes[name]['kind']
+        if outside_in and not inside_in:
+            kind = 'input'
+        elif outside_out and not inside_out:
+            kind = 'output'
+        interface[name] = kind
+    return interface
+
+
+def solve_subcircuit(spec):
+    """Solve a single subcircuit, this runs in a worker process so it only
+    takes plain data and creates its own dReal Variables
+
+    :param dict spec: dim, nodes and edges of the subcircuit as given by
+        Schematic.to_plain and the names of its interface nodes, optionally
+        'pins' of interface node name to the [lower, upper] bounds each of
+        its attributes must stay within
+    :returns: dict -- interface node name to the [lower, upper] bounds of each
+        of its INTERFACE_ATTRIBUTES, or None if there is no solution
+    """
+    # Imported here since pymanifold imports this module
+    from .pymanifold import Schematic
+
+    sch = Schematic.from_plain(spec['dim'], spec['nodes'], spec['edges'])
+    sch.translate_schematic()
+    for name, attrs in spec.get('pins', {}).items():
+        for attr, (lower, upper) in attrs.items():
+            sch.exprs.append(algorithms.retrieve(sch.dg, name, attr) >= lower)
+            sch.exprs.append(algorithms.retrieve(sch.dg, name, attr) <= upper)
+    model = sch.invoke_backend(False)
+    if not model:
+        return None
+    intervals = {str(var): interval for var, interval in model.items()}
+    bounds = {}
+    for name in spec['interface']:
+        bounds[name] = {}
+        for attr in INTERFACE_ATTRIBUTES:
+            interval = intervals.get(name + '_' + attr)
+            if interval is not None:
+                bounds[name][attr] = [interval.lb(), interval.ub()]
+    return bounds
+
+
+def _read_cache(cache_dir, key):
+    """Returns (True, bounds) if this subcircuit was solved in a previous run
+    """
+    path = os.path.join(cache_dir, key + '.json')
+    try:
+        with open(path) as infile:
+            return True, json.load(infile)['bounds']
+    except (OSError, ValueError, KeyError):
+        return False, None
+
+
+def _write_cache(cache_dir, key, bounds):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + '.json')
+    with open(path, 'w') as outfile:
+        json.dump({'bounds': bounds}, outfile)
+
+
+def solve_subcircuits(specs, processes=None, cache_dir=DEFAULT_CACHE_DIR):
+    """Solve every subcircuit that isn't already cached, in parallel
+
+    :param list specs: Subcircuit descriptions passed to solve_subcircuit
+    :param int processes: Number of worker processes, 1 solves them in this process
+    :param str cache_dir: Directory to cache the results in, False to disable
+    :returns: list -- result of solve_subcircuit for each spec
+    """
+    keys = [fingerprint(spec) for spec in specs]
+    results = [None] * len(specs)
+    todo = []
+    for idx, key in enumerate(keys):
+        found = False
+        if cache_dir:
+            found, results[idx] = _read_cache(cache_dir, key)
+        if not found:
+            todo.append(idx)
+
+    if processes == 1 or len(todo) <= 1:
+        solved = [solve_subcircuit(specs[idx]) for idx in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            solved = list(pool.map(solve_subcircuit, [specs[idx] for idx in todo]))
+
+    for idx, bounds in zip(todo, solved):
+        results[idx] = bounds
+        if cache_dir:
+            _write_cache(cache_dir, keys[idx], bounds)
+    return results
+
+
+def _solve_top(top, exprs, hints, show):
+    """Solve the top level with its interface nodes within the bounds of
+    each of hints, results of solve_subcircuit
+    """
+    top.exprs = list(exprs)
+    for bounds in hints:
+        for name, attrs in bounds.items():
+            for attr, (lower, upper) in attrs.items():
+                top.exprs.append(algorithms.retrieve(top.dg, name, attr) >= lower)
+                top.exprs.append(algorithms.retrieve(top.dg, name, attr) <= upper)
+    return top.invoke_backend(show)
+
+
+def _failed_checks(specs, model, processes, cache_dir):
+    """Solve each subcircuit again with its interface nodes held within the
+    bounds the top level found
+
+    :returns: list -- indices of the subcircuits without a solution there
+    """
+    checks = []
+    for spec in specs:
+        pins = {}
+        for name in spec['interface']:
+            for attr in INTERFACE_ATTRIBUTES:
+                try:
+                    lower, upper = model.bounds(name, attr)
+                except ValueError:
+                    continue
+                pins.setdefault(name, {})[attr] = [float(lower), float(upper)]
+        checks.append(dict(spec, pins=pins))
+    return [idx for idx, bounds in enumerate(solve_subcircuits(checks, processes, cache_dir))
+            if bounds is None]
+
+
+def solve_hierarchical(sch, subcircuits, processes=None, cache_dir=DEFAULT_CACHE_DIR, show=False):
+    """Solve each subcircuit independently, then solve the top level circuit
+    where each subcircuit is reduced to its interface nodes, and finally
+    solve each subcircuit again with its interface nodes held at the values
+    the top level found
+
+    The box dReal returns for one solution of a subcircuit on its own is
+    only a witness, not the range its interface can take, so the top level
+    is first tried with its interface nodes within every witness and then
+    without them. A subcircuit that has no solution at the values the top
+    level chose has its witness added back and the top level is solved
+    again, up to MAX_ROUNDS times. A SAT result has every subcircuit
+    consistent with the top level solution. The interface nodes of the top
+    level and of each subcircuit on their own take the kind of a port, so
+    their UNSAT proves nothing about the design and whenever no consistent
+    solution is found the whole schematic is solved at once instead
+
+    :param Schematic sch: Schematic to solve
+    :param list subcircuits: Each entry is a collection of node names
+    :param int processes: Number of subcircuits to solve in parallel
+    :param str cache_dir: Directory to cache subcircuit results between runs,
+        False to disable
+    :param bool show: If true then the top level SMT formula is printed
+    :returns: solution.Solution of the top level circuit, or of the whole
+        schematic if the hierarchy found no consistent solution
+    :raises: ValueError if the subcircuits are not disjoint sets of nodes
+    """
+    if cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+    owner = {}
+    interfaces = []
+    specs = []
+    for idx, members in enumerate(subcircuits):
+        members = set(members)
+        for name in members:
+            if name not in sch.dg.nodes:
+                raise ValueError("Subcircuit node %s is not in the schematic" % name)
+            if name in owner:
+                raise ValueError("Node %s is in more than one subcircuit" % name)
+            owner[name] = idx
+        interface = split_subcircuit(sch.dg, members)
+        nodes, edges = sch.to_plain(members)
+        nodes = [(name, dict(attrs, kind=interface.get(name, attrs['kind'])))
+                 for name, attrs in nodes]
+        specs.append({'dim': list(sch.dim),
+                      'nodes': nodes,
+                      'edges': edges,
+                      'interface': sorted(interface)
+                      })
+        interfaces.append(interface)
+
+    results = solve_subcircuits(specs, processes, cache_dir)
+    if all(bounds is not None for bounds in results):
+        model = _solve_levels(sch, specs, results, owner, interfaces, processes, cache_dir, show)
+        if model:
+            return model
+    # Solved at once the status is definitive
+    sch.translate_schematic()
+    return sch.invoke_backend(show)
+
+
+def _solve_levels(sch, specs, results, owner, interfaces, processes, cache_dir, show):
+    """Solve the top level until every subcircuit has a solution at its
+    interface values, see solve_hierarchical
+
+    :returns: solution.Solution of the top level, UNSAT if no consistent
+        solution was found
+    """
+    # Top level keeps everything outside the subcircuits plus their interface
+    # nodes, and only the channels that aren't inside a single subcircuit
+    interior = {name for name, idx in owner.items() if name not in interfaces[idx]}
+    nodes, edges = sch.to_plain([name for name in sch.dg.nodes if name not in interior])
+    edges = [(port_from, port_to, attrs) for port_from, port_to, attrs in edges
+             if port_from not in owner or owner[port_from] != owner.get(port_to)]
+    sources = {port_from for port_from, _, _ in edges}
+    targets = {port_to for _, port_to, _ in edges}
+    top_nodes = []
+    for name, attrs in nodes:
+        if name in owner:
+            if name in sources and name not in targets:
+                attrs = dict(attrs, kind='input')
+            elif name in targets and name not in sources:
+                attrs = dict(attrs, kind='output')
+        top_nodes.append((name, attrs))
+
+    top = type(sch).from_plain(sch.dim, top_nodes, edges)
+    top.translate_schematic()
+    exprs = list(top.exprs)
+    hinted = list(range(len(specs)))
+    for _ in range(MAX_ROUNDS):
+        model = _solve_top(top, exprs, [results[idx] for idx in hinted], show)
+        if not model and hinted:
+            # The witnesses of adjacent subcircuits may not agree, the
+            # interface is left for the top level to choose
+            hinted = []
+            model = _solve_top(top, exprs, [], show)
+        if not model:
+            return model
+        failed = _failed_checks(specs, model, processes, cache_dir)
+        if not failed:
+            return model
+        if set(failed) <= set(hinted):
+            # Holding them to their witnesses didn't help
+            break
+        hinted = sorted(set(hinted) | set(failed))
+    return solution.Solution(solution.UNSAT)
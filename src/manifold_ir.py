@@ -0,0 +1,282 @@
+import json
+
+# Port kinds in Manifold's intermediate representation, every other node
+# kind is created with Schematic.node
+PORT_KINDS = ('input', 'output')
+# Graph attributes of the constraints section that are read, only when asked
+# for since they change how every later solve is done
+SOLVE_SETTINGS = ('normalize', 'scale', 'non_crossing')
+
+
+class JsonStream():
+    """Incremental reader of a JSON document so large files can be processed
+    one object member at a time instead of loading everything into memory
+    """
+
+    def __init__(self, infile, chunk_size=1 << 20):
+        """
+        :param infile: File object opened in text mode
+        :param int chunk_size: Number of characters read from the file at once
+        """
+        self.infile = infile
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Read the next chunk of the file, dropping what's been parsed already
+
+        :returns: bool -- False if the end of the file was already reached
+        """
+        if self.eof:
+            return False
+        chunk = self.infile.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, '' at the end of the file
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Expected '%s' in JSON at character %s" % (char, self.pos))
+        self.pos += 1
+
+    def value(self):
+        """Parse the next complete JSON value, reading more of the file
+        until it is all in the buffer
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def members(self):
+        """Iterate over the keys of the next JSON object, after each key the
+        caller must consume its value with value, members or skip
+
+        :returns: generator of the keys of the object
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == '}':
+                return
+            elif char != ',':
+                raise ValueError("Expected ',' or '}' in JSON at character %s" % self.pos)
+
+    def skip(self):
+        """Consume the next value without keeping it, objects are parsed a
+        member at a time
+        """
+        if self.peek() == '{':
+            for _ in self.members():
+                self.skip()
+        else:
+            self.value()
+
+
+def parameter(attributes, key, default=False):
+    """Find the value of a user defined parameter in the attributes of an IR
+    node or connection, either as min_key as written by Schematic.to_json or
+    as key when it is a single number, intervals found by a solver are ignored
+
+    :param dict attributes: Attributes of the IR node or connection
+    :param str key: Name of the parameter without min_
+    :returns: The value of the parameter or default if it isn't defined
+    """
+    for name in ('min_' + key, key):
+        value = attributes.get(name)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+    return default
+
+
+class _Columns():
+    """Rows of a bulk insert collected as lists, one per column
+    """
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.clear()
+
+    def clear(self):
+        self.columns = {key: [] for key in self.keys}
+        self.ids = []
+
+    def append(self, ir_id, row):
+        self.ids.append(ir_id)
+        for key in self.keys:
+            self.columns[key].append(row[key])
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _flush(insert, rows, problems):
+    """Bulk insert the collected rows and record any rows that failed by
+    their id in the IR
+    """
+    if len(rows):
+        for row, message in insert(rows.columns):
+            problems.append("%s: %s" % (rows.ids[row], message))
+    rows.clear()
+
+
+def from_json(cls, path, dim, batch_size=10000, solve_settings=False):
+    """Read a schematic from Manifold's intermediate representation, see
+    Schematic.from_json
+
+    :param cls: Schematic class to create
+    :param str path: Path of the IR json file
+    :param list dim: dimensions of the overall chip, [X_min, Y_min, X_max, X_min] (m)
+    :param int batch_size: Number of nodes or channels to collect before
+        inserting them, channels listed before the nodes are kept until all
+        of the nodes have been read
+    :param bool solve_settings: Read the SOLVE_SETTINGS stored in the graph
+        attributes of the constraints section
+    :returns: Schematic
+    :raises: ValueError listing every node or connection that couldn't be added
+    """
+    sch = cls(dim)
+    ports = _Columns(('name', 'kind', 'min_pressure', 'min_flow_rate', 'x', 'y',
+                      'fluid_name', 'temperature', 'min_viscosity', 'min_density',
+                      'min_resistivity', 'analyte_diffusivities',
+                      'analyte_initial_concentrations', 'analyte_radii',
+                      'analyte_charges'))
+    nodes = _Columns(('name', 'kind', 'x', 'y', 'c', 'p', 'qf', 'droplet_surrogate'))
+    # Channels can only be added once both of their nodes exist, so they're
+    # only inserted in batches once the nodes section has been read
+    channels = _Columns(('port_from', 'port_to', 'min_length', 'min_width',
+                         'min_height', 'min_depth', 'min_resolution', 'phase',
+                         'min_sampling_rate'))
+    problems = []
+    nodes_read = False
+
+    with open(path) as infile:
+        stream = JsonStream(infile)
+        for section in stream.members():
+            if section == 'nodes':
+                for ir_id in stream.members():
+                    ir_node = stream.value()
+                    attributes = ir_node.get('attributes', {})
+                    name = attributes.get('id', ir_node.get('portAttrs', ir_id))
+                    kind = ir_node.get('type', attributes.get('kind', 'node'))
+                    if 'voltage' in attributes:
+                        # Electrical ports are rare so they're added one at a time
+                        try:
+                            sch.elec_port(name, kind,
+                                          min_pressure=parameter(attributes, 'pressure'),
+                                          min_flow_rate=parameter(attributes, 'flow_rate'),
+                                          x=parameter(attributes, 'x'),
+                                          y=parameter(attributes, 'y'),
+                                          voltage=attributes['voltage'],
+                                          current=attributes.get('current', False),
+                                          fluid_name=attributes.get('fluid_name', 'default'),
+                                          temperature=parameter(attributes, 'temperature',
+                                                                None))
+                        except (TypeError, ValueError) as e:
+                            problems.append("%s: %s" % (ir_id, e))
+                        else:
+                            for key in ('viscosity', 'density', 'resistivity'):
+                                sch.dg.nodes[name]['min_' + key] = \
+                                    parameter(attributes, key, sch.dg.nodes[name]['min_' + key])
+                    elif kind in PORT_KINDS:
+                        ports.append(ir_id, {
+                            'name': name,
+                            'kind': kind,
+                            'min_pressure': parameter(attributes, 'pressure'),
+                            'min_flow_rate': parameter(attributes, 'flow_rate'),
+                            'x': parameter(attributes, 'x'),
+                            'y': parameter(attributes, 'y'),
+                            'fluid_name': attributes.get('fluid_name', 'default'),
+                            'temperature': parameter(attributes, 'temperature'),
+                            'min_viscosity': parameter(attributes, 'viscosity'),
+                            'min_density': parameter(attributes, 'density'),
+                            'min_resistivity': parameter(attributes, 'resistivity'),
+                            'analyte_diffusivities': attributes.get('analyte_diffusivities'),
+                            'analyte_initial_concentrations':
+                                attributes.get('analyte_initial_concentrations'),
+                            'analyte_radii': attributes.get('analyte_radii'),
+                            'analyte_charges': attributes.get('analyte_charges')
+                            })
+                    else:
+                        nodes.append(ir_id, {'name': name,
+                                             'kind': kind,
+                                             'x': parameter(attributes, 'x'),
+                                             'y': parameter(attributes, 'y'),
+                                             'c': attributes.get('c', 0.4),
+                                             'p': attributes.get('p', 0.5),
+                                             'qf': attributes.get('qf', 0.9),
+                                             'droplet_surrogate':
+                                                 attributes.get('droplet_surrogate', False)
+                                             })
+                    if len(ports) >= batch_size:
+                        _flush(sch.add_ports, ports, problems)
+                    if len(nodes) >= batch_size:
+                        _flush(sch.add_nodes, nodes, problems)
+                _flush(sch.add_ports, ports, problems)
+                _flush(sch.add_nodes, nodes, problems)
+                nodes_read = True
+                _flush(sch.add_channels, channels, problems)
+            elif section == 'connections':
+                for ir_id in stream.members():
+                    connection = stream.value()
+                    attributes = connection.get('attributes', {})
+                    channels.append(ir_id, {
+                        'port_from': connection.get('from'),
+                        'port_to': connection.get('to'),
+                        'min_length': parameter(attributes, 'length'),
+                        'min_width': parameter(attributes, 'width'),
+                        'min_height': parameter(attributes, 'height'),
+                        'min_depth': parameter(attributes, 'depth'),
+                        'min_resolution': parameter(attributes, 'resolution'),
+                        'phase': attributes.get('phase', 'None'),
+                        'min_sampling_rate': parameter(attributes, 'sampling_rate', 1)
+                        })
+                    if nodes_read and len(channels) >= batch_size:
+                        _flush(sch.add_channels, channels, problems)
+            elif section == 'constraints':
+                constraints = stream.value()
+                graph = constraints.get('graph')
+                if solve_settings and isinstance(graph, dict):
+                    sch.dg.graph.update((key, bool(graph[key])) for key in SOLVE_SETTINGS
+                                        if key in graph)
+            else:
+                stream.skip()
+
+    _flush(sch.add_ports, ports, problems)
+    _flush(sch.add_nodes, nodes, problems)
+    _flush(sch.add_channels, channels, problems)
+    if problems:
+        raise ValueError("Could not import %s:\n%s" % (path, '\n'.join(problems)))
+    return sch
@@ -0,0 +1,129 @@
+import time
+from dreal.symbolic import Variable
+
+# Constraints are rewritten while they're created since dReal expressions
+# can't be inspected after the fact, translate and algorithms check this
+# option of the schematic's graph to choose the polynomial form
+
+
+def enabled(dg):
+    """Whether the constraints of this schematic are emitted in polynomial form
+
+    :param DiGraph dg: Graph of the schematic
+    :returns: bool
+    """
+    return bool(dg.graph.get('normalize', False))
+
+
+def ratio(dg, lhs, numerator, denominator, nonzero):
+    """Create the SMT expression lhs == numerator / denominator, as
+    lhs * denominator == numerator when normalizing and the denominator is
+    known to never be 0, which makes the two equivalent
+
+    :param DiGraph dg: Graph of the schematic
+    :param lhs: Variable or expression being defined
+    :param numerator: Expression divided
+    :param denominator: Expression to divide by
+    :param bool nonzero: True if the constraints already created prove the
+        denominator can't be 0
+    :returns: SMT expression
+    """
+    if enabled(dg) and nonzero:
+        return lhs * denominator == numerator
+    return lhs == numerator / denominator
+
+
+class Radicals():
+    """Square roots and ratios replaced by auxiliary variables when
+    normalizing, s with s >= 0 and s * s == x stands in for x ** 0.5 and q
+    with q * d == n for n / d
+
+    The auxiliaries are kept in the node's attributes like the Variables from
+    algorithms.retrieve, so translating a node again (a junction is reached
+    once from each input) reuses them instead of making a second Variable
+    with the same name
+    """
+
+    def __init__(self, dg, prefix):
+        """
+        :param DiGraph dg: Graph of the schematic
+        :param str prefix: Start of the names of the auxiliary variables,
+            the name of the node being translated
+        """
+        self.dg = dg
+        self.prefix = prefix
+        self.exprs = []
+        self.counts = {}
+
+    def _auxiliary(self, kind):
+        """The next auxiliary variable of a kind, sqrt or ratio"""
+        attr = '%s_%s' % (kind, self.counts.get(kind, 0))
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        attrs = self.dg.nodes[self.prefix]
+        if not isinstance(attrs.get(attr), Variable):
+            attrs[attr] = Variable('%s_%s' % (self.prefix, attr))
+        return attrs[attr]
+
+    def sqrt(self, x):
+        """Square root of x, an auxiliary variable if normalizing
+
+        :param x: Expression to take the square root of
+        :returns: Variable or expression
+        """
+        if not enabled(self.dg):
+            return x ** 0.5
+        root = self._auxiliary('sqrt')
+        self.exprs.append(root >= 0)
+        self.exprs.append(root * root == x)
+        return root
+
+    def divide(self, numerator, denominator, nonzero):
+        """numerator / denominator, an auxiliary variable if normalizing and
+        the denominator can't be 0, see ratio
+
+        :param numerator: Expression divided
+        :param denominator: Expression to divide by
+        :param bool nonzero: True if the constraints already created prove the
+            denominator can't be 0
+        :returns: Variable or expression
+        """
+        if not (enabled(self.dg) and nonzero):
+            return numerator / denominator
+        quotient = self._auxiliary('ratio')
+        self.exprs.append(ratio(self.dg, quotient, numerator, denominator, nonzero))
+        return quotient
+
+
+def benchmark(build, repeats=1, show=False):
+    """Solve a schematic with and without normalization to compare them
+
+    :param build: Function that returns a new Schematic each time it's called,
+        each is only solved once
+    :param int repeats: Number of times to solve each form
+    :param bool show: If true then print the results
+    :returns: dict -- {'original': results, 'normalized': results} where the
+        results are a dict of the translate and solve times in seconds of each
+        repeat, the number of expressions and whether a solution was found
+    """
+    results = {}
+    for form, normalize in (('original', False), ('normalized', True)):
+        translate_times = []
+        solve_times = []
+        for _ in range(repeats):
+            sch = build()
+            sch.dg.graph['normalize'] = normalize
+            start = time.perf_counter()
+            sch.translate_schematic()
+            translated = time.perf_counter()
+            model = sch.invoke_backend(False)
+            translate_times.append(translated - start)
+            solve_times.append(time.perf_counter() - translated)
+        results[form] = {'translate_times': translate_times,
+                         'solve_times': solve_times,
+                         'expressions': len(sch.exprs),
+                         'solved': bool(model)}
+    if show:
+        for form, result in results.items():
+            print("%s: %s expressions, best solve %.4fs, solved %s" %
+                  (form, result['expressions'], min(result['solve_times']), result['solved']))
+    return results
@@ -0,0 +1,295 @@
+import math
+import numpy as np
+from dreal.symbolic import Variable
+
+from . import algorithms, fluids, paths, solution
+
+# Coefficients of the approximation of erf, same as algorithms.erf_approximation
+ERF_COEFFICIENTS = (0.278393, 0.230389, 0.000972, 0.078108)
+# Rule of thumb for the electroosmotic mobility, same as algorithms.calculate_mobility
+MOBILITY_EOF = 1.0 * 10**8
+
+
+def box_values(model):
+    """Find the value of every variable in a solved model, the midpoint of
+    the interval the solver found for it
+
+    :param model: Solution returned by Schematic.solve, a dReal Box or a
+        dict of variables or their names to Intervals
+    :returns: dict -- {variable name: float}
+    """
+    if isinstance(model, solution.Solution):
+        return model.values()
+    return {str(var): interval.mid() for var, interval in model.items()}
+
+
+def erf_approximation(x):
+    """NumPy version of algorithms.erf_approximation, extended to negative x
+    since erf is odd
+
+    :param ndarray x: Points to evaluate erf at
+    :returns: ndarray -- erf(x)
+    """
+    a1, a2, a3, a4 = ERF_COEFFICIENTS
+    x = np.asarray(x, dtype=float)
+    ax = np.abs(x)
+    return np.sign(x) * (1 - (1 + ax*(a1 + ax*(a2 + ax*(a3 + ax*a4))))**-4)
+
+
+def concentration(C0, D, W, v, x, t):
+    """NumPy version of algorithms.calculate_concentration, every argument is
+    broadcast against the others so analytes along one axis and times along
+    another are computed at once
+
+    :param ndarray C0: initial concentration of each analyte
+    :param ndarray D: diffusion coefficient of each analyte
+    :param float W: width of injection channel
+    :param ndarray v: velocity of each analyte in the separation channel
+    :param float x: coordinate in channel (m)
+    :param ndarray t: time since injection (s), must be positive
+    :returns: ndarray -- concentration
+    """
+    spread = 2*np.sqrt(D*t)
+    return C0/2.0 * (erf_approximation((W - x + v*t)/spread) +
+                     erf_approximation((W + x - v*t)/spread))
+
+
+def mobility(q, r, eta):
+    """NumPy version of algorithms.calculate_mobility
+
+    :param ndarray q: charge of each analyte
+    :param ndarray r: radius of each analyte
+    :param float eta: viscosity of the fluid in the separation channel
+    :returns: ndarray -- mobility of each analyte m^2 / (V s)
+    """
+    return np.asarray(q, dtype=float) / (4*math.pi*eta*np.asarray(r, dtype=float)) + MOBILITY_EOF
+
+
+def channel_resistance(w, h, mu, length):
+    """NumPy version of algorithms.calculate_channel_resistance
+    R = (12 * mu * L) / (w * h^3 * (1 - 0.630 (h/w)) )
+
+    :param ndarray w: width of the channels
+    :param ndarray h: height of the channels, must be less than w
+    :param ndarray mu: viscosity of the fluid in the channels
+    :param ndarray length: length of the channels
+    :returns: ndarray -- resistance kg/(m^4*s)
+    """
+    return (12 * (mu * length)) / (w * ((h ** 3) * (1 - (0.63 * (h / w)))))
+
+
+def droplet_volume(h, w, wIn, epsilon, qD, qC):
+    """NumPy version of algorithms.calculate_droplet_volume
+
+    :param ndarray h: Height of channel
+    :param ndarray w: Width of continuous/output channel
+    :param ndarray wIn: Width of dispersed_channel
+    :param ndarray epsilon: Equals 0.414*radius of rounded edge where channels join
+    :param ndarray qD: Flow rate in dispersed_channel
+    :param ndarray qC: Flow rate in continuous_channel
+    :returns: ndarray -- droplet volume m^3
+    """
+    q_gutter = 0.1
+    v_fill_simple = (3 * math.pi / 8) - (math.pi / 2) * (1 - math.pi / 4) * (h / w)
+    hw_parallel = (h * w) / (h + w)
+    r_pinch = w + ((wIn - (hw_parallel - epsilon)) +
+                   np.sqrt(2 * ((wIn - hw_parallel) * (w - hw_parallel))))
+    r_fill = w
+    alpha = (1 - (math.pi / 4)) * ((1 - q_gutter) ** -1) * \
+        (((r_pinch / w) ** 2 - (r_fill / w) ** 2) +
+         ((math.pi / 4) * (r_pinch / w) - (r_fill / w)) * (h / w))
+    return (h * (w * w)) * (v_fill_simple + (alpha * (qD / qC)))
+
+
+def electropherogram(C0, D, W, v, x_detector, times=None, n_samples=2000):
+    """Simulate the concentration measured by the detector of an
+    electrophoretic cross for every analyte over a grid of times
+
+    :param list C0: initial concentration of each analyte
+    :param list D: diffusion coefficient of each analyte
+    :param float W: width of injection channel
+    :param list v: velocity of each analyte in the separation channel
+    :param float x_detector: distance of the detector along the separation channel
+    :param ndarray times: Times to sample at, by default n_samples evenly
+        spaced times around the arrival of all of the analytes
+    :param int n_samples: Number of times to sample when times isn't given
+    :returns: dict -- with keys
+        times: the times sampled (s)
+        concentrations: concentration of each analyte at each time, analytes x times
+        trace: total concentration at each time, what the detector measures
+        t_peak: time each analyte reaches the detector, x_detector / v
+        peak_concentration: highest sampled concentration of each analyte
+        width: full width at half maximum of each peak (s)
+        order: analytes sorted by t_peak, the following are for each
+            pair of adjacent analytes in this order
+        t_min: time of the lowest total concentration between the peaks
+        min_concentration: lowest total concentration between the peaks
+        valley_ratio: min_concentration over the smaller of the two peaks,
+            the c of the ep_cross node bounds this
+        resolution: 1.18 times the time between the peaks over the sum of their widths
+    :raises: ValueError if the analyte properties are different lengths or
+        an analyte doesn't move towards the detector
+    """
+    C0, D, v = (np.asarray(values, dtype=float) for values in (C0, D, v))
+    if not C0.shape == D.shape == v.shape or C0.ndim != 1:
+        raise ValueError("Expecting the same number of values for each analyte property")
+    if (v <= 0).any():
+        raise ValueError("Every analyte must move towards the detector")
+    t_peak = x_detector / v
+    if times is None:
+        times = np.linspace(0.5*t_peak.min(), 1.5*t_peak.max(), n_samples)
+    times = np.asarray(times, dtype=float)
+    if (times <= 0).any():
+        raise ValueError("Times must be after the injection")
+
+    concentrations = concentration(C0[:, None], D[:, None], W, v[:, None], x_detector,
+                                   times[None, :])
+    trace = concentrations.sum(axis=0)
+    peaks = concentrations.argmax(axis=1)
+    peak_concentration = concentrations[np.arange(len(C0)), peaks]
+
+    # Width of each peak where it's above half its height
+    above = concentrations >= peak_concentration[:, None] / 2
+    first = above.argmax(axis=1)
+    last = len(times) - 1 - above[:, ::-1].argmax(axis=1)
+    width = times[last] - times[first]
+
+    order = np.argsort(t_peak, kind='stable')
+    t_min = []
+    min_concentration = []
+    for i, j in zip(order[:-1], order[1:]):
+        start, end = sorted((peaks[i], peaks[j]))
+        idx = start + trace[start:end + 1].argmin()
+        t_min.append(times[idx])
+        min_concentration.append(trace[idx])
+    t_min = np.array(t_min)
+    min_concentration = np.array(min_concentration)
+    smaller_peak = np.minimum(peak_concentration[order[:-1]], peak_concentration[order[1:]])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        valley_ratio = min_concentration / smaller_peak
+        resolution = 1.18 * np.diff(t_peak[order]) / (width[order[:-1]] + width[order[1:]])
+
+    return {'times': times,
+            'concentrations': concentrations,
+            'trace': trace,
+            't_peak': t_peak,
+            'peak_concentration': peak_concentration,
+            'width': width,
+            'order': order,
+            't_min': t_min,
+            'min_concentration': min_concentration,
+            'valley_ratio': valley_ratio,
+            'resolution': resolution}
+
+
+def _ep_cross_parts(dg, name):
+    """Find the channels of an electrophoretic cross from their phases,
+    the channel into it without a phase is the injection channel
+
+    :returns: tuple -- (injection port, injection channel, separation
+        channel, anode name, cathode name)
+    """
+    injection_port = injection_channel = separation_channel = anode = cathode = None
+    for channel_name in list(dg.in_edges(name)) + list(dg.out_edges(name)):
+        phase = dg.edges[channel_name].get('phase')
+        end = channel_name[channel_name[0] == name]
+        if phase == 'separation':
+            separation_channel, anode = channel_name, end
+        elif phase == 'tail':
+            cathode = end
+        elif channel_name[1] == name:
+            injection_channel, injection_port = channel_name, end
+    if None in (injection_port, separation_channel, anode, cathode):
+        raise ValueError("Electrophoretic Cross %s needs injection, separation and tail channels" %
+                         name)
+    return injection_port, injection_channel, separation_channel, anode, cathode
+
+
+def solved_value(dg, values, component, key):
+    """Value of a parameter, as the user defined it or as the solver found it
+
+    :param DiGraph dg: Graph of the schematic
+    :param dict values: Values of the solved variables from box_values
+    :param component: Name of the node or channel
+    :param str key: Name of the parameter without min_
+    :returns: float -- value of the parameter
+    :raises: ValueError if the model doesn't have a value for it
+    """
+    return _solved_value(dg, values, component, key, set())
+
+
+def _solved_value(dg, values, component, key, seen):
+    """solved_value, with viscosity falling back to the component upstream
+    since translate asserts it is carried along every channel unchanged
+
+    :param set seen: Components already tried, so loops end
+    """
+    seen.add(component)
+    user_value = dg.edges[component].get('min_' + key) if isinstance(component, tuple) else \
+        dg.nodes[component].get('min_' + key)
+    if user_value and not isinstance(user_value, bool):
+        return user_value
+    var = algorithms.retrieve(dg, component, key)
+    if not isinstance(var, Variable):
+        return var
+    if str(var) in values:
+        return values[str(var)]
+    if key == 'viscosity':
+        upstream = [component[0]] if isinstance(component, tuple) else \
+            list(dg.in_edges(component))
+        for other in upstream:
+            if other in seen:
+                continue
+            try:
+                return _solved_value(dg, values, other, key, seen)
+            except ValueError:
+                pass
+    raise ValueError("The model has no value for %s" % var)
+
+
+def simulate_ep_cross(sch, name, model=None, fluid_name=None, times=None, n_samples=2000):
+    """Simulate the electropherogram at the detector of a solved
+    electrophoretic cross, see electropherogram for what's returned
+
+    :param Schematic sch: Schematic containing the electrophoretic cross
+    :param str name: Name of the ep_cross node
+    :param model: Solved model, defaults to the last one sch.solve found
+    :param str fluid_name: Name of a fluid in the fluid library to take
+        the analyte properties from instead of the injection port
+    :param ndarray times: Times to sample at
+    :param int n_samples: Number of times to sample when times isn't given
+    :returns: dict -- see electropherogram
+    :raises: ValueError if there's no model or the cross isn't connected properly
+    """
+    model = sch.model if model is None else model
+    if not model:
+        raise ValueError("Schematic must be solved before simulating %s" % name)
+    values = box_values(model)
+    dg = sch.dg
+    injection_port, injection_channel, separation_channel, anode, cathode = \
+        _ep_cross_parts(dg, name)
+
+    if fluid_name is None:
+        analytes = [dg.nodes[injection_port].get(key) for key in
+                    ('analyte_initial_concentrations', 'analyte_diffusivities',
+                     'analyte_charges', 'analyte_radii')]
+    else:
+        fluid = fluids.Fluid(fluid_name)
+        analytes = [fluid.analyte_initial_concentrations, fluid.analyte_diffusivities,
+                    fluid.analyte_charges, fluid.analyte_radii]
+    if not all(analytes):
+        raise ValueError('No analyte properties defined for electrophoretic cross node %s' % name)
+    C0, D, q, r = analytes
+
+    # Constant field along the path between the electrodes, as in
+    # algorithms.calculate_electric_field
+    length = sum(solved_value(dg, values, channel_name, 'length')
+                 for channel_name in paths.service(dg).channels(cathode, anode))
+    E = (solved_value(dg, values, anode, 'voltage') -
+         solved_value(dg, values, cathode, 'voltage')) / length
+    v = mobility(q, r, solved_value(dg, values, separation_channel, 'viscosity')) * E
+    return electropherogram(C0, D,
+                            solved_value(dg, values, injection_channel, 'width'),
+                            v,
+                            solved_value(dg, values, separation_channel, 'x_detector'),
+                            times, n_samples)
@@ -0,0 +1,128 @@
+import weakref
+import networkx as nx
+
+# One service per graph so translate functions, which only get the graph,
+# share the paths found by the Schematic
+_services = weakref.WeakKeyDictionary()
+
+
+def _length(port_from, port_to, attrs):
+    """Dijkstra weight of a channel, its user defined length"""
+    length = attrs.get('min_length')
+    if not length:
+        raise ValueError("Channel %s -> %s needs a length to find the shortest path" %
+                         (port_from, port_to))
+    return length
+
+
+class PathService():
+    """Shortest paths between the nodes of a schematic, ignoring the direction
+    of the channels since an electric field doesn't depend on the flow.
+    The paths found from each start node are kept until the channels change,
+    Schematic.channel, add_channels and sweeps of a channel length drop them.
+    Nodes or channels added or removed directly on the graph are noticed from
+    its size, after editing a channel's min_length directly call invalidate
+    """
+
+    def __init__(self, dg):
+        """
+        :param DiGraph dg: Graph of the schematic
+        """
+        # The service is stored against the graph so it mustn't keep it alive
+        self._dg = weakref.ref(dg)
+        self.invalidate()
+
+    @property
+    def dg(self):
+        return self._dg()
+
+    def _size(self):
+        return (self.dg.number_of_nodes(), self.dg.number_of_edges())
+
+    def invalidate(self):
+        """Drop every cached path, needed after a channel's min_length is
+        changed on the graph directly
+        """
+        self._cache = {}
+        self._topology = self._size()
+
+    def fork(self, dg):
+        """Service of a copy of the graph, starting from the paths found so
+        far which are dropped as usual once the copy changes
+
+        :param DiGraph dg: Copy of this service's graph
+        :returns: PathService
+        """
+        service = PathService.__new__(PathService)
+        service._dg = weakref.ref(dg)
+        service._cache = dict(self._cache)
+        service._topology = self._topology
+        _services[dg] = service
+        return service
+
+    def _paths_from(self, start, by_length):
+        if self._topology != self._size():
+            self.invalidate()
+        key = (start, by_length)
+        if key not in self._cache:
+            graph = self.dg.to_undirected(as_view=True)
+            if by_length:
+                self._cache[key] = nx.single_source_dijkstra_path(graph, start, weight=_length)
+            else:
+                self._cache[key] = nx.single_source_shortest_path(graph, start)
+        return self._cache[key]
+
+    def path(self, start, end, by_length=False):
+        """Find the path between two nodes, using breadth first search on the
+        number of channels or Dijkstra on the channel lengths
+
+        :param str start: Name of the node the path starts from
+        :param str end: Name of the node the path ends at
+        :param bool by_length: True to find the path with the shortest total
+            length, every channel reached must have a min_length
+        :returns: list -- names of the nodes on the path, [start, node1, ..., end]
+        :raises: ValueError if there's no path between the nodes
+        """
+        if start not in self.dg.nodes or end not in self.dg.nodes:
+            raise ValueError("No path found between %s and %s" % (start, end))
+        paths = self._paths_from(start, by_length)
+        if end not in paths:
+            raise ValueError("No path found between %s and %s" % (start, end))
+        return paths[end]
+
+    def channels(self, start, end, by_length=False):
+        """Find the channels on the path between two nodes, named in the
+        direction they were defined which may be against the path
+
+        :returns: list -- (port_from, port_to) of each channel on the path
+        """
+        nodes = self.path(start, end, by_length)
+        return [(u, v) if self.dg.has_edge(u, v) else (v, u) for u, v in zip(nodes, nodes[1:])]
+
+    def electrode_paths(self, by_length=False):
+        """Find the path between every pair of electrical ports at once, one
+        search is done from each electrode
+
+        :returns: dict -- {(electrode_1, electrode_2): list of node names} for
+            each pair of electrodes that are connected
+        """
+        electrodes = [name for name, attrs in self.dg.nodes(data=True) if 'voltage' in attrs]
+        paths = {}
+        for i, start in enumerate(electrodes):
+            found = self._paths_from(start, by_length)
+            for end in electrodes[i + 1:]:
+                if end in found:
+                    paths[(start, end)] = found[end]
+                    paths[(end, start)] = found[end][::-1]
+        return paths
+
+
+def service(dg):
+    """Get the PathService of a graph, creating it on first use
+
+    :param DiGraph dg: Graph of the schematic
+    :returns: PathService
+    """
+    if dg not in _services:
+        _services[dg] = PathService(dg)
+    return _services[dg]
@@ -0,0 +1,250 @@
+import math
+import networkx as nx
+import numpy as np
+from scipy import sparse
+from scipy.optimize import least_squares
+
+from . import geometry
+
+# Critical crossing angle translate_tjunc uses unless told otherwise (degrees)
+CRIT_CROSSING_ANGLE = 0.5
+# Weight of the T-junction requirements against the channel lengths
+ANGLE_WEIGHT = 10.0
+
+
+def _tjunctions(dg):
+    """Find the continuous, dispersed and output nodes around each T-junction
+
+    :returns: list -- (continuous, junction, dispersed, output) node names
+    """
+    tjuncs = []
+    for name, attrs in dg.nodes(data=True):
+        if attrs['kind'] != 'tjunc':
+            continue
+        phases = {dg.edges[channel_name].get('phase'): channel_name[0]
+                  for channel_name in dg.in_edges(name)}
+        if 'continuous' not in phases or 'dispersed' not in phases or len(dg.succ[name]) != 1:
+            raise ValueError("T-junction %s needs continuous and dispersed channels in and "
+                             "one channel out" % name)
+        tjuncs.append((phases['continuous'], name, phases['dispersed'],
+                       next(iter(dg.succ[name]))))
+    return tjuncs
+
+
+def _close_pairs(points, separation, joined):
+    """Pairs of nodes nearer than the separation in both directions, found
+    with geometry.GridIndex instead of comparing every pair
+
+    :param ndarray points: Position of each node
+    :param float separation: Distance nodes are kept apart by
+    :param set joined: frozensets of the node indices joined by a channel
+    :returns: set -- (i, j) node index pairs with i < j
+    """
+    index = geometry.GridIndex(separation)
+    for i, (x, y) in enumerate(points):
+        index.insert(i, (x - separation / 2, y - separation / 2,
+                         x + separation / 2, y + separation / 2))
+    return {pair for pair in index.pairs() if frozenset(pair) not in joined}
+
+
+def place(sch, min_length=None, crit_crossing_angle=CRIT_CROSSING_ANGLE, seed=None,
+          tolerance=1e-6, attempts=10):
+    """Find coordinates for every node without a fixed position, see
+    Schematic.place
+    """
+    dg = sch.dg
+    dim = sch.dim
+    nodes = list(dg.nodes)
+    index = {name: i for i, name in enumerate(nodes)}
+    # Work in units of the chip size so every residual is near 1
+    origin = np.array([dim[0], dim[1]], dtype=float)
+    span = max(dim[2] - dim[0], dim[3] - dim[1])
+    if span <= 0:
+        raise ValueError("Chip dimensions must have a positive size to place nodes")
+
+    fixed = {}
+    for name, attrs in dg.nodes(data=True):
+        x, y = attrs.get('min_x'), attrs.get('min_y')
+        if geometry.is_set(x) and geometry.is_set(y):
+            fixed[name] = (np.array([x, y], dtype=float) - origin) / span
+        elif geometry.is_set(x) or geometry.is_set(y):
+            raise ValueError("Node %s has only one of its coordinates set" % name)
+    free = [name for name in nodes if name not in fixed]
+    if not free:
+        return {}
+
+    if min_length is None:
+        # Leave room for every node on the chip
+        min_length = span / (2 * math.sqrt(len(nodes)))
+    separation = min_length / span
+    lengths = []
+    for port_from, port_to, attrs in dg.edges(data=True):
+        target = attrs.get('min_length')
+        lengths.append((index[port_from], index[port_to],
+                        target / span if geometry.is_set(target) else None))
+    exact = np.array([target is not None for _, _, target in lengths])
+    targets = np.array([target if target is not None else separation
+                        for _, _, target in lengths])
+    starts = np.array([i for i, _, _ in lengths], dtype=int)
+    ends = np.array([j for _, j, _ in lengths], dtype=int)
+    tjuncs = np.array([[index[name] for name in tjunc] for tjunc in _tjunctions(dg)],
+                      dtype=int).reshape(-1, 4)
+    cos_squared_crit = math.cos(math.radians(crit_crossing_angle)) ** 2
+    # Nodes joined by a channel are kept apart by its length instead
+    joined = {frozenset((index[port_from], index[port_to])) for port_from, port_to in dg.edges}
+
+    width = (dim[2] - dim[0]) / span
+    height = (dim[3] - dim[1]) / span
+    # Coordinates of 0 read as unset, so stay just inside the chip
+    margin = 1e-3
+    lower = np.tile([margin * width, margin * height], len(free))
+    upper = np.tile([(1 - margin) * width, (1 - margin) * height], len(free))
+    undirected = dg.to_undirected()
+
+    def layout(layout_seed):
+        """Force directed layout as a starting point, scaled to the chip"""
+        if fixed:
+            points = nx.spring_layout(undirected, pos={name: tuple(position) for name, position
+                                                       in fixed.items()},
+                                      fixed=list(fixed), seed=layout_seed)
+        else:
+            points = nx.spring_layout(undirected, seed=layout_seed, center=(0.5, 0.5), scale=0.4)
+        return np.clip(np.concatenate([points[name] for name in free]), lower, upper)
+
+    free_index = np.array([index[name] for name in free], dtype=int)
+    # Column of each node's x in the Jacobian, -1 for fixed nodes
+    column = np.full(len(nodes), -1, dtype=int)
+    column[free_index] = 2 * np.arange(len(free))
+
+    def positions(z):
+        points = np.empty((len(nodes), 2))
+        for name, position in fixed.items():
+            points[index[name]] = position
+        points[free_index] = z.reshape(-1, 2)
+        return points
+
+    def junction_terms(corners):
+        """Residuals of the T-junction requirements
+
+        :param ndarray corners: Continuous, junction, dispersed and output
+            points of each T-junction, shape (4, T-junctions, 2)
+        :returns: ndarray -- the 4 residuals of each T-junction, shape (4, T-junctions)
+        """
+        continuous, junction, dispersed, output = corners
+        a = continuous - junction
+        b = output - junction
+        c = dispersed - junction
+        norm_a = np.linalg.norm(a, axis=1) + 1e-12
+        norm_b = np.linalg.norm(b, axis=1) + 1e-12
+        norm_c = np.linalg.norm(c, axis=1) + 1e-12
+        # Sine of the angle between the continuous and output channels
+        terms = [ANGLE_WEIGHT * (a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]) / (norm_a * norm_b)]
+        for u, v, norm_u, norm_v in ((a, c, norm_a, norm_c), (a, b, norm_a, norm_b),
+                                     (b, c, norm_b, norm_c)):
+            cos_squared = ((u * v).sum(axis=1) / (norm_u * norm_v)) ** 2
+            terms.append(ANGLE_WEIGHT * np.maximum(cos_squared_crit - cos_squared, 0))
+        return np.array(terms)
+
+    def residuals(z, first, second):
+        points = positions(z)
+        distance = np.linalg.norm(points[starts] - points[ends], axis=1)
+        # Channels with a length set must be that long, the others at least
+        # the minimum length
+        length = np.where(exact, distance - targets, np.maximum(targets - distance, 0))
+        # Nodes can't sit on top of each other
+        apart = np.maximum(separation - np.linalg.norm(points[first] - points[second], axis=1),
+                           0)
+        terms = [length, apart]
+        if len(tjuncs):
+            terms.extend(junction_terms(points[tjuncs.T]))
+        return np.concatenate(terms)
+
+    def jacobian(z, first, second):
+        """Sparse Jacobian of residuals, every residual depends on the 2
+        nodes of a channel or pair or the 4 of a T-junction. The T-junction
+        rows are found by finite differences of those 4 nodes only"""
+        points = positions(z)
+        rows, cols, data = [], [], []
+
+        def add(row, members, gradient):
+            keep = column[members] >= 0
+            for axis in (0, 1):
+                rows.append(row[keep])
+                cols.append(column[members][keep] + axis)
+                data.append(gradient[keep, axis])
+
+        offset = 0
+        for a, b, apart in ((starts, ends, False), (first, second, True)):
+            delta = points[a] - points[b]
+            distance = np.linalg.norm(delta, axis=1) + 1e-12
+            if apart:
+                change = -1.0 * (separation - distance > 0)
+            else:
+                # distance - target, or target - distance while too short
+                change = np.where(exact, 1.0, -1.0 * (targets - distance > 0))
+            gradient = change[:, None] * delta / distance[:, None]
+            row = offset + np.arange(len(a))
+            add(row, a, gradient)
+            add(row, b, -gradient)
+            offset += len(a)
+        if len(tjuncs):
+            corners = points[tjuncs.T]
+            base = junction_terms(corners)
+            step = 1e-8
+            for k in range(4):
+                keep = column[tjuncs[:, k]] >= 0
+                for axis in (0, 1):
+                    moved = corners.copy()
+                    moved[k, :, axis] += step
+                    change = (junction_terms(moved) - base) / step
+                    for term in range(4):
+                        rows.append(offset + term * len(tjuncs) + np.flatnonzero(keep))
+                        cols.append(column[tjuncs[keep, k]] + axis)
+                        data.append(change[term][keep])
+            offset += 4 * len(tjuncs)
+        return sparse.csr_matrix((np.concatenate(data),
+                                  (np.concatenate(rows), np.concatenate(cols))),
+                                 shape=(offset, 2 * len(free)))
+
+    def solve(z):
+        """Least squares from z where only the nodes that start near each
+        other are kept apart, pairs that end up near each other are added
+        and it's solved again until there are no new ones
+
+        :returns: tuple -- coordinates and the residuals there
+        """
+        pairs = set()
+        while True:
+            pairs |= _close_pairs(positions(z), separation, joined)
+            first, second = (np.array([pair[k] for pair in sorted(pairs)], dtype=int)
+                             for k in (0, 1))
+            z = least_squares(residuals, z, jac=jacobian,
+                              bounds=(lower, upper), xtol=1e-12, ftol=1e-12, gtol=1e-12,
+                              args=(first, second)).x
+            if _close_pairs(positions(z), separation, joined) <= pairs:
+                return z, residuals(z, first, second)
+
+    # The angle requirements have local minima, so start over from other
+    # layouts until one meets every requirement
+    rng = np.random.default_rng(seed)
+    best = None
+    for _ in range(attempts):
+        z, remaining = solve(layout(int(rng.integers(2 ** 31))))
+        worst = np.abs(remaining).max()
+        if best is None or worst < best[0]:
+            best = (worst, z)
+        if worst <= tolerance:
+            break
+    worst, z = best
+    if worst > tolerance:
+        raise ValueError("Could not place the nodes to meet the channel lengths and T-junction "
+                         "angles, largest violation %.3g" % worst)
+
+    placed = {}
+    points = positions(z) * span + origin
+    for name in free:
+        x, y = (float(value) for value in points[index[name]])
+        dg.nodes[name]['min_x'] = x
+        dg.nodes[name]['min_y'] = y
+        placed[name] = (x, y)
+    return placed
@@ -2,57 +2,20 @@ from pprint import pprint
 import json
 import os
 import sys
+import time
 import networkx as nx
 #  dReal SMT solver
-from dreal.symbolic import Variable, logical_and
+from dreal.symbolic import Variable
 from dreal.api import CheckSatisfiability
-from OMPython import ModelicaSystem
 
-from src import constants, translate
+from . import (bulk, diagnosis, drc, droplets, electrical, fluids, geometry, hierarchy,
+              manifold_ir, normalize, paths, placement, scaling, solution, storage, sweep,
+              telemetry, tolerance, topology, transient, translate, variants)
 
 
-class Fluid():
-    """This is used to retrieve the parameters of common fluids used in
-    microfluidics from constants.py so researchers can simply provide the fluid
-    name as a parameter instead of several properties of the fluid
-    """
-
-    def __init__(self, fluid):
-        """The properties stored in constants.py are retrieved here in the constructor
-        """
-        self.min_density = constants.FluidProperties().getDensity(fluid)
-        self.min_resistivity = constants.FluidProperties().getResistivity(fluid)
-        self.min_viscosity = constants.FluidProperties().getViscosity(fluid)
-        self.min_pressure = False
-
-        # what does it do if the fluid doesn't exist?
-        self.analyte_diffusivities = constants.FluidProperties().getDiffusivities(fluid)
-        self.analyte_initial_concentrations = constants.FluidProperties().getInitialConcentrations(fluid)
-        self.analyte_radii = constants.FluidProperties().getRadii(fluid)
-        self.analyte_charges = constants.FluidProperties().getCharges(fluid)
-
-
-    def updateFluidProperties(self,
-                              min_density=False,
-                              min_viscosity=False,
-                              min_pressure=False,
-                              min_resistivity=False
-                              ):
-        """If the user wants to tweek the values of the fluids manually, call this method
-        TODO: Currently all parameters have to be provided, make it so only the ones
-              provided are updated
-              Currently there is no way to update the analyte parameters
-              (diffusivity, concentration, etc)
-        """
-        self.min_density = min_density
-        self.min_resistivity = min_resistivity
-        self.min_viscosity = min_viscosity
-        self.min_pressure = min_pressure
-
-    def __repr__(self):
-        """Representation of this object is all of the parameters together in a tuple
-        """
-        return repr((self.min_density, self.min_resistivity, self.min_viscosity, self.min_pressure))
+# Properties of common fluids used in microfluidics, shared by every port
+# using the same fluid at the same temperature, see fluids.py
+Fluid = fluids.Fluid
 
 
 class Schematic():
@@ -70,6 +33,8 @@ class Schematic():
         """
         self.exprs = []
         self.dim = dim
+        # Result of the last call to invoke_backend, None if it had no solution
+        self.model = None
 
         # Add new node types and their validation method to this dict
         # to maintain consistent checking across all methods
@@ -83,6 +48,8 @@ class Schematic():
 
         # DiGraph that will contain all nodes and channels
         self.dg = nx.DiGraph()
+        # Shortest paths between nodes, cached until the topology changes
+        self.paths = paths.service(self.dg)
 
     def validate_params(self, params: dict, component: str, name: str):
         """Checks that the parameters provided to a primitive type definition are valid
@@ -205,7 +172,7 @@ class Schematic():
                       'depth': Variable('_'.join([*name, 'depth'])),
                       'min_depth': min_depth,
                       'resolution': Variable('_'.join([*name, 'resolution'])),
-                      'min_resolution': min_depth,
+                      'min_resolution': min_resolution,
                       'flow_rate': Variable('_'.join([*name, 'flow_rate'])),
                       'droplet_volume': Variable('_'.join([*name, 'droplet_volume'])),
                       'viscosity': Variable('_'.join([*name, 'viscosity'])),
@@ -231,6 +198,8 @@ class Schematic():
         # Add argument to attributes within NetworkX
         for key, attr in attributes.items():
             self.dg.edges[port_from, port_to][key] = attr
+        # A new channel or length can change the shortest paths
+        self.paths.invalidate()
         return
 
     def port(self,
@@ -240,7 +209,8 @@ class Schematic():
              min_flow_rate=False,
              x=False,
              y=False,
-             fluid_name='default'
+             fluid_name='default',
+             temperature=None
              ):
         """Create new port where fluids can enter or exit the circuit, any
         optional tag left empty will be converted to a variable for the SMT
@@ -254,6 +224,10 @@ class Schematic():
         :param float min_flow_rate - flow rate of input fluid, (m^3/s)
         :param float X: x-position of port on chip schematic (m)
         :param float Y: y-position of port on chip schematic (m)
+        :param str fluid_name: Name of the fluid in the fluid library
+        :param float temperature: Temperature of the fluid (K), its viscosity
+            and density are interpolated from the fluid library, None for its
+            nominal properties
         :returns: None -- no issues with creating this port
         :raises: TypeError if an input parameter is wrong type
                  ValueError if an input parameter has an invalid value
@@ -264,7 +238,8 @@ class Schematic():
                                 x: 'positive number',
                                 y: 'positive number',
                                 kind: 'string',
-                                fluid_name: 'string'
+                                fluid_name: 'string',
+                                temperature: 'positive number'
                                 }
         # Checking that arguments are valid
         self.validate_params(user_provided_params, 'port', name)
@@ -275,7 +250,7 @@ class Schematic():
             raise ValueError("kind must be either %s" % self.translation_strats)
 
         # Initialize fluid properties
-        fluid_properties = Fluid(fluid_name)
+        fluid_properties = Fluid(fluid_name, temperature)
 
         # Ports are stored with nodes because ports are just a specific type of
         # node that has a constant flow rate
@@ -289,15 +264,13 @@ class Schematic():
                       'min_flow_rate': min_flow_rate,
                       'density': Variable(name + '_density'),
                       'min_density': fluid_properties.min_density,
+                      'min_resistivity': fluid_properties.min_resistivity,
                       'x': Variable(name + '_x'),
                       'y': Variable(name + '_y'),
                       'min_x': x,
                       'min_y': y,
-                      'analyte_diffusivities': fluid_properties.analyte_diffusivities,
-                      'analyte_initial_concentrations': fluid_properties.analyte_initial_concentrations,
-                      'analyte_radii': fluid_properties.analyte_radii,
-                      'analyte_charges': fluid_properties.analyte_charges
                       }
+        attributes.update(fluid_properties.analytes())
 
         # If user provides values, put them into the attributes dictionary
         if not x:
@@ -316,7 +289,8 @@ class Schematic():
             self.dg.nodes[name][key] = attr
         return
 
-    def node(self, name, x=False, y=False, kind='node', c=0.4, p=0.5, qf=0.9):
+    def node(self, name, x=False, y=False, kind='node', c=0.4, p=0.5, qf=0.9,
+             droplet_surrogate=False):
         """Create new node where fluids merge or split, kind of node (T-junction,
         Y-junction, cross, etc.) can be specified if not then a basic node
         connecting multiple channels will be created, units in brackets
@@ -332,6 +306,11 @@ class Schematic():
             a given peak, and the maximum overall concentration (Cpeak/Cmax) <= p
         :param float qf: for ep_cross; an arbitrary constant that satisfies the
             constraint 2/(n-1) < qf < 1, where n is # of analytes, default is 0.9
+        :param droplet_surrogate: for tjunc, True or the path of a table from
+            surrogate.DropletSurrogate to bound the droplet volume with a
+            polynomial fit instead of the exact formula, which is easier to
+            solve, the exact formula is still used where h/w, wIn/w or
+            epsilon/w are outside the table's domain
         :returns: None -- no issues with creating this node
         :raises: TypeError if an input parameter is wrong type
                  ValueError if an input parameter has an invalid value
@@ -346,6 +325,8 @@ class Schematic():
                                 }
         # Checking that arguments are valid
         self.validate_params(user_provided_params, 'node', name)
+        if not isinstance(droplet_surrogate, (bool, str)):
+            raise TypeError("node %s droplet_surrogate must be True or a path" % name)
 
         if name in self.dg.nodes:
             raise ValueError("Must provide a unique name")
@@ -374,7 +355,8 @@ class Schematic():
                       'min_y': None,
                       'c': c,
                       'p': p,
-                      'qf': qf
+                      'qf': qf,
+                      'droplet_surrogate': droplet_surrogate
                       }
 
         # If user provides values, put them into the attributes dictionary
@@ -399,7 +381,8 @@ class Schematic():
                   y=False,
                   voltage=False,
                   current=False,
-                  fluid_name='default'):
+                  fluid_name='default',
+                  temperature=None):
         """Create new electrical port where fluids and voltages can enter or exit the circuit, any
         optional tag left empty will be converted to a variable for the SMT
         solver to solve for a given value, units in brackets
@@ -414,6 +397,9 @@ class Schematic():
         :param float Y: y-position of port on chip schematic (m)
         :param float voltage: Voltage value passing through the port (V)
         :param float current: Current value passing through the port (A)
+        :param str fluid_name: Name of the fluid in the fluid library
+        :param float temperature: Temperature of the fluid (K), None for its
+            nominal properties
         :returns: None -- no issues with creating this port
         :raises: TypeError if an input parameter is wrong type
                  ValueError if an input parameter has an invalid value
@@ -426,7 +412,8 @@ class Schematic():
                                 voltage: 'number',
                                 current: 'positive number',
                                 kind: 'string',
-                                fluid_name: 'string'
+                                fluid_name: 'string',
+                                temperature: 'positive number'
                                 }
         # Checking that arguments are valid
         self.validate_params(user_provided_params, 'electrical port', name)
@@ -437,7 +424,7 @@ class Schematic():
             raise ValueError("kind must be either %s" % self.translation_strats)
 
         # Initialize fluid properties
-        fluid_properties = Fluid(fluid_name)
+        fluid_properties = Fluid(fluid_name, temperature)
 
         # Ports are stored with nodes because ports are just a specific type of
         # node that has a constant flow rate
@@ -451,6 +438,7 @@ class Schematic():
                       'min_flow_rate': min_flow_rate,
                       'density': Variable(name + '_density'),
                       'min_density': fluid_properties.min_density,
+                      'min_resistivity': fluid_properties.min_resistivity,
                       'x': Variable(name + '_X'),
                       'y': Variable(name + '_Y'),
                       'min_x': x,
@@ -466,40 +454,155 @@ class Schematic():
             self.dg.nodes[name][key] = attr
         return
 
-    def translate_schematic(self):
+    def add_ports(self, data):
+        """Create many ports at once from columns of parameters, such as the
+        export of a CAD tool, each column is validated as a whole and the
+        valid rows are inserted into the graph together
+
+        :param data: dict of lists or NumPy arrays, or a pandas DataFrame with
+            the columns name and kind and optionally min_pressure,
+            min_flow_rate, x, y, fluid_name, temperature, min_viscosity,
+            min_density, min_resistivity and the analyte_* properties, where
+            False, None or NaN leave the value for the solver to find,
+            min_viscosity, min_density, min_resistivity and the analyte
+            columns override the fluid's values
+        :returns: list -- (row, message) for each row that was not added
+        :raises: ValueError if a column is missing, unknown or a different length
+        """
+        return bulk.add_ports(self, data)
+
+    def add_nodes(self, data):
+        """Create many nodes at once from columns of parameters, see add_ports
+
+        :param data: dict of lists or NumPy arrays, or a pandas DataFrame with
+            the column name and optionally x, y, kind, c, p, qf and
+            droplet_surrogate
+        :returns: list -- (row, message) for each row that was not added
+        :raises: ValueError if a column is missing, unknown or a different length
+        """
+        return bulk.add_nodes(self, data)
+
+    def add_channels(self, data):
+        """Create many channels at once from columns of parameters, see add_ports
+
+        :param data: dict of lists or NumPy arrays, or a pandas DataFrame with
+            the columns port_from and port_to and optionally min_length,
+            min_width, min_height, min_depth, min_resolution, kind, phase
+            and min_sampling_rate
+        :returns: list -- (row, message) for each row that was not added
+        :raises: ValueError if a column is missing, unknown or a different length
+        """
+        return bulk.add_channels(self, data)
+
+    def electrode_paths(self, by_length=False):
+        """Find the path between every pair of electrical ports on the chip
+
+        :param bool by_length: True to use Dijkstra on the channel lengths
+            instead of the number of channels
+        :returns: dict -- {(electrode_1, electrode_2): list of node names}
+        """
+        return self.paths.electrode_paths(by_length)
+
+    def analyze_electrical(self, configurations=None, model=None, resistivity=None,
+                           apply=False):
+        """Solve the electrical network formed by the fluid in the channels
+        with sparse nodal analysis. Each channel conducts with its cross
+        section over its length and the resistivity of its fluid, and the
+        voltage of every node is found for every electrode configuration at
+        once, configurations fixing the same electrodes share one
+        factorization. Channel geometry the user didn't define is taken from
+        the model
+
+        :param configurations: Voltage of each electrode in each
+            configuration, a list of dicts of elec_port name to voltage (V)
+            or an array with a row per configuration and a column per
+            electrode in the order of electrical.electrodes, None, False or
+            NaN leave an electrode floating. Defaults to the voltages the
+            elec_ports were given
+        :param model: Solution with the geometry the user didn't define,
+            defaults to the last solve
+        :param resistivity: Resistivity of the fluid (Ohm*m) in every channel
+            or a dict of channel to its resistivity, defaults to the
+            resistivity of the fluid of the ports, which must agree within
+            each connected part of the chip
+        :param bool apply: If true then the range of each channel's field
+            over the configurations is stored as its field_bounds, which an
+            electrophoretic cross uses for the field of its separation
+            channel instead of assuming it's uniform between the electrodes
+        :returns: dict -- the 'nodes', 'channels' and 'electrodes' and the
+            'configurations' table, the 'conductance' (S) of each channel, and
+            arrays with a row per configuration of the 'voltages' (V) of the
+            nodes, the 'currents' (A), 'fields' (V/m), Joule heating 'power'
+            (W) and 'power_density' (W/m^3) of the channels in the direction
+            they were defined, and the 'electrode_currents' (A) flowing into
+            the chip at each electrode
+        :raises: ValueError if a channel has no geometry or resistivity
+        """
+        result = electrical.analyze(self, configurations, model, resistivity)
+        if apply:
+            electrical.apply(self, result)
+        return result
+
+    def validate(self):
+        """Check the topology of the schematic, such as every input reaching an
+        output and specialized nodes having the right channels, before any
+        SMT expressions are created
+
+        :returns: None -- the schematic is valid
+        :raises: ValueError listing every problem found
+        """
+        errors = topology.topology_errors(self.dg)
+        if errors:
+            raise ValueError('\n'.join(errors))
+
+    def check_design(self, rules=None):
+        """Check the design rules, such as channels being wider than they are
+        tall and ports being on the chip, against the parameters the user set.
+        Each rule is evaluated as NumPy operations over every node or channel
+        at once so this takes milliseconds, add rules with drc.register
+
+        :param list rules: Rules to check, defaults to every registered rule
+        :returns: list -- drc.Violation of every rule broken, empty if none are
+        """
+        return drc.check(self.dg, self.dim, rules)
+
+    def translate_schematic(self, recorder=None):
         """Validates that each node has the correct input and output
         conditions met then translates it into SMT solver syntax
         Generates SMT formulas to simulate specialized nodes like T-junctions
         and stores them in self.exprs
+
+        :param recorder: Function called with each component and the
+            expressions translating it returned, see translate.dispatch
         """
-        # if schematic has no input then it is invalid
-        has_input = False
+        start = time.perf_counter()
+        exprs_before = len(self.exprs)
+        self.validate()
 
         # The translate method names are stored in a dictionary name where
         # the key is the kind of that node and Call on all input nodes and it
         # will recursive traverse the circuit
         for name in self.dg.nodes:
-            kind = self.dg.nodes[name]['kind']
-            if kind == 'input':
-                has_input = True
-                # first ensure that it has an output
-                has_output = False
-                # TODO: Need to create list of output + input nodes to see if they connect
-                for x, y in self.dg.nodes(data=True):
-                    if y['kind'] == 'output':
-                        # There's an output, so call translate on input
-                        has_output = True
-                # TODO: Output may not be connected to input, check for it
-                if has_output:
-                    [self.exprs.append(val) for val in translate.translate_input(self.dg, name)]
-                else:
-                    raise ValueError('Schematic input %s has no output' % name)
-        if not has_input:
-            raise ValueError('Schematic has no input')
+            if self.dg.nodes[name]['kind'] == 'input':
+                [self.exprs.append(val) for val in translate.claim(
+                    recorder, name, translate.translate_input(self.dg, name, recorder))]
 
         # finish by constraining nodes to be within chip area
         for name in self.dg.nodes:
-            [self.exprs.append(val) for val in translate.translate_chip(self.dg, name, self.dim)]
+            [self.exprs.append(val) for val in translate.claim(
+                recorder, name, translate.translate_chip(self.dg, name, self.dim))]
+
+        # keep channels that could come near each other from crossing, the
+        # positions found by the last solve narrow down which ones can and
+        # are kept
+        if geometry.enabled(self.dg):
+            [self.exprs.append(val) for val in
+             geometry.translate_non_crossing(self.dg, self.dim, self.model)]
+
+        if telemetry.enabled():
+            telemetry.emit('translate', self,
+                           translate_time=time.perf_counter() - start,
+                           expressions=len(self.exprs) - exprs_before)
         return
 
     def invoke_backend(self, _show):
@@ -508,9 +611,11 @@ class Schematic():
 
         :param bool show: If true then the full SMT formula that was created is
                           printed
-        :returns: dReal model showing the values for each of the parameters
+        :returns: solution.Solution with the bounds of every variable if
+            the formula is satisfiable, otherwise its status says why not
         """
-        formula = logical_and(*self.exprs)
+        # Scaled units keep values near 1 so delta is meaningful
+        formula, originals, delta = scaling.solver_formula(self.dg, self.dim, self.exprs)
         # Prints the generated formula in full, remove serialize for shortened
         if _show:
             #  nx.draw(self.dg)
@@ -518,23 +623,299 @@ class Schematic():
             print(formula)
         # Return None if not solvable, returns a dict-like structure giving the
         # range of values for each Variable
-        model = CheckSatisfiability(formula, 10)
-        if model:
-            return model
+        start = time.perf_counter()
+        model = CheckSatisfiability(formula, delta)
+        solve_time = time.perf_counter() - start
+        if not model:
+            self.model = None
+            result = solution.Solution(solution.UNSAT)
         else:
-            return "No solution found"
+            if scaling.enabled(self.dg):
+                model = scaling.unscale_model(model, originals)
+            self.model = result = solution.Solution.from_box(model, self.dg)
+        if telemetry.enabled():
+            telemetry.emit('solve', self,
+                           solve_time=solve_time,
+                           delta=delta,
+                           status=result.status,
+                           expressions=len(self.exprs),
+                           variables=len(formula.GetFreeVariables()),
+                           normalize=normalize.enabled(self.dg),
+                           scale=scaling.enabled(self.dg))
+        return result
 
-    def solve(self, show=False):
+    def solve(self, show=False, normalize=None, scale=None, non_crossing=None, check=True):
         """Create the SMT2 equation for this schematic outlining the design
         of a microfluidic circuit and use dReal to solve it
 
         :param bool show: If true then the full SMT formula that was created is
                           printed
-        :returns: dReal model showing the values for each of the parameters
+        :param bool normalize: If true then divisions with denominators known to
+            be nonzero are cross multiplied and square roots are replaced with
+            auxiliary variables, which dReal usually prunes better, None keeps
+            the setting of the last solve (off by default)
+        :param bool scale: If true then every length, pressure, flow rate,
+            viscosity, density, resistance and volume is divided by a
+            characteristic scale of its quantity before solving and the model
+            is converted back to SI units, None keeps the setting of the last
+            solve (off by default)
+        :param bool non_crossing: If true then channels are kept from crossing
+            each other, only pairs of channels whose possible positions
+            overlap are constrained, the nodes stay within the intervals of
+            the last solve so they narrow those positions, None keeps the
+            setting of the last solve (off by default)
+        :param bool check: If true then the design rules are checked first and
+            the solver is skipped if any are broken, see check_design
+        :returns: solution.Solution, check its status or truth to see if a
+            solution was found
         """
+        if non_crossing is not None:
+            self.dg.graph['non_crossing'] = bool(non_crossing)
+        if normalize is not None:
+            self.dg.graph['normalize'] = bool(normalize)
+        if scale is not None:
+            self.dg.graph['scale'] = bool(scale)
+        if check:
+            violations = self.check_design()
+            if violations:
+                # Already known to be infeasible, dReal would only find UNSAT
+                self.model = None
+                return solution.Solution(solution.UNSAT, violations=violations)
         self.translate_schematic()
         return self.invoke_backend(show)
 
+    def sweep(self, component, attr, values, warm_start=True, warm_width=0.1, show=False,
+              normalize=None, scale=None):
+        """Solve the schematic at each of the values of one parameter, such as
+        the pressure of an input. The schematic is translated once with a
+        variable in place of the parameter and asserted in a dReal Context,
+        then each value is pushed, solved and popped so only the value
+        changes between points. The design rules are checked at each value
+        and points that break them are UNSAT without calling the solver.
+        Each point is solved with the same precision and units as solve
+
+        :param component: Name of the node or channel tuple
+        :param str attr: Name of the parameter without min_, e.g. 'pressure'
+        :param values: Values to solve at
+        :param bool warm_start: If true then each point is first solved within
+            bounds around the previous point's solution, and again without
+            them if there's no solution there
+        :param float warm_width: Fraction of each value the bounds around the
+            previous solution are widened by
+        :param bool show: If true then the formula shared by every point is
+            printed
+        :param bool normalize: Emit the constraints in polynomial form, see
+            solve, None keeps the setting of the last solve
+        :param bool scale: Solve in scaled units, see solve, None keeps the
+            setting of the last solve
+        :returns: dict -- 'values', the 'solutions' and 'status' of each
+            point, the 'setup_time' (s) of the translation, the 'solve_times'
+            (s) of each point and the number of 'warm_starts' that found a
+            solution
+        :raises: ValueError if the component has no such parameter
+        """
+        return sweep.sweep(self, component, attr, values, warm_start, warm_width, show,
+                           normalize, scale)
+
+    def diagnose(self, processes=None, time_budget=None, check=True):
+        """Find which components make the schematic UNSAT. The expressions
+        are grouped by the node or channel whose translation emitted them and
+        the groups are narrowed down to a minimal conflicting subset, one
+        that has no solution but does once any group is removed. Each step
+        solves its candidate subsets in parallel worker processes and caches
+        every result, so subsets implied by earlier results aren't solved
+        again
+
+        :param int processes: Number of worker processes, 1 solves in this
+            process, defaults to the number of CPUs
+        :param float time_budget: Seconds the whole diagnosis may take, when
+            it runs out the smallest conflicting subset found so far is
+            reported, None for no limit
+        :param bool check: If true then the design rules are checked first
+            and the components breaking them are reported without solving
+        :returns: dict -- 'status' of the schematic, the responsible
+            'components' and the min_ 'parameters' set on each, design rule
+            'violations', whether the conflict is 'minimal', the number of
+            'groups', 'expressions' in the conflict, 'solver_calls',
+            'cache_hits' and the 'elapsed' time (s)
+        """
+        return diagnosis.diagnose(self, processes, time_budget, check)
+
+    def solve_hierarchical(self, subcircuits, processes=None, cache_dir=None, show=False):
+        """Solve each subcircuit on its own for a solution of the pressures
+        and flow rates at the nodes connecting it to the rest of the chip, then
+        solve the remaining circuit with the subcircuit internals replaced by
+        those nodes, and check each subcircuit still has a solution at the
+        values the top level chose, see hierarchy.py for how the problem is split.
+        If no consistent solution is found this way the whole schematic is
+        solved at once
+
+        :param list subcircuits: Each entry is a collection of the names of the
+            nodes and ports making up one subcircuit
+        :param int processes: Number of subcircuits to solve in parallel,
+            defaults to the number of CPUs
+        :param str cache_dir: Directory where subcircuit results are cached
+            between runs, defaults to ~/.cache/pymanifold, False to disable
+        :param bool show: If true then the top level SMT formula is printed
+        :returns: solution.Solution of the top level circuit, or of the whole
+            schematic if the hierarchy found no consistent solution
+        :raises: ValueError if the subcircuits are not disjoint sets of nodes
+        """
+        return hierarchy.solve_hierarchical(self, subcircuits, processes, cache_dir, show)
+
+    def monte_carlo(self, n_samples, tolerances, limits=None, model=None, seed=None):
+        """Estimate the yield of a solved design under manufacturing variation
+        by sampling perturbed channel geometries and fluid viscosity around the
+        solved values. Every sample is evaluated at once with NumPy, the
+        resistance of each channel, the pressures and flow rates of the
+        network with the ports held at their solved pressures and the droplet
+        volume of each T-junction, without calling the solver
+
+        :param int n_samples: Number of designs to sample
+        :param dict tolerances: Relative standard deviation of each quantity
+            that varies, any of width, height, length and viscosity,
+            e.g. {'width': 0.02, 'height': 0.05}
+        :param dict limits: (lower, upper) bound of outputs the design must
+            stay within, named like the solver's variables such as
+            'in_middle node_flow_rate', None for no bound
+        :param model: Solved model, defaults to the last one solve found
+        :param int seed: Seed of the random number generator
+        :returns: dict -- with keys
+            yield: fraction of samples that are valid and within the limits
+            invalid: fraction of samples where a channel is taller than it
+                is wide, a size or the viscosity isn't positive or the flow
+                reverses
+            passed: bool array of which samples passed
+            statistics: {output: {mean, std, min, max, p5, p50, p95}} of
+                the valid samples, NaN if there are none
+            samples: {output: array of the value in each sample}
+        :raises: ValueError if the schematic hasn't been solved or an unknown
+            tolerance or limit is given
+        """
+        return tolerance.monte_carlo(self, n_samples, tolerances, limits, model, seed)
+
+    def worst_case(self, tolerances, limits=None, model=None, processes=None):
+        """Check that a solved design still works anywhere within the
+        tolerances of its channel geometry, fluid viscosity and input
+        pressures. Rather than solving all 2^k combinations of the k
+        parameters at their low and high ends, the corner where each limit is
+        closest to being broken is found from which way the evaluated network
+        moves as each parameter is moved on its own, since resistance is
+        monotonic in each of them. Only these corners are solved, in parallel,
+        with the parameters fixed and every limit asserted. Flow rates and the
+        pressures of nodes inside the chip are left for the solver at each
+        corner, give the ranges they must stay within as limits. Corners
+        are solved in scaled units so the solver's precision is small next to
+        every value, and where a channel's length moves its nodes are placed
+        by the solver rather than kept at their positions.
+
+        The corners, values and margins come from the linear network of
+        monte_carlo, where flow is conserved at every node, while each status
+        is from the SMT formulas of translate, where a port's flow rate also
+        follows from its pressure and density and the flow out of a node
+        isn't tied to the flow into it. The two can disagree on an output, so
+        a corner can be UNSAT with a positive margin or SAT with a negative one
+
+        :param dict tolerances: Relative half width of the range of each
+            quantity that varies, any of width, height, length, viscosity and
+            pressure (of the inputs), e.g. {'viscosity': 0.1, 'width': 0.02}
+        :param dict limits: (lower, upper) bound of outputs the design must
+            stay within, named as for monte_carlo, None for no bound, defaults
+            to every channel's flow rate staying positive
+        :param model: Solved model, defaults to the last one solve found
+        :param int processes: Number of worker processes, 1 solves in this
+            process, defaults to the number of CPUs
+        :returns: dict -- with keys
+            parameters: names of the parameters that vary
+            corners: the 'parameters' at their 'low' or 'high' end, the
+                evaluated 'outputs', whether the formulas are 'valid', the
+                'status' of the solve and the 'constraints' bounded by each
+                corner that was solved
+            constraints: the 'output', 'bound', 'limit', 'corner', evaluated
+                'value' and 'status' of each bound, its 'margin' is the
+                distance to the limit as a fraction of the nominal value
+            limiting: the constraint whose corner has no solution, or the
+                one with the smallest margin if every corner has one
+            certified: true if every corner has a solution
+            solver_calls: number of corners solved
+            exhaustive_corners: number of corners of every combination
+        :raises: ValueError if the schematic hasn't been solved or an unknown
+            tolerance or limit is given
+        """
+        return tolerance.worst_case(self, tolerances, limits, model, processes)
+
+    def fork(self):
+        """Create a variant of this schematic that can be changed without
+        changing this one. The graph is copied with its own attribute dict
+        for each node and channel, but the values in them, including the
+        solver Variables, are shared rather than copied. The model and
+        shortest paths already found are shared too, the variant is
+        translated again when it's solved
+
+        :returns: Schematic
+        """
+        return variants.fork(self)
+
+    def to_plain(self, nodes=None):
+        """Copy the nodes and channels of this schematic without their dReal
+        Variables so they can be pickled, hashed or written to disk
+
+        :param nodes: Only include these nodes and the channels between them,
+            defaults to every node in the schematic
+        :returns: tuple -- list of (name, attributes) for the nodes and list of
+            (port_from, port_to, attributes) for the channels
+        """
+        if nodes is None:
+            nodes = self.dg.nodes
+        member = set(nodes)
+        nodes = [name for name in self.dg.nodes if name in member]
+        plain_nodes = [(name, {key: value for key, value in self.dg.nodes[name].items()
+                               if not isinstance(value, Variable)})
+                       for name in nodes]
+        plain_edges = [(port_from, port_to, {key: value for key, value in attrs.items()
+                                             if not isinstance(value, Variable)})
+                       for port_from, port_to, attrs in self.dg.edges(data=True)
+                       if port_from in member and port_to in member]
+        return plain_nodes, plain_edges
+
+    @classmethod
+    def from_plain(cls, dim, nodes, edges):
+        """Create a schematic from the output of to_plain, the dReal Variables
+        of each node and channel are created when translation first needs them
+
+        :param list dim: dimensions of the overall chip, [X_min, Y_min, X_max, X_min] (m)
+        :param list nodes: (name, attributes) for each node
+        :param list edges: (port_from, port_to, attributes) for each channel
+        :returns: Schematic
+        """
+        sch = cls(dim)
+        sch.dg.add_nodes_from((name, dict(attrs)) for name, attrs in nodes)
+        sch.dg.add_edges_from((port_from, port_to, dict(attrs))
+                              for port_from, port_to, attrs in edges)
+        return sch
+
+    def save(self, path, include_model=True):
+        """Save the schematic in a compact binary format, a NumPy .npz file
+        holding each attribute of the nodes and channels as a column
+
+        :param str path: Path of the file to write
+        :param bool include_model: Also store the result of the last solve
+        :returns: None
+        :raises: ValueError if an attribute can't be stored as a column
+        """
+        storage.save(self, path, self.model if include_model else None)
+
+    @classmethod
+    def load(cls, path):
+        """Load a schematic written by save, solver Variables are only created
+        when they are first used and the stored model, if any, is put in
+        the model attribute
+
+        :param str path: Path of the file to read
+        :returns: Schematic
+        """
+        return storage.load(cls, path)
+
     def to_json(self, path=os.getcwd() + 'test.json'):
         """Converts designed schematic to a json file following Manifold's intermediate
         representation syntax to work with other parts of Manifold if needed
@@ -622,10 +1003,120 @@ class Schematic():
         with open(path, 'w') as outfile:
             json.dump(manifold_ir, outfile, separators=(',', ':'))
 
+    @classmethod
+    def from_json(cls, path, dim, batch_size=10000, solve_settings=False):
+        """Create a schematic from a json file in Manifold's intermediate
+        representation, such as one written by to_json. The file is parsed
+        one node or connection at a time and they are added in batches with
+        add_ports, add_nodes and add_channels, attributes are mapped back to
+        the min_* parameters they came from
+
+        :param str path: Path of the json file
+        :param list dim: dimensions of the overall chip, [X_min, Y_min, X_max, X_min] (m)
+        :param int batch_size: Number of nodes to insert at once
+        :param bool solve_settings: If true then the normalize, scale and
+            non_crossing settings the file was solved with are kept for the
+            next solve, by default they're ignored
+        :returns: Schematic
+        :raises: ValueError listing every node or connection that couldn't be added
+        """
+        return manifold_ir.from_json(cls, path, dim, batch_size, solve_settings)
+
+    def simulate(self, t_end, sources=None, compliance=0, model=None, initial=None,
+                 t_eval=None, n_points=200):
+        """Simulate the pressures and flow rates of the schematic's hydraulic
+        network over time in process, with the resistance of each channel
+        from algorithms.calculate_channel_resistance. Nodes with compliance
+        are integrated with SciPy's stiff BDF solver using the sparse Jacobian
+        of the network, nodes without it respond instantly
+
+        :param float t_end: Time to simulate until (s)
+        :param dict sources: Node name to (kind, value) where kind is
+            'pressure' (Pa) or 'flow_rate' (m^3/s) and value is a number or a
+            function of time, e.g. {'in': ('pressure', lambda t: 1000 * t)}.
+            Other ports are held at their pressure, or 0 for outputs without one
+        :param compliance: Compliance of every channel, or a dict of channel
+            tuples and node names to their compliance (m^3/Pa), half of a
+            channel's compliance is added to each of its nodes
+        :param model: Solved model for any dimensions the user didn't define,
+            defaults to the last one solve found
+        :param dict initial: Pressure of nodes with compliance at the start,
+            by default the network starts at steady state
+        :param ndarray t_eval: Times to return the results at
+        :param int n_points: Number of evenly spaced times when t_eval isn't given
+        :returns: dict -- 't' the times, 'pressure' node name to its pressure
+            at each time, 'flow_rate' channel to its flow rate at each time,
+            'resistance' channel to its resistance and 'stats' of the ODE solver
+        :raises: ValueError if a source, compliance or initial pressure is
+            invalid or a channel dimension isn't known
+        """
+        return transient.simulate(self, t_end, sources, compliance,
+                                  self.model if model is None else model,
+                                  initial, t_eval, n_points)
+
+    def simulate_droplets(self, t_end, model=None, droplet_resistance=1.0,
+                          resolve_interval=None):
+        """Simulate the trains of droplets made by every T-junction as they
+        travel through the channels downstream. Each T-junction makes a
+        droplet of the volume from algorithms.calculate_droplet_volume every
+        volume / dispersed flow rate seconds, droplets move at the mean
+        velocity of the fluid and take the channel with the highest flow at
+        each node. Arrivals are processed in time order from a priority
+        queue and every droplet in a channel adds resistance, which changes
+        the flow rates of the network
+
+        :param float t_end: Time to simulate until (s)
+        :param model: Solved model for any dimensions the user didn't define,
+            defaults to the last one solve found
+        :param float droplet_resistance: Resistance a droplet adds relative to
+            the resistance of the length of channel it fills
+        :param float resolve_interval: Shortest time between solves of the
+            network as droplets move (s), t_end / 100 by default
+        :returns: dict -- 'generators' T-junction name to its droplet count,
+            frequency (Hz), period (s), volume (m^3) and spacing (m),
+            'channels' channel to its mean and final number of droplets, added
+            resistance and flow rate, 'droplets' the generator, creation and
+            exit time and exit port of each droplet, and the number of network
+            'resolves' and 'events' processed
+        :raises: ValueError if a dimension isn't known or a T-junction can't
+            make droplets
+        """
+        return droplets.simulate_droplets(self, t_end, self.model if model is None else model,
+                                          droplet_resistance, resolve_interval)
+
+    def place(self, min_length=None, crit_crossing_angle=placement.CRIT_CROSSING_ANGLE,
+              seed=None, tolerance=1e-6, attempts=10):
+        """Find positions for the nodes and ports without one before solving,
+        so the lengths and angles of the channels become constants instead of
+        every x and y being solved together. A force directed layout is
+        refined by bounded least squares until the channels with a length
+        set have it, every other channel and pair of nodes is at least
+        min_length apart and each T-junction's continuous and output channels
+        are in a straight line at the critical angle to the others. The
+        positions are stored as the nodes' x and y like the user set them
+
+        :param float min_length: Shortest distance between nodes and length of
+            channels without one set (m), by default half the chip size over
+            the square root of the number of nodes
+        :param float crit_crossing_angle: Critical crossing angle of the
+            T-junctions (degrees), the one translate_tjunc uses by default
+        :param int seed: Seed of the starting layout
+        :param float tolerance: Largest violation allowed, in units of the chip
+            size
+        :param int attempts: Number of starting layouts to try
+        :returns: dict -- name of each node placed to its (x, y) (m)
+        :raises: ValueError if the requirements can't be met on the chip
+        """
+        return placement.place(self, min_length, crit_crossing_angle, seed, tolerance,
+                               attempts)
+
     def to_modelica(self):
-        """Convert the schematic to a valid Modelica file
+        """Convert the schematic to a valid Modelica file, this needs
+        OpenModelica and OMPython installed, see simulate for the built in
+        simulator
         :returns: None
         """
+        from OMPython import ModelicaSystem
         mod = ModelicaSystem("TJunctionSingleDrop.mo",
                              "TJunctionSingleDrop",
                              ["Modelica"]
@@ -634,6 +1125,6 @@ class Schematic():
 
 
 if __name__ == '__main__':
-    sch = Schematic([0, 0, 1, 1])
-    output = sch.to_modelica()
-    print(output)
+    # Same as the pymanifold command, see cli.py
+    from . import cli
+    sys.exit(cli.main())
@@ -0,0 +1,164 @@
+import math
+from dreal import Interval
+from dreal.symbolic import Variable, logical_and
+
+# Physical quantity of each attribute holding a Variable, the solver works
+# with each divided by the characteristic scale of its quantity. Everything
+# else is solved in SI units as is: the electrophoresis Variables (field,
+# mobilities, velocities, times and concentrations) aren't stored in the
+# graph, the square roots from normalize have the units of whatever they're
+# the root of, and resistivity and voltage are only ever numbers
+QUANTITIES = {'length': 'length', 'width': 'length', 'height': 'length',
+              'depth': 'length', 'resolution': 'length', 'x': 'length',
+              'y': 'length', 'x_detector': 'length',
+              'pressure': 'pressure',
+              'flow_rate': 'flow',
+              'viscosity': 'viscosity',
+              'density': 'density',
+              'resistance': 'resistance',
+              'droplet_volume': 'volume'
+              }
+# Variables shared by the whole schematic that are not stored in the graph
+GLOBAL_QUANTITIES = {'epsilon': 'length'}
+# Precision of dReal when solving in scaled units, where values are near 1
+DELTA = 0.001
+# Precision of dReal when solving in SI units
+UNSCALED_DELTA = 10
+
+
+def enabled(dg):
+    """Whether this schematic is solved in scaled units
+
+    :param DiGraph dg: Graph of the schematic
+    :returns: bool
+    """
+    return bool(dg.graph.get('scale', False))
+
+
+def _magnitude(values, default):
+    """Power of 10 nearest the geometric mean of the magnitudes of values"""
+    logs = [math.log10(abs(value)) for value in values
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and value]
+    if not logs:
+        return default
+    return 10.0 ** round(sum(logs) / len(logs))
+
+
+def characteristic_scales(dg, dim):
+    """Pick a scale for each physical quantity from the values the user gave,
+    powers of 10 so scaling only shifts the decimal point. Flow rate and
+    resistance follow from the others through Hagen-Poiseuille if no flow
+    rates were given, Q ~ P * L^3 / mu
+
+    :param DiGraph dg: Graph of the schematic
+    :param list dim: dimensions of the overall chip, [X_min, Y_min, X_max, X_min] (m)
+    :returns: dict -- quantity name to its scale
+    """
+    given = {quantity: [] for quantity in set(QUANTITIES.values())}
+    for _, attrs in dg.nodes(data=True):
+        for key, quantity in QUANTITIES.items():
+            given[quantity].append(attrs.get('min_' + key))
+    for _, _, attrs in dg.edges(data=True):
+        for key, quantity in QUANTITIES.items():
+            given[quantity].append(attrs.get('min_' + key))
+
+    chip = max(abs(dim[2] - dim[0]), abs(dim[3] - dim[1]))
+    scales = {'length': _magnitude(given['length'], _magnitude([chip], 1.0)),
+              'pressure': _magnitude(given['pressure'], 1.0),
+              'viscosity': _magnitude(given['viscosity'], 1.0),
+              'density': _magnitude(given['density'], 1.0)}
+    scales['flow'] = _magnitude(given['flow'], _magnitude(
+        [scales['pressure'] * scales['length'] ** 3 / scales['viscosity']], 1.0))
+    scales['resistance'] = _magnitude([scales['pressure'] / scales['flow']], 1.0)
+    scales['volume'] = _magnitude([scales['length'] ** 3], 1.0)
+    return scales
+
+
+def variable_scales(dg, scales, variables):
+    """Find the scale of each Variable from the attribute it's stored under
+
+    :param DiGraph dg: Graph of the schematic
+    :param dict scales: Scale of each quantity from characteristic_scales
+    :param list variables: Free Variables of the formula
+    :returns: dict -- Variable id to its scale, Variables without a known
+        quantity are left out and not scaled
+    """
+    by_id = {}
+    components = [attrs for _, attrs in dg.nodes(data=True)] + \
+        [attrs for _, _, attrs in dg.edges(data=True)]
+    for attrs in components:
+        for key, quantity in QUANTITIES.items():
+            var = attrs.get(key)
+            if isinstance(var, Variable):
+                by_id[var.get_id()] = scales[quantity]
+    for var in variables:
+        if str(var) in GLOBAL_QUANTITIES:
+            by_id[var.get_id()] = scales[GLOBAL_QUANTITIES[str(var)]]
+    return {var.get_id(): by_id[var.get_id()] for var in variables
+            if by_id.get(var.get_id(), 1.0) != 1.0}
+
+
+def scale_formula(dg, dim, exprs):
+    """Rewrite the expressions in scaled units, each Variable v of a known
+    quantity is replaced by s * v' where s is its scale and v' is a new
+    Variable of the same name the solver finds instead
+
+    :param DiGraph dg: Graph of the schematic
+    :param list dim: dimensions of the overall chip
+    :param list exprs: SMT expressions of the schematic
+    :returns: tuple -- (scaled formula, dict of scaled Variable id to
+        (original Variable, scale))
+    """
+    variables = {}
+    for expr in exprs:
+        for var in expr.GetFreeVariables():
+            variables[var.get_id()] = var
+    scales = variable_scales(dg, characteristic_scales(dg, dim), list(variables.values()))
+    replacements = {}
+    originals = {}
+    for var_id, scale in scales.items():
+        scaled = Variable(str(variables[var_id]))
+        replacements[var_id] = scale * scaled
+        originals[scaled.get_id()] = (variables[var_id], scale)
+
+    scaled_exprs = []
+    for expr in exprs:
+        # Substituting each expression on its own keeps this linear in the
+        # size of the formula
+        for var in expr.GetFreeVariables():
+            if var.get_id() in replacements:
+                expr = expr.Substitute(var, replacements[var.get_id()])
+        scaled_exprs.append(expr)
+    return logical_and(*scaled_exprs), originals
+
+
+def solver_formula(dg, dim, exprs):
+    """The formula and precision dReal is given for a schematic's
+    expressions, in scaled units if the schematic is solved in them
+
+    :param DiGraph dg: Graph of the schematic
+    :param list dim: dimensions of the overall chip
+    :param list exprs: SMT expressions to solve
+    :returns: tuple -- (formula, originals from scale_formula or None, delta)
+    """
+    if enabled(dg):
+        formula, originals = scale_formula(dg, dim, exprs)
+        return formula, originals, DELTA
+    return logical_and(*exprs), None, UNSCALED_DELTA
+
+
+def unscale_model(model, originals):
+    """Convert a model found in scaled units back to the original Variables
+
+    :param model: dReal Box for the scaled formula
+    :param dict originals: From scale_formula
+    :returns: dict -- original Variable to its Interval in SI units
+    """
+    unscaled = {}
+    for var, interval in model.items():
+        if var.get_id() in originals:
+            original, scale = originals[var.get_id()]
+            unscaled[original] = Interval(interval.lb() * scale, interval.ub() * scale)
+        else:
+            unscaled[var] = interval
+    return unscaled
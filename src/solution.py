@@ -0,0 +1,239 @@
+import numpy as np
+from dreal import Interval
+from dreal.symbolic import Variable
+
+from . import algorithms
+
+# Outcome of a solve
+SAT = 'sat'
+UNSAT = 'unsat'
+TIMEOUT = 'timeout'
+STATUSES = (SAT, UNSAT, TIMEOUT)
+
+
+def component_index(dg, names):
+    """Find the variable holding each attribute of every node and channel
+
+    :param DiGraph dg: Graph of the schematic
+    :param list names: Names of the solved variables
+    :returns: dict -- (node name or channel tuple, attribute) to the position
+        of its variable in names
+    """
+    position = {name: i for i, name in enumerate(names)}
+    index = {}
+    components = [(name, attrs, name + '_', algorithms.NODE_VARIABLES)
+                  for name, attrs in dg.nodes(data=True)] + \
+        [((port_from, port_to), attrs, '_'.join([port_from, port_to, '']),
+          algorithms.CHANNEL_VARIABLES)
+         for port_from, port_to, attrs in dg.edges(data=True)]
+    for component, attrs, prefix, lazy in components:
+        for key, value in attrs.items():
+            if isinstance(value, Variable) and str(value) in position:
+                index[(component, key)] = position[str(value)]
+        # Variables not created yet get the name algorithms.retrieve gives them
+        for key in lazy:
+            if key not in attrs and prefix + key in position:
+                index[(component, key)] = position[prefix + key]
+    return index
+
+
+class Component():
+    """Solved values of one node or channel, each attribute is the midpoint
+    of the interval the solver found for it
+    """
+
+    def __init__(self, solution, component):
+        self._solution = solution
+        self._component = component
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return self._solution.value(self._component, attr)
+
+    def interval(self, attr):
+        """Bounds the solver found for an attribute
+
+        :param str attr: Name of the attribute
+        :returns: tuple -- (lower, upper)
+        """
+        return self._solution.bounds(self._component, attr)
+
+
+class Solution():
+    """Result of solving a schematic, the status of the solve and the lower
+    and upper bound of every variable in NumPy arrays. Attributes of the
+    nodes and channels are found in constant time and the arrays can be
+    queried for every channel at once. It only holds plain data so it can be
+    pickled and sent between processes cheaply
+    """
+
+    def __init__(self, status, names=(), lb=(), ub=(), index=None, channels=(), violations=()):
+        """
+        :param str status: One of SAT, UNSAT or TIMEOUT
+        :param list names: Name of each variable
+        :param lb: Lower bound of each variable
+        :param ub: Upper bound of each variable
+        :param dict index: (component, attribute) to the position of its
+            variable, from component_index
+        :param list channels: Channel tuples in the order of the channel arrays
+        :param list violations: Design rules the schematic broke, when it
+            was found UNSAT without calling the solver
+        """
+        if status not in STATUSES:
+            raise ValueError("status must be one of %s" % ', '.join(STATUSES))
+        self.status = status
+        self.names = list(names)
+        self.lb = np.asarray(lb, dtype=float)
+        self.ub = np.asarray(ub, dtype=float)
+        self.index = dict(index or {})
+        self.channels = [tuple(channel_name) for channel_name in channels]
+        self.violations = list(violations)
+        self._position = {name: i for i, name in enumerate(self.names)}
+        self._columns = {}
+
+    @classmethod
+    def from_box(cls, box, dg=None):
+        """Create a satisfied Solution from a dReal Box or a dict of
+        Variables or their names to Intervals
+
+        :param box: Model found by the solver
+        :param DiGraph dg: Graph of the schematic, needed to look up
+            variables by node or channel
+        :returns: Solution
+        """
+        items = list(box.items())
+        names = [str(var) for var, _ in items]
+        lb = [interval.lb() for _, interval in items]
+        ub = [interval.ub() for _, interval in items]
+        if dg is None:
+            return cls(SAT, names, lb, ub)
+        return cls(SAT, names, lb, ub, component_index(dg, names), list(dg.edges))
+
+    def __getstate__(self):
+        # Lookup tables are rebuilt after unpickling
+        state = dict(self.__dict__)
+        del state['_position']
+        del state['_columns']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._position = {name: i for i, name in enumerate(self.names)}
+        self._columns = {}
+
+    def __bool__(self):
+        return self.status == SAT
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, var):
+        return str(var) in self._position
+
+    def __getitem__(self, var):
+        i = self._position[str(var)]
+        return Interval(self.lb[i], self.ub[i])
+
+    def __repr__(self):
+        return 'Solution(%s, %s variables)' % (self.status, len(self.names))
+
+    def __str__(self):
+        if not self:
+            return '\n'.join(['No solution found (%s)' % self.status] +
+                             [violation.message for violation in self.violations])
+        return '\n'.join('%s : [%s, %s]' % (name, lb, ub)
+                         for name, lb, ub in zip(self.names, self.lb, self.ub))
+
+    def items(self):
+        """Variable names and their Intervals, like iterating a dReal Box
+
+        :returns: list -- (name, Interval) pairs
+        """
+        return [(name, Interval(lb, ub)) for name, lb, ub in zip(self.names, self.lb, self.ub)]
+
+    def _lookup(self, component, attr):
+        try:
+            return self.index[(component, attr)]
+        except KeyError:
+            raise ValueError("The solution has no value for %s of %s" % (attr, component))
+
+    def value(self, component, attr):
+        """Midpoint of the interval found for an attribute
+
+        :param component: Name of the node or channel tuple
+        :param str attr: Name of the attribute
+        :returns: float
+        :raises: ValueError if the solution has no value for it
+        """
+        i = self._lookup(component, attr)
+        return (self.lb[i] + self.ub[i]) / 2
+
+    def bounds(self, component, attr):
+        """Interval found for an attribute
+
+        :param component: Name of the node or channel tuple
+        :param str attr: Name of the attribute
+        :returns: tuple -- (lower, upper)
+        :raises: ValueError if the solution has no value for it
+        """
+        i = self._lookup(component, attr)
+        return self.lb[i], self.ub[i]
+
+    def node(self, name):
+        """Solved values of a node or port, as sol.node('in').pressure
+
+        :param str name: Name of the node
+        :returns: Component
+        """
+        return Component(self, name)
+
+    def channel(self, port_from, port_to):
+        """Solved values of a channel, as sol.channel('in', 'out').width
+
+        :param str port_from: Node the channel starts at
+        :param str port_to: Node the channel ends at
+        :returns: Component
+        """
+        return Component(self, (port_from, port_to))
+
+    def _channel_positions(self, attr):
+        if attr not in self._columns:
+            positions = np.array([self.index.get((channel_name, attr), -1)
+                                  for channel_name in self.channels], dtype=int)
+            self._columns[attr] = (positions, positions >= 0)
+        return self._columns[attr]
+
+    def midpoints(self, attr=None):
+        """Midpoints of the intervals, of every variable or of one attribute
+        of every channel
+
+        :param str attr: Attribute of the channels, None for every variable
+        :returns: ndarray -- aligned with names, or with channels where
+            channels without a variable for attr are NaN
+        """
+        mid = (self.lb + self.ub) / 2
+        if attr is None:
+            return mid
+        positions, found = self._channel_positions(attr)
+        return np.where(found, mid[positions] if len(mid) else np.nan, np.nan)
+
+    def widths(self, attr=None):
+        """Widths of the intervals, how closely the solver pinned each value
+
+        :param str attr: Attribute of the channels, None for every variable
+        :returns: ndarray -- aligned with names, or with channels where
+            channels without a variable for attr are NaN
+        """
+        width = self.ub - self.lb
+        if attr is None:
+            return width
+        positions, found = self._channel_positions(attr)
+        return np.where(found, width[positions] if len(width) else np.nan, np.nan)
+
+    def values(self):
+        """Midpoint of every variable by name
+
+        :returns: dict -- {variable name: float}
+        """
+        return dict(zip(self.names, self.midpoints().tolist()))
@@ -0,0 +1,147 @@
+import numpy as np
+from dreal.symbolic import Variable
+
+from . import solution
+
+# Increment when the layout of the saved arrays changes
+FORMAT_VERSION = 1
+
+# Stored next to each column to restore the values that aren't of the
+# column's type, False and None mark parameters the user didn't define
+_VALUE, _FALSE, _NONE, _MISSING, _TRUE = range(5)
+_MISSING_VALUE = object()
+_SPECIAL = {_FALSE: False, _NONE: None, _TRUE: True}
+
+
+def _flag(value):
+    if value is _MISSING_VALUE:
+        return _MISSING
+    elif value is None:
+        return _NONE
+    elif value is False:
+        return _FALSE
+    elif value is True:
+        return _TRUE
+    return _VALUE
+
+
+def _encode(prefix, rows, arrays):
+    """Store one column per attribute of the given nodes or channels, dReal
+    Variables are left out since they are recreated on load
+
+    :param str prefix: Prefix of the array names, node. or edge.
+    :param list rows: Attribute dict of each node or channel
+    :param dict arrays: Arrays to save, updated in place
+    :raises: ValueError if an attribute holds values of mixed types
+    """
+    keys = sorted({key for attrs in rows for key, value in attrs.items()
+                   if not isinstance(value, Variable)})
+    for key in keys:
+        values = [attrs.get(key, _MISSING_VALUE) for attrs in rows]
+        values = [_MISSING_VALUE if isinstance(value, Variable) else value
+                  for value in values]
+        flags = np.array([_flag(value) for value in values], dtype=np.int8)
+        present = [value for value, flag in zip(values, flags) if flag == _VALUE]
+        name = prefix + key
+        arrays[name + '.flags'] = flags
+        if all(isinstance(value, str) for value in present):
+            arrays[name + '.str'] = np.array([value if flag == _VALUE else ''
+                                              for value, flag in zip(values, flags)], dtype=str)
+        elif all(isinstance(value, (int, float)) for value in present):
+            arrays[name + '.num'] = np.array([value if flag == _VALUE else np.nan
+                                              for value, flag in zip(values, flags)], dtype=float)
+        elif all(isinstance(value, (list, tuple)) for value in present):
+            lengths = [len(value) if flag == _VALUE else 0
+                       for value, flag in zip(values, flags)]
+            arrays[name + '.offsets'] = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+            arrays[name + '.flat'] = np.array([item for value in present for item in value],
+                                              dtype=float)
+        else:
+            raise ValueError("Attribute %s has values that can't be saved" % key)
+
+
+def _decode(prefix, n, arrays):
+    """Rebuild the attribute dicts of the nodes or channels stored by _encode
+
+    :returns: list -- attribute dict of each node or channel
+    """
+    columns = {}
+    missing = {}
+    for filename in arrays.files:
+        if not filename.startswith(prefix) or filename.endswith('.flags'):
+            continue
+        key, kind = filename[len(prefix):].rsplit('.', 1)
+        if kind == 'str' or kind == 'num':
+            values = arrays[filename].tolist()
+        elif kind == 'offsets':
+            offsets = arrays[filename]
+            flat = arrays[prefix + key + '.flat'].tolist()
+            values = [flat[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        else:
+            continue
+        flags = arrays[prefix + key + '.flags']
+        missing[key] = np.flatnonzero(flags == _MISSING)
+        if n and (flags == flags[0]).all() and flags[0] != _VALUE:
+            # Common case of a parameter no component defined
+            values = [_SPECIAL.get(flags[0], _MISSING_VALUE)] * n
+        else:
+            for idx in np.flatnonzero(flags):
+                values[idx] = _SPECIAL.get(flags[idx], _MISSING_VALUE)
+        columns[key] = values
+
+    keys = list(columns)
+    rows = [dict(zip(keys, values)) for values in zip(*columns.values())] if keys else \
+        [{} for _ in range(n)]
+    for key in keys:
+        for idx in missing[key]:
+            del rows[idx][key]
+    return rows
+
+
+def save(sch, path, model=None):
+    """Write the schematic to a .npz file, see Schematic.save
+
+    :param Schematic sch: Schematic to save
+    :param str path: Path of the file to write
+    :param model: Solution or dReal model to store with the schematic, if any
+    """
+    arrays = {'format': np.array(FORMAT_VERSION),
+              'dim': np.array(sch.dim, dtype=float),
+              'names.node': np.array(list(sch.dg.nodes), dtype=str),
+              'names.port_from': np.array([port_from for port_from, _ in sch.dg.edges], dtype=str),
+              'names.port_to': np.array([port_to for _, port_to in sch.dg.edges], dtype=str)
+              }
+    _encode('node.', [attrs for _, attrs in sch.dg.nodes(data=True)], arrays)
+    _encode('edge.', [attrs for _, _, attrs in sch.dg.edges(data=True)], arrays)
+    if model is not None:
+        items = list(model.items())
+        arrays['model.name'] = np.array([str(var) for var, _ in items], dtype=str)
+        arrays['model.lb'] = np.array([interval.lb() for _, interval in items], dtype=float)
+        arrays['model.ub'] = np.array([interval.ub() for _, interval in items], dtype=float)
+    np.savez(path, **arrays)
+
+
+def load(cls, path):
+    """Read a schematic written by save, see Schematic.load
+
+    :param cls: Schematic class to create
+    :param str path: Path of the file to read
+    :returns: Schematic
+    :raises: ValueError if the file was written by a newer format
+    """
+    with np.load(path, allow_pickle=False) as arrays:
+        if int(arrays['format']) > FORMAT_VERSION:
+            raise ValueError("%s was saved in a newer format than this version supports" % path)
+        names = arrays['names.node'].tolist()
+        edges = list(zip(arrays['names.port_from'].tolist(), arrays['names.port_to'].tolist()))
+        sch = cls(arrays['dim'].tolist())
+        sch.dg.add_nodes_from(zip(names, _decode('node.', len(names), arrays)))
+        sch.dg.add_edges_from((port_from, port_to, attrs) for (port_from, port_to), attrs
+                              in zip(edges, _decode('edge.', len(edges), arrays)))
+        if 'model.name' in arrays.files:
+            names = arrays['model.name'].tolist()
+            sch.model = solution.Solution(solution.SAT, names, arrays['model.lb'],
+                                          arrays['model.ub'],
+                                          solution.component_index(sch.dg, names),
+                                          list(sch.dg.edges))
+    return sch
@@ -0,0 +1,319 @@
+import itertools
+import math
+import os
+import sys
+import numpy as np
+from dreal.symbolic import Variable, logical_and, logical_not, logical_or
+
+from . import hierarchy
+
+# Increment when the fit or the layout of the saved table changes
+SURROGATE_VERSION = 2
+# Range of each normalized dimension of the T-junction the surrogate covers,
+# h/w must stay below 1 for the resistance formula and wIn/w above the
+# hydraulic parallel of h and w (at most w/2) for the droplet formula
+DEFAULT_DOMAIN = {'h_w': (0.05, 1.0), 'wIn_w': (0.6, 3.0), 'epsilon_w': (0.0, 0.5)}
+DIMENSIONS = ('h_w', 'wIn_w', 'epsilon_w')
+Q_GUTTER = 0.1
+
+# Surrogates loaded in this process by path
+_loaded = {}
+
+
+def exact_alpha(h_w, wIn_w, epsilon_w):
+    """The alpha term of algorithms.calculate_droplet_volume in terms of the
+    dimensions of the T-junction normalized by the output channel width,
+    the droplet volume is then h * w^2 * (v_fill(h/w) + alpha * qD/qC)
+
+    :param ndarray h_w: height over width of the output channel
+    :param ndarray wIn_w: width of the dispersed channel over width of the output
+    :param ndarray epsilon_w: epsilon over width of the output channel
+    :returns: ndarray -- alpha
+    """
+    hw_parallel = h_w / (1 + h_w)
+    r_pinch = 1 + ((wIn_w - (hw_parallel - epsilon_w)) +
+                   np.sqrt(2 * ((wIn_w - hw_parallel) * (1 - hw_parallel))))
+    return (1 - (math.pi / 4)) * ((1 - Q_GUTTER) ** -1) * \
+        ((r_pinch ** 2 - 1) + ((math.pi / 4) * r_pinch - 1) * h_w)
+
+
+def v_fill(h_w):
+    """Normalized fill volume of algorithms.calculate_droplet_volume, linear in h/w"""
+    return (3 * math.pi / 8) - (math.pi / 2) * (1 - math.pi / 4) * h_w
+
+
+def _monomials(degree):
+    return [powers for powers in itertools.product(range(degree + 1), repeat=len(DIMENSIONS))
+            if sum(powers) <= degree]
+
+
+# Interval arithmetic on (lower, upper) pairs of arrays, used to enclose the
+# derivatives of the fit error over a box around each grid point
+
+def _add(a, b):
+    return a[0] + b[0], a[1] + b[1]
+
+
+def _mul(a, b):
+    products = [a[0] * b[0], a[0] * b[1], a[1] * b[0], a[1] * b[1]]
+    return np.minimum.reduce(products), np.maximum.reduce(products)
+
+
+def _const(value, a):
+    """Constant times an interval"""
+    return (value * a[0], value * a[1]) if value >= 0 else (value * a[1], value * a[0])
+
+
+def _inverse(a):
+    """1 / a for a strictly positive interval"""
+    return 1 / a[1], 1 / a[0]
+
+
+def _power(a, p):
+    """a ** p for a non negative integer p"""
+    if p == 0:
+        return np.ones_like(a[0]), np.ones_like(a[1])
+    low, high = a[0] ** p, a[1] ** p
+    if p % 2:
+        return low, high
+    # Even powers have their minimum at 0 when the interval contains it
+    spans_zero = (a[0] < 0) & (a[1] > 0)
+    return np.where(spans_zero, 0, np.minimum(low, high)), np.maximum(low, high)
+
+
+def _magnitude(a):
+    """Largest absolute value in an interval"""
+    return np.maximum(np.abs(a[0]), np.abs(a[1]))
+
+
+def alpha_gradient(h_w, wIn_w, epsilon_w):
+    """Enclosure of the partial derivatives of exact_alpha over a box, each
+    argument is a (lower, upper) pair and the square root is bounded away
+    from zero over the domain since wIn/w > h/(w + h) and h/(w + h) < 1
+
+    :returns: list -- (lower, upper) of d(alpha)/d(h/w), d(alpha)/d(wIn/w)
+        and d(alpha)/d(epsilon/w)
+    """
+    scale = (1 - (math.pi / 4)) * ((1 - Q_GUTTER) ** -1)
+    one_plus_h = (1 + h_w[0], 1 + h_w[1])
+    # h/(1 + h) is increasing in h, so it's bounded by its value at the ends
+    hw_parallel = (h_w[0] / one_plus_h[0], h_w[1] / one_plus_h[1])
+    d_parallel = _inverse(_power(one_plus_h, 2))
+    u = (wIn_w[0] - hw_parallel[1], wIn_w[1] - hw_parallel[0])
+    v = (1 - hw_parallel[1], 1 - hw_parallel[0])
+    root = (np.sqrt(2 * u[0] * v[0]), np.sqrt(2 * u[1] * v[1]))
+    r_pinch = (1 + u[0] + epsilon_w[0] + root[0], 1 + u[1] + epsilon_w[1] + root[1])
+    # d(alpha)/d(r_pinch) = scale * (2 r_pinch + pi/4 h/w)
+    d_r = _const(scale, _add(_const(2, r_pinch), _const(math.pi / 4, h_w)))
+    d_r_wIn = _add((1, 1), _mul(v, _inverse(root)))
+    d_r_h = _const(-1, _mul(d_parallel, _add((1, 1), _mul(_add(u, v), _inverse(root)))))
+    d_h = _add(_mul(d_r, d_r_h), _const(scale, _add(_const(math.pi / 4, r_pinch), (-1, -1))))
+    return [d_h, _mul(d_r, d_r_wIn), d_r]
+
+
+class DropletSurrogate():
+    """Polynomial fit of the alpha term of the T-junction droplet volume with
+    a bound on its error over the whole domain, so within the domain the
+    fit plus or minus the bound always contains the exact alpha, up to
+    floating point rounding
+    """
+
+    def __init__(self, domain, degree, coefficients, error):
+        """
+        :param dict domain: (low, high) of each of DIMENSIONS
+        :param int degree: Total degree of the polynomial
+        :param ndarray coefficients: Coefficient of each monomial of the
+            dimensions scaled to [-1, 1]
+        :param float error: Bound on |alpha - fit| over the domain
+        """
+        self.domain = {key: tuple(float(bound) for bound in domain[key]) for key in DIMENSIONS}
+        self.degree = int(degree)
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.error = float(error)
+
+    def _scaled(self, values):
+        return [(value - (low + high) / 2) / ((high - low) / 2)
+                for value, (low, high) in zip(values, (self.domain[key] for key in DIMENSIONS))]
+
+    def __call__(self, h_w, wIn_w, epsilon_w):
+        """Evaluate the fit with NumPy
+
+        :returns: ndarray -- approximate alpha
+        """
+        scaled = self._scaled([np.asarray(value, dtype=float)
+                               for value in (h_w, wIn_w, epsilon_w)])
+        total = 0
+        for coefficient, powers in zip(self.coefficients, _monomials(self.degree)):
+            total = total + coefficient * np.prod([x ** p for x, p in zip(scaled, powers)], axis=0)
+        return total
+
+    def gradient(self, scaled):
+        """Enclosure of the partial derivatives of the fit over a box
+
+        :param list scaled: (lower, upper) of each dimension scaled to [-1, 1]
+        :returns: list -- (lower, upper) of the derivative along each of
+            DIMENSIONS, in unscaled units
+        """
+        gradient = []
+        for dimension, key in enumerate(DIMENSIONS):
+            low, high = self.domain[key]
+            total = (np.zeros_like(scaled[0][0]), np.zeros_like(scaled[0][0]))
+            for coefficient, powers in zip(self.coefficients, _monomials(self.degree)):
+                if not powers[dimension]:
+                    continue
+                term = (np.ones_like(total[0]), np.ones_like(total[0]))
+                for other, p in enumerate(powers):
+                    p = p - 1 if other == dimension else p
+                    term = _mul(term, _power(scaled[other], p))
+                total = _add(total, _const(coefficient * powers[dimension], term))
+            gradient.append(_const(2 / (high - low), total))
+        return gradient
+
+    @classmethod
+    def build(cls, domain=None, degree=4, samples=33):
+        """Fit the polynomial by least squares on a grid over the domain and
+        bound its error. Every point of the domain is in the box of half a
+        grid spacing around some grid point, and by the mean value theorem
+        the error there is at most the error at the grid point plus the
+        largest derivative of the error over the box times half the
+        spacing. The derivatives of alpha and of the fit are enclosed over
+        each box with interval arithmetic
+
+        :param dict domain: (low, high) of each of DIMENSIONS, defaults to DEFAULT_DOMAIN
+        :param int degree: Total degree of the polynomial
+        :param int samples: Number of grid points along each dimension
+        :returns: DropletSurrogate
+        """
+        domain = dict(DEFAULT_DOMAIN, **(domain or {}))
+        axes = [np.linspace(domain[key][0], domain[key][1], samples) for key in DIMENSIONS]
+        grid = np.meshgrid(*axes, indexing='ij')
+        alpha = exact_alpha(*grid)
+        if not np.isfinite(alpha).all():
+            raise ValueError("The droplet volume isn't defined over all of the domain %s" % domain)
+
+        surrogate = cls(domain, degree, [], 0)
+        scaled = surrogate._scaled(grid)
+        basis = np.stack([np.prod([x ** p for x, p in zip(scaled, powers)], axis=0).ravel()
+                          for powers in _monomials(degree)], axis=1)
+        surrogate.coefficients = np.linalg.lstsq(basis, alpha.ravel(), rcond=None)[0]
+
+        residual = alpha - (basis @ surrogate.coefficients).reshape(alpha.shape)
+        half = [(values[1] - values[0]) / 2 if len(values) > 1 else 0 for values in axes]
+        boxes = [(np.maximum(values - step, domain[key][0]),
+                  np.minimum(values + step, domain[key][1]))
+                 for values, step, key in zip(grid, half, DIMENSIONS)]
+        exact = alpha_gradient(*boxes)
+        lows, highs = zip(*boxes)
+        fit = surrogate.gradient(list(zip(surrogate._scaled(lows), surrogate._scaled(highs))))
+        margin = np.abs(residual)
+        for step, d_exact, d_fit in zip(half, exact, fit):
+            margin = margin + step * _magnitude(_add(d_exact, _const(-1, d_fit)))
+        if not np.isfinite(margin).all():
+            raise ValueError("The droplet volume's derivatives aren't bounded over the domain %s" %
+                             domain)
+        surrogate.error = margin.max()
+        return surrogate
+
+    def save(self, path):
+        np.savez(path, version=np.array(SURROGATE_VERSION), degree=np.array(self.degree),
+                 coefficients=self.coefficients, error=np.array(self.error),
+                 domain=np.array([self.domain[key] for key in DIMENSIONS]))
+
+    @classmethod
+    def load(cls, path):
+        """Read a surrogate written by save
+
+        :raises: ValueError if it was written by a different version
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            if int(arrays['version']) != SURROGATE_VERSION:
+                raise ValueError("%s was built by a different version of the surrogate" % path)
+            return cls(dict(zip(DIMENSIONS, arrays['domain'].tolist())), int(arrays['degree']),
+                       arrays['coefficients'], float(arrays['error']))
+
+    def constraints(self, name, h, w, wIn, epsilon, qD, qC, volume, exact=None):
+        """Create SMT expressions for the droplet volume that only use
+        polynomials, the ratios are auxiliary variables defined by products
+        and alpha is bounded by the fit plus or minus its error. Outside the
+        domain of the fit the droplet volume is the exact expression instead
+
+        :param str name: Name of the T-junction, used to name the variables
+        :param Variable h: Height of channel
+        :param Variable w: Width of continuous/output channel
+        :param Variable wIn: Width of dispersed_channel
+        :param Variable epsilon: Sharpness of the T-junction
+        :param Variable qD: Flow rate in dispersed_channel
+        :param Variable qC: Flow rate in continuous_channel
+        :param Variable volume: Droplet volume in the output channel
+        :param exact: Exact droplet volume expression used outside the
+            domain, None limits the ratios to the domain instead
+        :returns: list -- SMT expressions
+        """
+        exprs = []
+        ratios = [Variable('_'.join([name, key])) for key in DIMENSIONS]
+        for ratio, numerator in zip(ratios, (h, wIn, epsilon)):
+            exprs.append(ratio * w == numerator)
+        inside = []
+        for ratio, key in zip(ratios, DIMENSIONS):
+            inside.append(ratio >= self.domain[key][0])
+            inside.append(ratio <= self.domain[key][1])
+        flow_ratio = Variable(name + '_qD_qC')
+        exprs.append(flow_ratio * qC == qD)
+
+        scaled = self._scaled(ratios)
+        powers = [[1] + [x ** p for p in range(1, self.degree + 1)] for x in scaled]
+        fit = 0
+        for coefficient, exponents in zip(self.coefficients, _monomials(self.degree)):
+            term = float(coefficient)
+            for dimension, p in enumerate(exponents):
+                if p:
+                    term = term * powers[dimension][p]
+            fit = fit + term
+        alpha = Variable(name + '_alpha')
+        fitted = [alpha >= fit - self.error,
+                  alpha <= fit + self.error,
+                  volume == h * (w * w) * (v_fill(ratios[0]) + alpha * flow_ratio)]
+        if exact is None:
+            return exprs + inside + fitted
+        inside = logical_and(*inside)
+        exprs.append(logical_or(logical_and(inside, *fitted),
+                                logical_and(logical_not(inside), volume == exact)))
+        return exprs
+
+
+def default_path(cache_dir=hierarchy.DEFAULT_CACHE_DIR, domain=None, degree=4, samples=33):
+    """Path in the cache of the surrogate built with these settings"""
+    key = hierarchy.fingerprint([SURROGATE_VERSION, dict(DEFAULT_DOMAIN, **(domain or {})),
+                                 degree, samples])
+    return os.path.join(cache_dir, 'droplet_surrogate_%s.npz' % key[:16])
+
+
+def load_surrogate(path=True):
+    """Get a surrogate, building and saving it the first time it's needed
+
+    :param path: Path of the .npz table, or True for the default one in the cache
+    :returns: DropletSurrogate
+    """
+    if path is True:
+        path = default_path()
+    if path not in _loaded:
+        if os.path.exists(path):
+            _loaded[path] = DropletSurrogate.load(path)
+        else:
+            surrogate = DropletSurrogate.build()
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            surrogate.save(path)
+            _loaded[path] = surrogate
+    return _loaded[path]
+
+
+if __name__ == '__main__':
+    # Build the default table ahead of time: python -m src.surrogate [path]
+    output = sys.argv[1] if len(sys.argv) > 1 else default_path()
+    table = DropletSurrogate.build()
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    table.save(output)
+    print("Saved droplet surrogate with error %g to %s" % (table.error, output))
@@ -0,0 +1,124 @@
+import math
+import time
+import numpy as np
+from dreal import Config, Context
+from dreal.symbolic import Variable, logical_and
+
+from . import algorithms, drc, scaling, solution, telemetry
+
+
+def _hint(box, skip, warm_width):
+    """Bounds around a previous solution for the solver to try first
+
+    :param box: dReal Box of the previous point
+    :param skip: id of the swept parameter, which changes between points
+    :param float warm_width: Fraction of each value the bounds are widened by
+    :returns: list -- SMT expressions
+    """
+    exprs = []
+    for var, interval in box.items():
+        if var.get_id() == skip:
+            continue
+        lb, ub = interval.lb(), interval.ub()
+        if not (math.isfinite(lb) and math.isfinite(ub)):
+            continue
+        half_width = (ub - lb) / 2 + warm_width * abs(lb + ub) / 2
+        exprs.append(var >= (lb + ub) / 2 - half_width)
+        exprs.append(var <= (lb + ub) / 2 + half_width)
+    return exprs
+
+
+def sweep(sch, component, attr, values, warm_start=True, warm_width=0.1, show=False,
+          normalize=None, scale=None):
+    """Solve the schematic at each value of one parameter, see Schematic.sweep
+    """
+    dg = sch.dg
+    if normalize is not None:
+        dg.graph['normalize'] = bool(normalize)
+    if scale is not None:
+        dg.graph['scale'] = bool(scale)
+    attrs = dg.edges[component] if isinstance(component, tuple) else dg.nodes[component]
+    key = 'min_' + attr
+    if key not in attrs:
+        raise ValueError("%s has no parameter %s to sweep" % (component, key))
+    values = list(values)
+    original = attrs[key]
+    parameter = Variable('%s_sweep' % algorithms.retrieve(dg, component, attr))
+
+    # Translate once with the parameter standing in for the user's value so
+    # the constraints are the same ones solve would create at every point
+    start = time.perf_counter()
+    attrs[key] = parameter
+    try:
+        sch.exprs = []
+        sch.translate_schematic()
+    finally:
+        attrs[key] = original
+        if key == 'min_length':
+            # Paths weighted by the parameter mustn't outlive the sweep
+            sch.paths.invalidate()
+    # The stand in isn't stored under a quantity so it stays in SI units
+    formula, originals, delta = scaling.solver_formula(dg, sch.dim, sch.exprs)
+    if show:
+        print(formula)
+    config = Config()
+    config.precision = delta
+    context = Context(config)
+    for var in formula.GetFreeVariables():
+        context.DeclareVariable(var)
+    context.Assert(formula)
+    setup_time = time.perf_counter() - start
+
+    solutions = []
+    solve_times = []
+    warm_starts = 0
+    previous = None
+    for value in values:
+        start = time.perf_counter()
+        attrs[key] = value
+        try:
+            violations = drc.check(dg, sch.dim)
+        finally:
+            attrs[key] = original
+        box = None
+        if not violations:
+            context.Push(1)
+            context.Assert(parameter == value)
+            if warm_start and previous is not None:
+                # A solution inside the hint is a solution, if there's none
+                # there the point is solved again without it
+                context.Push(1)
+                context.Assert(logical_and(*_hint(previous, parameter.get_id(), warm_width)))
+                box = context.CheckSat()
+                context.Pop(1)
+                warm_starts += bool(box)
+            if not box:
+                box = context.CheckSat()
+            context.Pop(1)
+        if box:
+            previous = box
+            model = scaling.unscale_model(box, originals) if originals is not None else box
+            sol = solution.Solution.from_box(
+                {var: interval for var, interval in model.items()
+                 if var.get_id() != parameter.get_id()}, dg)
+        else:
+            sol = solution.Solution(solution.UNSAT, violations=violations)
+        solutions.append(sol)
+        solve_times.append(time.perf_counter() - start)
+
+    sch.model = next((sol for sol in reversed(solutions) if sol), None)
+    if telemetry.enabled():
+        telemetry.emit('sweep', sch,
+                       points=len(values),
+                       setup_time=setup_time,
+                       solve_time=sum(solve_times),
+                       warm_starts=warm_starts,
+                       delta=delta,
+                       expressions=len(sch.exprs),
+                       solved=sum(bool(sol) for sol in solutions))
+    return {'values': values,
+            'solutions': solutions,
+            'status': [sol.status for sol in solutions],
+            'setup_time': setup_time,
+            'solve_times': np.array(solve_times),
+            'warm_starts': warm_starts}
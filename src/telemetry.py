@@ -0,0 +1,211 @@
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak memory isn't reported there
+    resource = None
+
+from . import hierarchy
+
+# Path of the log file, 1 for the default path, unset or 0 to disable
+ENV_VAR = 'PYMANIFOLD_TELEMETRY'
+DEFAULT_PATH = os.path.join(hierarchy.DEFAULT_CACHE_DIR, 'telemetry.jsonl')
+# Fields of the events that are summarized by default
+TIMINGS = ('translate_time', 'solve_time')
+
+_sink = None
+_configured = False
+
+
+def version():
+    """Installed version of pymanifold, so regressions can be traced to a release
+
+    :returns: str or None if it isn't installed
+    """
+    try:
+        from importlib.metadata import PackageNotFoundError, version as package_version
+    except ImportError:
+        return None
+    try:
+        return package_version('pymanifold')
+    except PackageNotFoundError:
+        return None
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes, None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class JsonlSink():
+    """Append each event as a line of JSON, once the file passes max_bytes it
+    is renamed to path.1, path.1 to path.2 and so on, keeping backups files
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backups=5):
+        """
+        :param str path: Path of the log file
+        :param int max_bytes: Size the file can reach before it's rotated
+        :param int backups: Number of rotated files to keep
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    def paths(self):
+        """Paths of the log and its rotated files, oldest first
+
+        :returns: list -- paths that exist
+        """
+        paths = ['%s.%s' % (self.path, idx) for idx in range(self.backups, 0, -1)]
+        return [path for path in paths + [self.path] if os.path.exists(path)]
+
+    def _rotate(self):
+        for idx in range(self.backups - 1, 0, -1):
+            if os.path.exists('%s.%s' % (self.path, idx)):
+                os.replace('%s.%s' % (self.path, idx), '%s.%s' % (self.path, idx + 1))
+        if self.backups:
+            os.replace(self.path, self.path + '.1')
+        else:
+            os.remove(self.path)
+
+    def __call__(self, event):
+        line = json.dumps(event, default=repr) + '\n'
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path) and \
+                os.path.getsize(self.path) + len(line) > self.max_bytes:
+            self._rotate()
+        with open(self.path, 'a') as outfile:
+            outfile.write(line)
+
+
+def set_sink(sink):
+    """Send every event to sink instead of the one configured by the
+    environment
+
+    :param sink: Callable taking the event dict, such as a JsonlSink, or
+        None to disable telemetry
+    :returns: None
+    """
+    global _sink, _configured
+    _sink = sink
+    _configured = True
+
+
+def get_sink():
+    """Sink events are sent to, from set_sink or else PYMANIFOLD_TELEMETRY
+
+    :returns: callable or None if telemetry is disabled
+    """
+    global _sink, _configured
+    if not _configured:
+        setting = os.environ.get(ENV_VAR, '')
+        if setting in ('', '0'):
+            _sink = None
+        else:
+            _sink = JsonlSink(DEFAULT_PATH if setting == '1' else setting)
+        _configured = True
+    return _sink
+
+
+def enabled():
+    """Whether events are being recorded"""
+    return get_sink() is not None
+
+
+def emit(kind, sch, **fields):
+    """Send an event about a schematic to the sink, failures to record it
+    never interrupt the solve
+
+    :param str kind: What happened, 'translate' or 'solve'
+    :param Schematic sch: Schematic the event is about
+    :param fields: Measurements of the event
+    :returns: None
+    """
+    try:
+        sink = get_sink()
+        if sink is None:
+            return
+        nodes, edges = sch.to_plain()
+        event = {'event': kind,
+                 'time': time.time(),
+                 'version': version(),
+                 'fingerprint': hierarchy.fingerprint({'dim': list(sch.dim), 'nodes': nodes,
+                                                       'edges': edges}),
+                 'nodes': len(nodes),
+                 'channels': len(edges),
+                 'peak_rss': peak_rss()}
+        event.update(fields)
+        sink(event)
+    except Exception as e:
+        # Attributes that can't be serialized or a broken sink only lose
+        # the event
+        print("Warning: could not record telemetry: %s" % e, file=sys.stderr)
+
+
+def read_events(paths):
+    """Read the events of JSONL logs, skipping lines that aren't complete
+
+    :param paths: Path of a log, a list of paths or a JsonlSink whose log and
+        rotated files are read
+    :returns: list -- event dicts
+    """
+    if isinstance(paths, JsonlSink):
+        paths = paths.paths()
+    elif isinstance(paths, str):
+        paths = [paths]
+    events = []
+    for path in paths:
+        with open(path) as infile:
+            for line in infile:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+    return events
+
+
+def summarize(events, fields=TIMINGS, percentiles=(50, 90, 99), by='version', kind=None):
+    """Aggregate percentiles of event fields, grouped so releases or designs
+    can be compared to find regressions
+
+    :param events: Events from read_events, or anything read_events accepts
+    :param tuple fields: Fields to aggregate
+    :param tuple percentiles: Percentiles to find
+    :param str by: Field to group the events by, None for one group
+    :param str kind: Only use events of this kind
+    :returns: dict -- group to {field: {'count', 'mean', 'p50', ...}}
+    """
+    if not isinstance(events, list):
+        events = read_events(events)
+    groups = defaultdict(lambda: defaultdict(list))
+    for event in events:
+        if kind is not None and event.get('event') != kind:
+            continue
+        group = event.get(by) if by else None
+        for field in fields:
+            value = event.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                groups[group][field].append(value)
+    summary = {}
+    for group, values in groups.items():
+        summary[group] = {}
+        for field, samples in values.items():
+            samples = np.array(samples, dtype=float)
+            stats = {'count': len(samples), 'mean': float(samples.mean())}
+            for q, value in zip(percentiles, np.percentile(samples, percentiles)):
+                stats['p%s' % q] = float(value)
+            summary[group][field] = stats
+    return summary
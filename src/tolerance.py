@@ -0,0 +1,455 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from . import algorithms, numeric, solution
+
+# Quantities that can be perturbed, geometry varies independently for each
+# channel while viscosity drifts for the whole fluid at once
+CHANNEL_TOLERANCES = ('width', 'height', 'length')
+FLUID_TOLERANCES = ('viscosity',)
+# Pressure sources, the pressure of each input port varies on its own
+SOURCE_TOLERANCES = ('pressure',)
+# Boundary nodes of the flow network whose pressure is held at the solved value
+BOUNDARY_KINDS = ('input', 'output')
+# Upper bound on the number of floats in each batch of linear systems
+BATCH_FLOATS = 1 << 24
+# Relative change of an output below which a parameter doesn't affect it
+ROUNDOFF = 1e-9
+
+
+class _Network():
+    """Nominal values of a solved schematic laid out as arrays for the
+    batched evaluation, one entry per channel
+    """
+
+    def __init__(self, sch, model):
+        dg = sch.dg
+        values = numeric.box_values(model)
+        self.channels = list(dg.edges)
+        self.nominal = {key: np.array([numeric.solved_value(dg, values, channel_name, key)
+                                       for channel_name in self.channels], dtype=float)
+                        for key in CHANNEL_TOLERANCES + FLUID_TOLERANCES}
+
+        # Pressures at the ports are fixed, the pressure at every other node
+        # follows from conservation of flow
+        self.interior = [name for name in dg.nodes if dg.nodes[name]['kind'] not in BOUNDARY_KINDS]
+        index = {name: i for i, name in enumerate(self.interior)}
+        self.boundary = [name for name in dg.nodes if name not in index]
+        boundary_index = {name: i for i, name in enumerate(self.boundary)}
+        self.boundary_pressure = np.array([numeric.solved_value(dg, values, name, 'pressure')
+                                           for name in self.boundary], dtype=float)
+        self.sources = [i for i, name in enumerate(self.boundary)
+                        if dg.nodes[name]['kind'] == 'input']
+        self.ends = [(index.get(port_from), index.get(port_to),
+                      boundary_index.get(port_from), boundary_index.get(port_to))
+                     for port_from, port_to in self.channels]
+
+        self.tjuncs = []
+        for name in dg.nodes:
+            if dg.nodes[name]['kind'] != 'tjunc':
+                continue
+            phases = {dg.edges[channel_name].get('phase'): self.channels.index(channel_name)
+                      for channel_name in list(dg.in_edges(name)) + list(dg.out_edges(name))}
+            phases['output'] = self.channels.index((name, next(iter(dg.succ[name]))))
+            self.tjuncs.append((name, phases))
+        self.epsilon = values.get('epsilon', 0)
+
+        # Outputs of the evaluation and the variable of the schematic each
+        # one is, named like the solver names them
+        self.outputs = {}
+        for name in self.interior:
+            self.outputs[name + '_pressure'] = (name, 'pressure')
+        for channel_name in self.channels:
+            self.outputs['_'.join(channel_name + ('flow_rate',))] = (channel_name, 'flow_rate')
+            self.outputs['_'.join(channel_name + ('resistance',))] = (channel_name, 'resistance')
+        for name, phases in self.tjuncs:
+            channel_name = self.channels[phases['output']]
+            self.outputs['_'.join(channel_name + ('droplet_volume',))] = \
+                (channel_name, 'droplet_volume')
+
+    def solve(self, resistance, boundary_pressure=None):
+        """Find the node pressures and channel flow rates of each sample
+
+        :param ndarray resistance: samples x channels
+        :param ndarray boundary_pressure: samples x boundary nodes, defaults
+            to the solved pressures of the ports
+        :returns: tuple -- (pressure of interior nodes samples x nodes,
+            flow rate samples x channels)
+        """
+        n, k = len(resistance), len(self.interior)
+        if boundary_pressure is None:
+            boundary_pressure = self.boundary_pressure[None, :]
+        boundary_pressure = np.broadcast_to(boundary_pressure, (n, len(self.boundary)))
+        conductance = 1 / resistance
+        A = np.zeros((n, k, k))
+        b = np.zeros((n, k))
+        for e, (i, j, p_i, p_j) in enumerate(self.ends):
+            g = conductance[:, e]
+            if i is not None:
+                A[:, i, i] += g
+                if j is not None:
+                    A[:, i, j] -= g
+                else:
+                    b[:, i] += g * boundary_pressure[:, p_j]
+            if j is not None:
+                A[:, j, j] += g
+                if i is not None:
+                    A[:, j, i] -= g
+                else:
+                    b[:, j] += g * boundary_pressure[:, p_i]
+        pressure = np.linalg.solve(A, b[:, :, None])[:, :, 0] if k else b
+        flow_rate = np.empty_like(resistance)
+        for e, (i, j, p_i, p_j) in enumerate(self.ends):
+            upstream = pressure[:, i] if i is not None else boundary_pressure[:, p_i]
+            downstream = pressure[:, j] if j is not None else boundary_pressure[:, p_j]
+            flow_rate[:, e] = (upstream - downstream) * conductance[:, e]
+        return pressure, flow_rate
+
+
+def _sample(rng, nominal, sigma, shape):
+    return nominal * (1 + sigma * rng.standard_normal(shape))
+
+
+def _evaluate(network, sampled, boundary_pressure=None):
+    """Evaluate the outputs of the network for each sample
+
+    :param _Network network: Network of the solved schematic
+    :param dict sampled: samples x channels array of each of the
+        CHANNEL_TOLERANCES and samples x 1 array of the FLUID_TOLERANCES
+    :param ndarray boundary_pressure: samples x boundary nodes, defaults to
+        the solved pressures
+    :returns: tuple -- ({output: array of the value in each sample}, bool
+        array of the samples the formulas don't hold for)
+    """
+    resistance = numeric.channel_resistance(sampled['width'], sampled['height'],
+                                            sampled['viscosity'], sampled['length'])
+    try:
+        pressure, flow_rate = network.solve(resistance, boundary_pressure)
+    except np.linalg.LinAlgError:
+        raise ValueError("Every node must be connected to a port to find its pressure")
+
+    results = {}
+    for i, name in enumerate(network.interior):
+        results[name + '_pressure'] = pressure[:, i]
+    for e, (port_from, port_to) in enumerate(network.channels):
+        results['_'.join([port_from, port_to, 'flow_rate'])] = flow_rate[:, e]
+        results['_'.join([port_from, port_to, 'resistance'])] = resistance[:, e]
+    for name, phases in network.tjuncs:
+        out = phases['output']
+        port_from, port_to = network.channels[out]
+        results['_'.join([port_from, port_to, 'droplet_volume'])] = numeric.droplet_volume(
+            sampled['height'][:, out], sampled['width'][:, out],
+            sampled['width'][:, phases['dispersed']], network.epsilon,
+            flow_rate[:, phases['dispersed']], flow_rate[:, phases['continuous']])
+
+    # Samples the formulas don't hold for, the resistance needs channels
+    # wider than they are tall and the flow must not reverse
+    bad = ((sampled['height'] >= sampled['width']).any(axis=1) |
+           (sampled['height'] <= 0).any(axis=1) | (sampled['length'] <= 0).any(axis=1) |
+           (sampled['viscosity'] <= 0).any(axis=1) | (flow_rate <= 0).any(axis=1))
+    for name, values in results.items():
+        bad |= np.isnan(values)
+    return results, bad
+
+
+def _check_names(tolerances, limits, network, allowed):
+    unknown = set(tolerances) - set(allowed)
+    if unknown:
+        raise ValueError("Can't vary %s, only %s" %
+                         (', '.join(sorted(unknown)), ', '.join(allowed)))
+    unknown = set(limits) - set(network.outputs)
+    if unknown:
+        raise ValueError("No output named %s" % ', '.join(sorted(unknown)))
+
+
+def monte_carlo(sch, n_samples, tolerances, limits=None, model=None, seed=None):
+    """Evaluate a solved schematic for randomly perturbed geometries and
+    fluid properties without calling the solver, see Schematic.monte_carlo
+    """
+    model = sch.model if model is None else model
+    if not model:
+        raise ValueError("Schematic must be solved before a Monte Carlo analysis")
+    limits = limits or {}
+    network = _Network(sch, model)
+    _check_names(tolerances, limits, network, CHANNEL_TOLERANCES + FLUID_TOLERANCES)
+    rng = np.random.default_rng(seed)
+    m = len(network.channels)
+    k = len(network.interior)
+    batch = max(1, min(n_samples, BATCH_FLOATS // max(1, k * k + 8 * m)))
+
+    outputs = {name: [] for name in network.outputs}
+    passed = np.zeros(n_samples, dtype=bool)
+    invalid = np.zeros(n_samples, dtype=bool)
+
+    for start in range(0, n_samples, batch):
+        n = min(batch, n_samples - start)
+        sampled = {}
+        for key in CHANNEL_TOLERANCES:
+            sampled[key] = _sample(rng, network.nominal[key], tolerances.get(key, 0), (n, m))
+        for key in FLUID_TOLERANCES:
+            sampled[key] = _sample(rng, network.nominal[key], tolerances.get(key, 0), (n, 1))
+        results, bad = _evaluate(network, sampled)
+        good = ~bad
+        for name, (lb, ub) in limits.items():
+            if lb is not None:
+                good &= results[name] >= lb
+            if ub is not None:
+                good &= results[name] <= ub
+        invalid[start:start + n] = bad
+        passed[start:start + n] = good
+        for name, values in results.items():
+            outputs[name].append(np.broadcast_to(values, (n,)))
+
+    outputs = {name: np.concatenate(values) for name, values in outputs.items()}
+    # Statistics only describe the samples the formulas hold for
+    statistics = {}
+    for name, values in outputs.items():
+        values = values[~invalid]
+        if not len(values):
+            statistics[name] = dict.fromkeys(('mean', 'std', 'min', 'max', 'p5', 'p50', 'p95'),
+                                             np.nan)
+            continue
+        p5, p50, p95 = np.percentile(values, [5, 50, 95])
+        statistics[name] = {'mean': values.mean(), 'std': values.std(),
+                            'min': values.min(), 'max': values.max(),
+                            'p5': p5, 'p50': p50, 'p95': p95}
+    return {'n_samples': n_samples,
+            'yield': passed.mean(),
+            'invalid': invalid.mean(),
+            'passed': passed,
+            'statistics': statistics,
+            'samples': outputs}
+
+
+def _parameters(network, tolerances):
+    """Every quantity that varies between its low and high end
+
+    :returns: list -- (name, tolerance key, column, relative tolerance) of
+        each parameter, the column is the channel or boundary node it's for
+    """
+    params = []
+    for key in CHANNEL_TOLERANCES:
+        if tolerances.get(key):
+            params += [('_'.join(channel_name + (key,)), key, e, tolerances[key])
+                       for e, channel_name in enumerate(network.channels)]
+    for key in FLUID_TOLERANCES:
+        if tolerances.get(key):
+            params.append((key, key, None, tolerances[key]))
+    for key in SOURCE_TOLERANCES:
+        if tolerances.get(key):
+            params += [(network.boundary[b] + '_' + key, key, b, tolerances[key])
+                       for b in network.sources]
+    return params
+
+
+def _corner_values(network, params, signs):
+    """Channel quantities and boundary pressures with each parameter at its
+    low end (-1), nominal value (0) or high end (1)
+
+    :param ndarray signs: corners x parameters
+    :returns: tuple -- (sampled quantities as given to _evaluate,
+        corners x boundary nodes pressures)
+    """
+    n = len(signs)
+    sampled = {key: np.repeat(network.nominal[key][None, :], n, axis=0)
+               for key in CHANNEL_TOLERANCES + FLUID_TOLERANCES}
+    boundary_pressure = np.repeat(network.boundary_pressure[None, :], n, axis=0)
+    for j, (_, key, column, tol) in enumerate(params):
+        factor = 1 + tol * signs[:, j]
+        if key in SOURCE_TOLERANCES:
+            boundary_pressure[:, column] *= factor
+        elif column is None:
+            sampled[key] *= factor[:, None]
+        else:
+            sampled[key][:, column] *= factor
+    return sampled, boundary_pressure
+
+
+def _evaluate_corners(network, params, signs):
+    """Evaluate the outputs at each corner in batches like monte_carlo
+
+    :returns: tuple -- ({output: array of the value at each corner}, bool
+        array of the corners the formulas don't hold for)
+    """
+    m = len(network.channels)
+    k = len(network.interior)
+    batch = max(1, BATCH_FLOATS // max(1, k * k + 8 * m))
+    outputs = {name: [] for name in network.outputs}
+    invalid = []
+    for start in range(0, len(signs), batch):
+        chunk = signs[start:start + batch]
+        results, bad = _evaluate(network, *_corner_values(network, params, chunk))
+        for name, values in results.items():
+            outputs[name].append(np.broadcast_to(values, (len(chunk),)))
+        invalid.append(bad)
+    return ({name: np.concatenate(values) for name, values in outputs.items()},
+            np.concatenate(invalid))
+
+
+def dominating_corners(network, params, limits):
+    """Find the corner of the parameters where each limit is closest to
+    being broken. The resistance formula is monotonic in the width, height,
+    length and viscosity of a channel and the pressures and flow rates of
+    the network are monotonic in each resistance and source pressure, so
+    the extremes of an output are at the corner where every parameter is at
+    the end that moves it the same way. Which end that is comes from moving
+    one parameter at a time, 2k + 1 evaluations instead of 2^k
+
+    :param _Network network: Network of the solved schematic
+    :param list params: Parameters from _parameters
+    :param dict limits: (lower, upper) bound of outputs, None for no bound
+    :returns: tuple -- (corners x parameters array of the signs of each
+        distinct corner, list of (output, 'lower' or 'upper', limit, index
+        of its corner) for each bound)
+    """
+    k = len(params)
+    # Each parameter at its low then its high end, then the nominal design
+    signs = np.zeros((2 * k + 1, k))
+    signs[np.arange(k), np.arange(k)] = -1
+    signs[k + np.arange(k), np.arange(k)] = 1
+    results, _ = _evaluate_corners(network, params, signs)
+
+    corners = {}
+    constraints = []
+    for name, (lb, ub) in limits.items():
+        rise = results[name][k:2 * k] - results[name][:k]
+        # Parameters scaling the whole network together, like the viscosity,
+        # only change some outputs by roundoff
+        rise[np.abs(rise) <= ROUNDOFF * np.abs(results[name][2 * k])] = 0
+        rise = np.sign(rise)
+        for bound, limit, direction in (('lower', lb, -1), ('upper', ub, 1)):
+            if limit is None:
+                continue
+            corner = tuple(direction * rise)
+            if corner not in corners:
+                corners[corner] = len(corners)
+            constraints.append((name, bound, limit, corners[corner]))
+    return np.array(list(corners), dtype=float).reshape(len(corners), k), constraints
+
+
+def _corner_spec(sch, plain, values, network, params, signs, limits):
+    """Plain schematic with the parameters fixed at one corner, the flow
+    rates and the pressures inside the chip are left for the solver. It's
+    solved in scaled units so dReal's delta is small next to every value,
+    and where a channel's length moves the nodes are placed by the solver
+    since the length can't stay the distance between fixed positions
+    """
+    sampled, boundary_pressure = _corner_values(network, params, signs[None, :])
+    viscosity = 1.0
+    moved = False
+    for j, (_, key, column, tol) in enumerate(params):
+        if key in FLUID_TOLERANCES:
+            viscosity = 1 + tol * float(signs[j])
+        elif key == 'length' and signs[j]:
+            moved = True
+    boundary = {name: float(boundary_pressure[0, b]) for b, name in enumerate(network.boundary)}
+
+    nodes = []
+    for name, attrs in plain[0]:
+        attrs = dict(attrs)
+        attrs['min_pressure'] = boundary.get(name, False)
+        if 'min_flow_rate' in attrs:
+            attrs['min_flow_rate'] = False
+        if attrs['kind'] == 'input' or attrs.get('min_viscosity'):
+            attrs['min_viscosity'] = float(viscosity) * numeric.solved_value(sch.dg, values, name,
+                                                                      'viscosity')
+        if moved:
+            attrs['min_x'] = attrs['min_y'] = False
+        nodes.append((name, attrs))
+    column = {channel_name: e for e, channel_name in enumerate(network.channels)}
+    edges = []
+    for port_from, port_to, attrs in plain[1]:
+        attrs = dict(attrs)
+        e = column[(port_from, port_to)]
+        for key in CHANNEL_TOLERANCES:
+            attrs['min_' + key] = float(sampled[key][0, e])
+        if 'min_flow_rate' in attrs:
+            attrs['min_flow_rate'] = False
+        edges.append((port_from, port_to, attrs))
+    return {'dim': list(sch.dim),
+            'graph': dict(sch.dg.graph, scale=True),
+            'nodes': nodes,
+            'edges': edges,
+            'limits': [network.outputs[name] + tuple(bounds) for name, bounds in limits.items()]}
+
+
+def solve_corner(spec):
+    """Solve the schematic at one corner with every limit asserted, this
+    runs in a worker process so it only takes plain data
+
+    :param dict spec: Corner from _corner_spec
+    :returns: str -- status of the solve
+    """
+    # Imported here since pymanifold imports this module
+    from .pymanifold import Schematic
+
+    sch = Schematic.from_plain(spec['dim'], spec['nodes'], spec['edges'])
+    sch.dg.graph.update(spec['graph'])
+    sch.translate_schematic()
+    for component, attr, lb, ub in spec['limits']:
+        var = algorithms.retrieve(sch.dg, component, attr)
+        if lb is not None:
+            sch.exprs.append(var >= lb)
+        if ub is not None:
+            sch.exprs.append(var <= ub)
+    return sch.invoke_backend(False).status
+
+
+def worst_case(sch, tolerances, limits=None, model=None, processes=None):
+    """Solve a solved schematic at the corners of its tolerances that bound
+    each limit, see Schematic.worst_case
+    """
+    model = sch.model if model is None else model
+    if not model:
+        raise ValueError("Schematic must be solved before a worst case analysis")
+    network = _Network(sch, model)
+    if limits is None:
+        limits = {name: (0, None) for name, (_, attr) in network.outputs.items()
+                  if attr == 'flow_rate'}
+    _check_names(tolerances, limits, network,
+                 CHANNEL_TOLERANCES + FLUID_TOLERANCES + SOURCE_TOLERANCES)
+    params = _parameters(network, tolerances)
+    signs, constraints = dominating_corners(network, params, limits)
+    if not len(signs):
+        # Without limits only the design itself is checked
+        signs = np.zeros((1, len(params)))
+    results, invalid = _evaluate_corners(network, params, signs)
+
+    values = numeric.box_values(model)
+    plain = sch.to_plain()
+    specs = [_corner_spec(sch, plain, values, network, params, corner, limits)
+             for corner in signs]
+    if processes == 1 or len(specs) <= 1:
+        statuses = [solve_corner(spec) for spec in specs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            statuses = list(pool.map(solve_corner, specs))
+
+    nominal, _ = _evaluate(network, *_corner_values(network, params, np.zeros((1, len(params)))))
+    corners = [{'parameters': {params[j][0]: 'low' if sign < 0 else 'high'
+                               for j, sign in enumerate(corner) if sign},
+                'outputs': {name: float(results[name][idx]) for name in limits},
+                'valid': not invalid[idx],
+                'status': statuses[idx],
+                'constraints': []}
+               for idx, corner in enumerate(signs)]
+    reports = []
+    for name, bound, limit, idx in constraints:
+        value = float(results[name][idx])
+        margin = value - limit if bound == 'lower' else limit - value
+        scale = abs(float(nominal[name][0])) or 1
+        corners[idx]['constraints'].append((name, bound))
+        reports.append({'output': name, 'bound': bound, 'limit': limit, 'corner': idx,
+                        'value': value, 'margin': margin / scale,
+                        'status': statuses[idx]})
+    # The constraint limiting the design is one whose corner has no
+    # solution, or the one closest to its limit if every corner solved
+    limiting = min(reports, default=None,
+                   key=lambda report: (report['status'] == solution.SAT, report['margin']))
+    return {'parameters': [name for name, _, _, _ in params],
+            'corners': corners,
+            'constraints': reports,
+            'limiting': limiting,
+            'certified': all(status == solution.SAT for status in statuses),
+            'solver_calls': len(specs),
+            'exhaustive_corners': 2 ** len(params)}
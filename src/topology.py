@@ -0,0 +1,106 @@
+from collections import deque
+
+# Phases of the channels connected to each specialized node, the first entry
+# are the phases of the channels flowing in and the second flowing out
+TJUNC_PHASES = ({'continuous', 'dispersed'}, {'output'})
+
+
+def _reachable(starts, neighbours):
+    """Breadth first search from all of starts at once
+
+    :param list starts: Names of the nodes to start from
+    :param neighbours: dg.succ to search downstream or dg.pred for upstream
+    :returns: set -- every node reachable from one of starts
+    """
+    seen = set(starts)
+    queue = deque(starts)
+    while queue:
+        name = queue.popleft()
+        for node in neighbours[name]:
+            if node not in seen:
+                seen.add(node)
+                queue.append(node)
+    return seen
+
+
+def _check_tjunc(dg, name, errors):
+    if dg.degree(name) != 3:
+        errors.append("T-junction %s must have 3 connections" % name)
+        return
+    phases_in = [dg.edges[node, name].get('phase') for node in dg.pred[name]]
+    phases_out = [dg.edges[name, node].get('phase') for node in dg.succ[name]]
+    if len(phases_out) != 1:
+        errors.append("T-junction %s must have only one output" % name)
+    for expected, phases, direction in ((TJUNC_PHASES[0], phases_in, 'into'),
+                                        (TJUNC_PHASES[1], phases_out, 'out of')):
+        for phase in sorted(expected - set(phases)):
+            errors.append("T-junction %s needs a %s phase channel %s it" %
+                          (name, phase, direction))
+
+
+def _check_ep_cross(dg, name, errors):
+    if dg.degree(name) != 4:
+        errors.append("Electrophoretic Cross %s must have 4 connections" % name)
+        return
+    phases_out = [dg.edges[name, node].get('phase') for node in dg.succ[name]]
+    phases = phases_out + [dg.edges[node, name].get('phase') for node in dg.pred[name]]
+    if phases_out.count('separation') != 1:
+        errors.append("Electrophoretic Cross %s needs one separation phase channel out of it" %
+                      name)
+    if phases.count('tail') != 1:
+        errors.append("Electrophoretic Cross %s needs one tail phase channel" % name)
+    for channel_name in list(dg.in_edges(name)) + list(dg.out_edges(name)):
+        if dg.edges[channel_name].get('phase') in ('separation', 'tail'):
+            end = channel_name[channel_name[0] == name]
+            if 'voltage' not in dg.nodes[end]:
+                errors.append("Electrophoretic Cross %s %s channel must end at an "
+                              "electrical port" % (name, dg.edges[channel_name]['phase']))
+
+
+def topology_errors(dg):
+    """Check the connections of the schematic before any translation starts,
+    reachability is found once for the whole graph so this runs in time
+    linear in the number of nodes and channels
+
+    :param DiGraph dg: Graph of the schematic
+    :returns: list -- description of every problem found, empty if it's valid
+    """
+    errors = []
+    inputs = []
+    outputs = []
+    for name, attrs in dg.nodes(data=True):
+        kind = attrs.get('kind')
+        if kind is None:
+            errors.append("Node %s is connected to a channel but was never defined" % name)
+            continue
+        if dg.degree(name) == 0:
+            errors.append("Node %s is not connected to any channel" % name)
+        if kind == 'input':
+            inputs.append(name)
+            if dg.pred[name]:
+                errors.append("Cannot have channels into input port %s" % name)
+        elif kind == 'output':
+            outputs.append(name)
+            if dg.succ[name]:
+                errors.append("Cannot have channels out of output port %s" % name)
+        elif kind == 'tjunc':
+            _check_tjunc(dg, name, errors)
+        elif kind == 'ep_cross':
+            _check_ep_cross(dg, name, errors)
+
+    if not inputs:
+        errors.append('Schematic has no input')
+    # Every node must be fed by an input and drain to an output
+    fed = _reachable(inputs, dg.succ)
+    drained = _reachable(outputs, dg.pred)
+    for name in dg.nodes:
+        if dg.degree(name) == 0 or 'kind' not in dg.nodes[name]:
+            continue
+        if name not in drained:
+            if dg.nodes[name]['kind'] == 'input':
+                errors.append('Schematic input %s has no output' % name)
+            else:
+                errors.append("No output can be reached from node %s" % name)
+        if name not in fed:
+            errors.append("Node %s can't be reached from any input" % name)
+    return errors
@@ -0,0 +1,237 @@
+import numpy as np
+from scipy import sparse
+from scipy.integrate import solve_ivp
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import splu
+
+from . import numeric
+
+SOURCE_KINDS = ('pressure', 'flow_rate')
+
+
+def _signal(value):
+    """Make a source value a function of time"""
+    if callable(value):
+        return value
+    return lambda t: value
+
+
+def port_pressures(dg, values, skip=()):
+    """Pressure each port of the schematic is held at, as the user defined
+    it or the solver found it
+
+    :param DiGraph dg: Graph of the schematic
+    :param dict values: Values of the solved variables from numeric.box_values
+    :param skip: Names of ports to leave out
+    :returns: dict -- port name to its pressure, outputs without one are
+        open to the atmosphere at 0
+    :raises: ValueError if an input has no pressure
+    """
+    pressures = {}
+    for name, attrs in dg.nodes(data=True):
+        if name in skip or attrs['kind'] not in ('input', 'output'):
+            continue
+        try:
+            pressures[name] = numeric.solved_value(dg, values, name, 'pressure')
+        except ValueError:
+            if attrs['kind'] == 'input':
+                raise ValueError("Input %s needs a pressure, a model or a source" % name)
+            pressures[name] = 0
+    return pressures
+
+
+def _compliances(dg, compliance, interior):
+    """Compliance of each interior node, its own plus half of each channel
+    connected to it
+
+    :param compliance: A number for every channel or a dict of channel
+        tuples and node names to their compliance (m^3/Pa)
+    :returns: ndarray -- compliance of each interior node
+    """
+    index = {name: i for i, name in enumerate(interior)}
+    node_compliance = np.zeros(len(interior))
+    for channel_name in dg.edges:
+        if isinstance(compliance, dict):
+            value = compliance.get(channel_name, 0)
+        else:
+            value = compliance
+        for end in channel_name:
+            if end in index:
+                node_compliance[index[end]] += value / 2
+    if isinstance(compliance, dict):
+        for name, value in compliance.items():
+            if not isinstance(name, tuple):
+                if name not in dg.nodes:
+                    raise ValueError("Node %s is not part of the schematic" % name)
+                if name in index:
+                    node_compliance[index[name]] += value
+    if (node_compliance < 0).any():
+        raise ValueError("Compliance can't be negative")
+    return node_compliance
+
+
+def _schur_complement(L_SS, L_SA, L_AS, L_AA):
+    """Schur complement L_SS - L_SA L_AA^-1 L_AS of the nodes without
+    compliance, built one connected group of them at a time so it only
+    couples the compliant nodes that group touches and stays sparse
+
+    :returns: csr_matrix -- the Schur complement
+    :raises: RuntimeError if a group isn't connected to a fixed pressure
+    """
+    rows, cols, data = [], [], []
+    n_groups, group = connected_components(L_AA, directed=False)
+    for g in range(n_groups):
+        members = np.flatnonzero(group == g)
+        coupling = sparse.csr_matrix(L_AS[members])
+        touched = np.unique(coupling.indices)
+        if not len(touched):
+            continue
+        lu = splu(sparse.csc_matrix(L_AA[members][:, members]))
+        block = L_SA[touched][:, members] @ lu.solve(coupling[:, touched].toarray())
+        rows.append(np.repeat(touched, len(touched)))
+        cols.append(np.tile(touched, len(touched)))
+        data.append(np.ravel(block))
+    if not rows:
+        return sparse.csr_matrix(L_SS)
+    fill = sparse.coo_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                             shape=L_SS.shape)
+    return sparse.csr_matrix(L_SS - fill)
+
+
+def simulate(sch, t_end, sources=None, compliance=0, model=None, initial=None,
+             t_eval=None, n_points=200, rtol=1e-6, atol=1e-9):
+    """Simulate the pressures and flow rates of the hydraulic network over
+    time, see Schematic.simulate
+    """
+    dg = sch.dg
+    sources = dict(sources or {})
+    values = numeric.box_values(model) if model else {}
+    for name, source in sources.items():
+        if name not in dg.nodes:
+            raise ValueError("Source %s is not a node of the schematic" % name)
+        if len(source) != 2 or source[0] not in SOURCE_KINDS:
+            raise ValueError("Source %s must be (kind, value) with kind one of %s" %
+                             (name, ', '.join(SOURCE_KINDS)))
+
+    # Ports are held at their pressure unless they have a flow source
+    boundary = {name: _signal(pressure) for name, pressure in
+                port_pressures(dg, values, skip=sources).items()}
+    for name, (kind, value) in sources.items():
+        if kind == 'pressure':
+            boundary[name] = _signal(value)
+    injected = {name: _signal(value) for name, (kind, value) in sources.items()
+                if kind == 'flow_rate'}
+    interior = [name for name in dg.nodes if name not in boundary]
+    fixed = list(boundary)
+    if not fixed:
+        raise ValueError("At least one node must have a fixed pressure")
+    position = {name: ('I', i) for i, name in enumerate(interior)}
+    position.update({name: ('B', i) for i, name in enumerate(fixed)})
+
+    channels = list(dg.edges)
+    resistance = np.array([numeric.channel_resistance(
+        *(numeric.solved_value(dg, values, channel_name, key)
+          for key in ('width', 'height', 'viscosity', 'length')))
+        for channel_name in channels], dtype=float)
+    if not (resistance > 0).all():
+        raise ValueError("Every channel must be wider than it is tall to find its resistance")
+    conductance = 1 / resistance
+
+    # Conservation of flow at the interior nodes,
+    # C dp_I/dt = -L_II p_I - L_IB p_B(t) + injected(t)
+    blocks = {'II': ([], [], []), 'IB': ([], [], [])}
+    for g, (port_from, port_to) in zip(conductance, channels):
+        for here, there in ((port_from, port_to), (port_to, port_from)):
+            kind, i = position[here]
+            if kind != 'I':
+                continue
+            rows, cols, data = blocks['II']
+            rows.append(i)
+            cols.append(i)
+            data.append(g)
+            other, j = position[there]
+            rows, cols, data = blocks['I' + other]
+            rows.append(i)
+            cols.append(j)
+            data.append(-g)
+    k = len(interior)
+    L_II = sparse.csc_matrix((blocks['II'][2], blocks['II'][:2]), shape=(k, k))
+    L_IB = sparse.csc_matrix((blocks['IB'][2], blocks['IB'][:2]), shape=(k, len(fixed)))
+    injection_index = [position[name][1] for name in injected]
+
+    def rhs(t):
+        r = -(L_IB @ np.array([boundary[name](t) for name in fixed], dtype=float))
+        for i, name in zip(injection_index, injected):
+            r[i] += injected[name](t)
+        return r
+
+    if t_eval is None:
+        t_eval = np.linspace(0, t_end, n_points)
+    t_eval = np.asarray(t_eval, dtype=float)
+
+    node_compliance = _compliances(dg, compliance, interior)
+    index = {name: i for i, name in enumerate(interior)}
+    for name in initial or {}:
+        if name not in index:
+            raise ValueError("Initial pressure given for %s which is not an "
+                             "interior node" % name)
+        if node_compliance[index[name]] == 0:
+            raise ValueError("Initial pressure given for %s which has no compliance, "
+                             "its pressure is set by its neighbours" % name)
+    S = np.flatnonzero(node_compliance > 0)
+    A = np.flatnonzero(node_compliance == 0)
+    stats = {'nfev': 0, 'njev': 0, 'nlu': 0}
+    if k == 0:
+        p_I = np.zeros((0, len(t_eval)))
+    elif len(S) == 0:
+        # Without compliance the network responds instantly to its sources
+        try:
+            lu = splu(L_II)
+        except RuntimeError:
+            raise ValueError("Every node must be connected to a fixed pressure")
+        p_I = np.column_stack([lu.solve(rhs(t)) for t in t_eval])
+    else:
+        # Nodes without compliance are eliminated, p_A = L_AA^-1 (r_A - L_AS p_S),
+        # M only couples compliant nodes that share a group of them so it stays sparse
+        L_SS = L_II[S][:, S]
+        L_SA = L_II[S][:, A]
+        L_AS = L_II[A][:, S]
+        L_AA = L_II[A][:, A].tocsc()
+        try:
+            lu_A = splu(L_AA) if len(A) else None
+            steady = splu(L_II)
+            M = _schur_complement(L_SS, L_SA, L_AS, L_AA) if len(A) else sparse.csr_matrix(L_SS)
+        except RuntimeError:
+            raise ValueError("Every node must be connected to a fixed pressure")
+        inverse_c = sparse.diags(1 / node_compliance[S])
+        jacobian = sparse.csr_matrix(-(inverse_c @ M))
+
+        def eliminated(r):
+            if lu_A is None:
+                return r[S]
+            return r[S] - L_SA @ lu_A.solve(r[A])
+
+        def derivative(t, p_S):
+            return (eliminated(rhs(t)) - M @ p_S) / node_compliance[S]
+
+        start = steady.solve(rhs(t_eval[0]))
+        for name, pressure in (initial or {}).items():
+            start[index[name]] = pressure
+        solution = solve_ivp(derivative, (t_eval[0], t_eval[-1]), start[S], method='BDF',
+                             t_eval=t_eval, jac=jacobian, rtol=rtol, atol=atol)
+        if not solution.success:
+            raise ValueError("Simulation failed: %s" % solution.message)
+        stats = {key: int(getattr(solution, key)) for key in stats}
+        p_I = np.empty((k, len(t_eval)))
+        p_I[S] = solution.y
+        if lu_A is not None:
+            for column, t in enumerate(t_eval):
+                p_I[A, column] = lu_A.solve(rhs(t)[A] - L_AS @ solution.y[:, column])
+
+    pressure = {name: p_I[i] for i, name in enumerate(interior)}
+    for name in fixed:
+        pressure[name] = np.array([boundary[name](t) for t in t_eval], dtype=float)
+    flow_rate = {channel_name: (pressure[channel_name[0]] - pressure[channel_name[1]]) * g
+                 for g, channel_name in zip(conductance, channels)}
+    return {'t': t_eval, 'pressure': pressure, 'flow_rate': flow_rate,
+            'resistance': dict(zip(channels, resistance)), 'stats': stats}
@@ -1,9 +1,62 @@
 import math
+import numbers
 import networkx as nx
-from src import algorithms
+from . import algorithms, normalize, paths, surrogate
 from dreal.symbolic import Variable, logical_and
 from dreal import if_then_else
 
+# Lower bounds translate_node and translate_channel assert on the parameters
+# the user didn't give a value for, positive reads them to know which
+# denominators can't be 0
+NODE_LOWER_BOUNDS = {'pressure': 0, 'flow_rate': 0, 'viscosity': 0, 'density': 0}
+CHANNEL_LOWER_BOUNDS = {'length': 0, 'width': 0, 'height': 0.000001}
+# Parameters a channel asserts are equal to those of the node it starts at
+INHERITED = ('viscosity', 'flow_rate')
+# Kinds of node that keep what translate_node returns, T-junctions and
+# electrophoretic crosses discard it and with it their outgoing channels
+BOUNDED_KINDS = ('input', 'output', 'node')
+
+
+def positive(dg, component, key):
+    """Whether the expressions translate emits prove a parameter is greater
+    than 0, either its user defined value is or the lower bound asserted
+    without one is at least 0
+
+    :param DiGraph dg: Graph of the schematic
+    :param component: Name of the node or channel
+    :param str key: Name of the parameter without min_
+    :returns: bool
+    """
+    if isinstance(component, tuple):
+        port_from = component[0]
+        if dg.nodes[port_from]['kind'] not in BOUNDED_KINDS:
+            return False
+        if key in INHERITED:
+            return positive(dg, port_from, key)
+        attrs, bounds = dg.edges[component], CHANNEL_LOWER_BOUNDS
+    else:
+        if dg.nodes[component]['kind'] not in BOUNDED_KINDS:
+            return False
+        attrs, bounds = dg.nodes[component], NODE_LOWER_BOUNDS
+    value = attrs.get('min_' + key)
+    if value and not isinstance(value, bool):
+        return isinstance(value, numbers.Real) and value > 0
+    return bounds.get(key, -1) >= 0
+
+
+def _bound(dg, name, key, bounds):
+    """Set a parameter equal to the user defined value, or greater than its
+    lower bound if there isn't one
+
+    :param name: Name of the node or channel
+    :param str key: Name of the parameter without min_
+    :param dict bounds: NODE_LOWER_BOUNDS or CHANNEL_LOWER_BOUNDS
+    :returns: SMT expression
+    """
+    if algorithms.retrieve(dg, name, 'min_' + key):
+        return algorithms.retrieve(dg, name, key) == algorithms.retrieve(dg, name, 'min_' + key)
+    return algorithms.retrieve(dg, name, key) > bounds[key]
+
 
 def translate_chip(dg, name, dim):
     """Create SMT expressions for bounding the nodes to be within constraints
@@ -17,14 +70,23 @@ def translate_chip(dg, name, dim):
     exprs.append(algorithms.retrieve(dg, name, 'y') >= dim[1])
     exprs.append(algorithms.retrieve(dg, name, 'x') <= dim[2])
     exprs.append(algorithms.retrieve(dg, name, 'y') <= dim[3])
+    # Ports fix their own position, other nodes are fixed here if they were
+    # given one by the user or by placement.place
+    if dg.nodes[name]['kind'] not in ('input', 'output'):
+        for key in ('x', 'y'):
+            if algorithms.retrieve(dg, name, 'min_' + key):
+                exprs.append(algorithms.retrieve(dg, name, key) ==
+                             algorithms.retrieve(dg, name, 'min_' + key))
     return exprs
 
 
-def translate_node(dg, name):
+def translate_node(dg, name, recorder=None):
     """Create SMT expressions for bounding the parameters of an node
     to be within the constraints defined by the user
 
     :param name: Name of the node to be constrained
+    :param recorder: Told which component each translate call returned
+        expressions for, see dispatch
     :returns: None -- no issues with translating the port parameters to SMT
     """
     exprs = []
@@ -57,31 +119,10 @@ def translate_node(dg, name):
     else:
         exprs.append(algorithms.retrieve(dg, name, 'y') >= 0)
     # If parameters are provided by the user, then set the
-    # their Variable equal to that value, otherwise make it greater than 0
-    if algorithms.retrieve(dg, name, 'min_pressure'):
-        # If min_pressure has a value then a user defined value was provided
-        # and this variable is set equal to this value, else simply set its
-        # value to be >0, same for viscosity, pressure, flow_rate, X, Y and density
-        exprs.append(algorithms.retrieve(dg, name, 'pressure') ==
-                     algorithms.retrieve(dg, name, 'min_pressure'))
-    else:
-        exprs.append(algorithms.retrieve(dg, name, 'pressure') > 0)
-    if algorithms.retrieve(dg, name, 'min_flow_rate'):
-        exprs.append(algorithms.retrieve(dg, name, 'flow_rate') ==
-                     algorithms.retrieve(dg, name, 'min_flow_rate'))
-    else:
-        exprs.append(algorithms.retrieve(dg, name, 'flow_rate') > 0)
-    if algorithms.retrieve(dg, name, 'min_viscosity'):
-        exprs.append(algorithms.retrieve(dg, name, 'viscosity') ==
-                     algorithms.retrieve(dg, name, 'min_viscosity'))
-    else:
-        exprs.append(algorithms.retrieve(dg, name, 'viscosity') > 0)
-
-    if algorithms.retrieve(dg, name, 'min_density'):
-        exprs.append(algorithms.retrieve(dg, name, 'density') ==
-                     algorithms.retrieve(dg, name, 'min_density'))
-    else:
-        exprs.append(algorithms.retrieve(dg, name, 'density') > 0)
+    # their Variable equal to that value, otherwise make it greater than 0,
+    # same for pressure, flow_rate, viscosity and density
+    for key in NODE_LOWER_BOUNDS:
+        exprs.append(_bound(dg, name, key, NODE_LOWER_BOUNDS))
 
     densities = []
     for node_in in dg.pred[name]:
@@ -94,16 +135,17 @@ def translate_node(dg, name):
                      algorithms.retrieve(dg, list(dg.pred[name].keys())[0], 'density'))
     # To recursively traverse, call on all successor channels
     for node_out in dg.succ[name]:
-        [exprs.append(val) for val in translation_strats[
-            algorithms.retrieve(dg, (name, node_out), 'kind')](dg, (name, node_out))]
+        [exprs.append(val) for val in dispatch(dg, (name, node_out), recorder)]
     return exprs
 
 
-def translate_input(dg, name):
+def translate_input(dg, name, recorder=None):
     """Create SMT expressions for bounding the parameters of an input port
     to be within the constraints defined by the user
 
     :param name: Name of the port to be constrained
+    :param recorder: Told which component each translate call returned
+        expressions for, see dispatch
     :returns: None -- no issues with translating the port parameters to SMT
     """
     exprs = []
@@ -115,7 +157,7 @@ def translate_input(dg, name):
         raise ValueError("Cannot have channels into input port %s" % name)
 
     # If input is a type of node, call translate node
-    [exprs.append(val) for val in translate_node(dg, name)]
+    [exprs.append(val) for val in translate_node(dg, name, recorder)]
 
     # Calculate flow rate for this port based on pressure and channels out
     # if not specified by user
@@ -131,11 +173,13 @@ def translate_input(dg, name):
     return exprs
 
 
-def translate_output(dg, name):
+def translate_output(dg, name, recorder=None):
     """Create SMT expressions for bounding the parameters of an output port
     to be within the constraints defined by the user
 
     :param str name: Name of the port to be constrained
+    :param recorder: Told which component each translate call returned
+        expressions for, see dispatch
     :returns: None -- no issues with translating the port parameters to SMT
     """
     exprs = []
@@ -147,7 +191,7 @@ def translate_output(dg, name):
         raise ValueError("Cannot have channels out of output port %s" % name)
 
     # Since input is just a specialized node, call translate node
-    [exprs.append(val) for val in translate_node(dg, name)]
+    [exprs.append(val) for val in translate_node(dg, name, recorder)]
 
     # Calculate flow rate for this port based on pressure and channels out
     # if not specified by user
@@ -156,8 +200,7 @@ def translate_output(dg, name):
         # the channel coming in (I think, should be verified)
         total_flow_in = []
         for channel_in in dg.pred[name]:
-            total_flow_in.append(dg.edges[(channel_in, name)]
-                                 ['flow_rate'])
+            total_flow_in.append(algorithms.retrieve(dg, (channel_in, name), 'flow_rate'))
         if len(total_flow_in) == 1:
             exprs.append(algorithms.retrieve(dg, name, 'flow_rate') == total_flow_in[0])
         else:
@@ -169,12 +212,14 @@ def translate_output(dg, name):
 
 
 # TODO: Refactor to use different formulas depending on the kind of the channel
-def translate_channel(dg, name):
+def translate_channel(dg, name, recorder=None):
     """Create SMT expressions for a given channel (edges in NetworkX naming)
     currently only works for channels with a rectangular shape, but should
     be expanded to include circular and parabolic
 
     :param str name: The name of the channel to generate SMT equations for
+    :param recorder: Told which component each translate call returned
+        expressions for, see dispatch
     :returns: None -- no issues with translating channel parameters to SMT
     :raises: KeyError, if channel is not found in the list of defined edges
     """
@@ -190,17 +235,8 @@ def translate_channel(dg, name):
     # Set the length determined by pythagorean theorem equal to the user
     # provided number if provided, else assert that the length be greater
     # than 0, same for width and height
-    if algorithms.retrieve(dg, name, 'min_length'):
-        exprs.append(algorithms.retrieve(dg, name, 'length') ==
-                     algorithms.retrieve(dg, name, 'min_length'))
-    else:
-        exprs.append(algorithms.retrieve(dg, name, 'length') > 0)
-
-    if algorithms.retrieve(dg, name, 'min_width'):
-        exprs.append(algorithms.retrieve(dg, name, 'width') ==
-                     algorithms.retrieve(dg, name, 'min_width'))
-    else:
-        exprs.append(algorithms.retrieve(dg, name, 'width') > 0)
+    exprs.append(_bound(dg, name, 'length', CHANNEL_LOWER_BOUNDS))
+    exprs.append(_bound(dg, name, 'width', CHANNEL_LOWER_BOUNDS))
     if algorithms.retrieve(dg, name, 'min_resolution'):
         exprs.append(algorithms.retrieve(dg, name, 'width') <
                      algorithms.retrieve(dg, name, 'min_resolution'))
@@ -208,12 +244,8 @@ def translate_channel(dg, name):
         # Set default to be less than 0.0001m
         exprs.append(algorithms.retrieve(dg, name, 'width') < 1)
 
-    if algorithms.retrieve(dg, name, 'min_height'):
-        exprs.append(algorithms.retrieve(dg, name, 'height') ==
-                     algorithms.retrieve(dg, name, 'min_height'))
-    else:
-        # Set default to be greater than 1um
-        exprs.append(algorithms.retrieve(dg, name, 'height') > 0.000001)
+    # Without a user defined height it's greater than 1um
+    exprs.append(_bound(dg, name, 'height', CHANNEL_LOWER_BOUNDS))
     if algorithms.retrieve(dg, name, 'min_depth'):
         exprs.append(algorithms.retrieve(dg, name, 'height') <
                      algorithms.retrieve(dg, name, 'min_depth'))
@@ -238,8 +270,15 @@ def translate_channel(dg, name):
     # which is needed to make resistance formula valid, second is the SMT
     # equation for the resistance, then assert resistance is >0
     exprs.append(resistance_list[0])
-    resistance = resistance_list[1]
-    exprs.append(algorithms.retrieve(dg, name, 'resistance') == resistance)
+    if normalize.enabled(dg):
+        # With a positive height less than the width the denominator of the
+        # resistance, h^3 (w - 0.63h), is never 0
+        exprs.append(normalize.ratio(dg, algorithms.retrieve(dg, name, 'resistance'),
+                                     *algorithms.channel_resistance_terms(dg, name),
+                                     nonzero=positive(dg, name, 'height')))
+    else:
+        resistance = resistance_list[1]
+        exprs.append(algorithms.retrieve(dg, name, 'resistance') == resistance)
     exprs.append(algorithms.retrieve(dg, name, 'resistance') > 0)
 
     # Assert flow rate equal to the flow rate coming in
@@ -248,13 +287,12 @@ def translate_channel(dg, name):
 
     # Channels do not have pressure because it decreases across channel
     # Call translate on the output to continue traversing the channel
-    [exprs.append(val) for val in translation_strats[algorithms.retrieve(dg,
-        algorithms.retrieve(dg, name, 'port_to'), 'kind')]\
-        (dg, algorithms.retrieve(dg, name, 'port_to'))]
+    [exprs.append(val) for val in dispatch(dg, algorithms.retrieve(dg, name, 'port_to'),
+                                           recorder)]
     return exprs
 
 
-def translate_tjunc(dg, name, crit_crossing_angle=0.5):
+def translate_tjunc(dg, name, crit_crossing_angle=0.5, recorder=None):
     """Create SMT expressions for a t-junction node that generates droplets
     Must have 2 input channels (continuous and dispersed phases) and one
     output channel where the droplets leave the node. Continuous is usually
@@ -263,6 +301,8 @@ def translate_tjunc(dg, name, crit_crossing_angle=0.5):
     :param str name: The name of the channel to generate SMT equations for
     :param crit_crossing_angle: The angle of the dispersed channel to
         the continuous must be great than this to have droplet generation
+    :param recorder: Told which component each translate call returned
+        expressions for, see dispatch
     :returns: None -- no issues with translating channel parameters to SMT
     :raises: KeyError, if channel is not found in the list of defined edges
     """
@@ -353,16 +393,38 @@ def translate_tjunc(dg, name, crit_crossing_angle=0.5):
     # could conflict with calculated value, so ignoring it for now but
     # may be necessary to add at a later point if I'm misunderstand why
     # its needed
-    exprs.append(algorithms.retrieve(dg, output_channel_name, 'droplet_volume') ==
-                 algorithms.calculate_droplet_volume(
-                     dg,
-                     algorithms.retrieve(dg, output_channel_name, 'height'),
-                     algorithms.retrieve(dg, output_channel_name, 'width'),
-                     algorithms.retrieve(dg, dispersed_channel_name, 'width'),
-                     epsilon,
-                     algorithms.retrieve(dg, dispersed_node_name, 'flow_rate'),
-                     algorithms.retrieve(dg, continuous_node_name, 'flow_rate')
-                     ))
+    radicals = normalize.Radicals(dg, name)
+    droplet_volume = algorithms.calculate_droplet_volume(
+        dg,
+        algorithms.retrieve(dg, output_channel_name, 'height'),
+        algorithms.retrieve(dg, output_channel_name, 'width'),
+        algorithms.retrieve(dg, dispersed_channel_name, 'width'),
+        epsilon,
+        algorithms.retrieve(dg, dispersed_node_name, 'flow_rate'),
+        algorithms.retrieve(dg, continuous_node_name, 'flow_rate'),
+        radicals,
+        positive(dg, output_channel_name, 'height') and
+        positive(dg, output_channel_name, 'width') and
+        positive(dg, continuous_node_name, 'flow_rate')
+        )
+    droplet_surrogate = dg.nodes[name].get('droplet_surrogate')
+    if droplet_surrogate:
+        # Polynomial bounds on the droplet volume from a precomputed table,
+        # the exact volume is only used outside the table's domain
+        [exprs.append(val) for val in surrogate.load_surrogate(droplet_surrogate).constraints(
+            name,
+            algorithms.retrieve(dg, output_channel_name, 'height'),
+            algorithms.retrieve(dg, output_channel_name, 'width'),
+            algorithms.retrieve(dg, dispersed_channel_name, 'width'),
+            epsilon,
+            algorithms.retrieve(dg, dispersed_node_name, 'flow_rate'),
+            algorithms.retrieve(dg, continuous_node_name, 'flow_rate'),
+            algorithms.retrieve(dg, output_channel_name, 'droplet_volume'),
+            droplet_volume)]
+    else:
+        exprs.append(algorithms.retrieve(dg, output_channel_name, 'droplet_volume') ==
+                     droplet_volume)
+    [exprs.append(val) for val in radicals.exprs]
 
     # Assert critical angle is <= calculated angle
     cosine_squared_theta_crit = math.cos(math.radians(crit_crossing_angle))**2
@@ -388,17 +450,16 @@ def translate_tjunc(dg, name, crit_crossing_angle=0.5):
                                                   dispersed_node_name
                                                   ))
     # Call translate on output
-    [exprs.append(val) for val in translation_strats[algorithms.retrieve(dg,
-                                                                         output_node_name,
-                                                                         'kind'
-                                                                         )](dg, output_node_name)]
+    [exprs.append(val) for val in dispatch(dg, output_node_name, recorder)]
     return exprs
 
 
-def translate_ep_cross(dg, name, fluid_name = 'default'):
+def translate_ep_cross(dg, name, fluid_name = 'default', recorder=None):
     """Create SMT expressions for an electrophoretic cross
 
     :param str name: the name of the junction node in the electrophoretic cross
+    :param recorder: Told which component each translate call returned
+        expressions for, see dispatch
     :returns: None -- no issues with translating channel parameters to SMT
     :raises: ValueError if the analyte_properties are not defined properly
              TypeError if the analyte_properties are not floats or ints
@@ -461,7 +522,22 @@ def translate_ep_cross(dg, name, fluid_name = 'default'):
 
     # electric field
     E = Variable('E')
-    exprs.append(E == algorithms.calculate_electric_field(dg, anode_node_name, cathode_node_name))
+    field_bounds = dg.edges[separation_channel_name].get('field_bounds')
+    if field_bounds:
+        # Found by nodal analysis in electrical.py, the channel's field is the
+        # voltage drop from the cross to the anode per length while E is the
+        # voltage rise towards the anode per length
+        exprs.append(E >= -field_bounds[1])
+        exprs.append(E <= -field_bounds[0])
+        nonzero_field = field_bounds[0] > 0 or field_bounds[1] < 0
+    else:
+        # The path's length is never 0 if all of its channels have a positive one
+        delta_voltage, length = algorithms.electric_field_terms(dg, anode_node_name,
+                                                                cathode_node_name)
+        channel_path = paths.service(dg).channels(cathode_node_name, anode_node_name)
+        exprs.append(normalize.ratio(dg, E, delta_voltage, length, nonzero=bool(channel_path) and
+                                     all(positive(dg, edge, 'length') for edge in channel_path)))
+        nonzero_field = delta_voltage != 0
     # only works if cathode is an input?  only works for paths that are true in directed graph
 
     # assume that the analyte parameters were included in the injection port
@@ -531,7 +607,14 @@ def translate_ep_cross(dg, name, fluid_name = 'default'):
         # calculate t_peak, initialize variables for t_min
         t_peak.append( Variable('t_peak_' + str(i)) )
         t_min.append( Variable('t_min_' + str(i)) )
-        exprs.append( t_peak[i] == x_detector/v[i] )
+        # v can't be 0 if the field isn't, and the mobility is positive when
+        # the charge isn't negative and the viscosity and radius are positive.
+        # A negative charge's electrophoretic mobility can cancel the
+        # electroosmotic one for some viscosity so its division stays guarded
+        exprs.append(normalize.ratio(dg, t_peak[i], x_detector, v[i],
+                                     nonzero=(nonzero_field and q[i] >= 0 and r[i] > 0 and
+                                              positive(dg, separation_channel_name,
+                                                       'viscosity'))))
 
 
     # detector position is somewhere along the separation channel
@@ -549,7 +632,9 @@ def translate_ep_cross(dg, name, fluid_name = 'default'):
     # the current expression for sigma0 is wrong, adding it only to test the other equations
     # only have definition of sigma0 for round channels (sigma0 ~ r_channel/2.355)
     exprs.append(sigma0 == W / (2*2.355))
-    exprs.append( C_floor == ( min(C0) / (sigma0 + (2*max(D) * x_detector / v[n-1])**0.5) ) )
+    # Square roots become auxiliary variables when normalizing
+    radicals = normalize.Radicals(dg, ep_cross_node_name)
+    exprs.append( C_floor == ( min(C0) / (sigma0 + radicals.sqrt(2*max(D) * x_detector / v[n-1])) ) )
     exprs.append( C_negligible ==  p * C_floor )
 
 
@@ -567,13 +652,14 @@ def translate_ep_cross(dg, name, fluid_name = 'default'):
         # and F = C(x_detector), C is concentration
         # quantify closeness of heights of peaks using the variable diff
         diff.append( Variable('diff_' + str(i)) )
-        exprs.append( diff[i] == C0[i]/C0[i+1] * (D[i+1]*mu[i]/(D[i]*mu[i+1]))**0.5 )
+        exprs.append( diff[i] == C0[i]/C0[i+1] * radicals.sqrt(D[i+1]*mu[i]/(D[i]*mu[i+1])) )
 
         # if 0.1 < diff < 10, then use expression Fi(tmin) = Fi+1(tmin)
         # otherwise use expression dFi/dt (tmin) + dFi+1/dt (tmin) = 0
+        # the derivatives keep their square roots so they still depend on t_min
         t_min_constraint_expression = if_then_else( logical_and(0.1 < diff[i], diff[i] < 10),
-            algorithms.calculate_concentration(dg, C0[i], D[i], W, v[i], x_detector, t_min[i]) -
-            algorithms.calculate_concentration(dg, C0[i+1], D[i+1], W, v[i+1], x_detector, t_min[i]),
+            algorithms.calculate_concentration(dg, C0[i], D[i], W, v[i], x_detector, t_min[i], radicals) -
+            algorithms.calculate_concentration(dg, C0[i+1], D[i+1], W, v[i+1], x_detector, t_min[i], radicals),
             (algorithms.calculate_concentration(dg, C0[i+1], D[i+1], W, v[i+1], x_detector, t_min[i])).Differentiate(t_min[i]) +
             (algorithms.calculate_concentration(dg, C0[i+1], D[i+1], W, v[i+1], x_detector, t_min[i])).Differentiate(t_min[i])
             )
@@ -594,36 +680,59 @@ def translate_ep_cross(dg, name, fluid_name = 'default'):
         # F(tmin, i)/(F(tmax, i)) <= c
         # F(tmin, i)/F(tpeak, j) ~ ( Fi(tmin,i) + Fi+1(tmin, i) + (n-2)(1-q)/(n-3) ) / Fj(tpeak,j)
         exprs.append(
-            (algorithms.calculate_concentration(dg, C0[i], D[i], W, v[i], x_detector, t_min[i]) +
-             algorithms.calculate_concentration(dg, C0[i+1], D[i+1], W, v[i+1], x_detector, t_min[i]) +
+            (algorithms.calculate_concentration(dg, C0[i], D[i], W, v[i], x_detector, t_min[i], radicals) +
+             algorithms.calculate_concentration(dg, C0[i+1], D[i+1], W, v[i+1], x_detector, t_min[i], radicals) +
              (n-2)*(1-qf)/(n-3) * C_negligible)
-             / (algorithms.calculate_concentration(dg, C0[i], D[i], W, v[i], x_detector, t_peak[i]))
+             / (algorithms.calculate_concentration(dg, C0[i], D[i], W, v[i], x_detector, t_peak[i], radicals))
              <= c
          )
 
         # F(tmin, i)/(F(tmax, i+1)) <= c
         exprs.append(
-            (algorithms.calculate_concentration(dg, C0[i], D[i], W, v[i], x_detector, t_min[i]) +
-             algorithms.calculate_concentration(dg, C0[i+1], D[i+1], W, v[i+1], x_detector, t_min[i]) +
+            (algorithms.calculate_concentration(dg, C0[i], D[i], W, v[i], x_detector, t_min[i], radicals) +
+             algorithms.calculate_concentration(dg, C0[i+1], D[i+1], W, v[i+1], x_detector, t_min[i], radicals) +
              (n-2)*(1-qf)/(n-3) * C_negligible)
-             / (algorithms.calculate_concentration(dg, C0[i+1], D[i+1], W, v[i+1], x_detector, t_peak[i+1]))
+             / (algorithms.calculate_concentration(dg, C0[i+1], D[i+1], W, v[i+1], x_detector, t_peak[i+1], radicals))
              <= c
             )
 
+    [exprs.append(val) for val in radicals.exprs]
+
     # Call translate on output - waste node
-    [exprs.append(val) for val in translation_strats[algorithms.retrieve(dg,
-                                                                         waste_node_name,
-                                                                         'kind'
-                                                                         )](dg, waste_node_name)]
+    [exprs.append(val) for val in dispatch(dg, waste_node_name, recorder)]
     # Call translate on output - anode
-    [exprs.append(val) for val in translation_strats[algorithms.retrieve(dg,
-                                                                         anode_node_name,
-                                                                         'kind'
-                                                                         )](dg, anode_node_name)]
+    [exprs.append(val) for val in dispatch(dg, anode_node_name, recorder)]
+
+    return exprs
 
+
+def claim(recorder, name, exprs):
+    """Tell the recorder which component a translate function returned
+    expressions for
+
+    :param recorder: Function called with the name and the expressions, or
+        None if they aren't recorded
+    :param name: Name of the node or channel translated
+    :param list exprs: Expressions returned for it
+    :returns: list -- exprs
+    """
+    if recorder is not None:
+        recorder(name, exprs)
     return exprs
 
 
+def dispatch(dg, name, recorder=None):
+    """Translate a node or channel with the function for its kind
+
+    :param name: Name of the node or channel
+    :param recorder: Passed on through the recursion and told which
+        component each call returned expressions for, see claim
+    :returns: list -- SMT expressions
+    """
+    kind = algorithms.retrieve(dg, name, 'kind')
+    return claim(recorder, name, translation_strats[kind](dg, name, recorder=recorder))
+
+
 translation_strats = {'input': translate_input,
                       'output': translate_output,
                       'node': translate_node,
@@ -0,0 +1,12 @@
+def fork(sch):
+    """Create a variant of a schematic, see Schematic.fork
+    """
+    variant = object.__new__(type(sch))
+    variant.__dict__.update(sch.__dict__)
+    variant.dim = list(sch.dim)
+    variant.exprs = []
+    # DiGraph.copy gives the variant its own attribute dicts, their values
+    # including the solver Variables are shared
+    variant.dg = sch.dg.copy()
+    variant.paths = sch.paths.fork(variant.dg)
+    return variant
@@ -0,0 +1,50 @@
+import numpy as np
+import src.pymanifold as pymf
+from src import solution
+
+sch = pymf.Schematic(dim=[0, 0, 10, 10])
+
+# Same circuit as node_test, built from columns
+port_errors = sch.add_ports({'name': ['in', 'out', 'in'],
+                             'kind': ['input', 'output', 'input'],
+                             'x': np.array([3, 1, 5]),
+                             'y': np.array([3, 1, 5]),
+                             'fluid_name': ['water', 'default', 'water'],
+                             # False is unset, not 0 K
+                             'temperature': [303.15, False, False]})
+node_errors = sch.add_nodes({'name': ['middle node'], 'x': [3], 'y': [1]})
+channel_errors = sch.add_channels({'port_from': ['in', 'middle node', 'in'],
+                                   'port_to': ['middle node', 'out', 'missing'],
+                                   'min_length': [2, False, False],
+                                   'min_width': [0.9, 0.9, -1]})
+model = sch.solve()
+print(model)
+
+junctions = pymf.Schematic(dim=[0, 0, 10, 10])
+surrogate_errors = junctions.add_nodes({'name': ['junction', 'bad junction'],
+                                        'kind': ['tjunc', 'tjunc'],
+                                        'droplet_surrogate': ['table.npz', 2]})
+
+# NumPy integers among the values of an object column are numbers
+scalars = pymf.Schematic(dim=[0, 0, 10, 10])
+scalar_errors = scalars.add_nodes({'name': ['a', 'b'], 'x': [np.int64(2), False]})
+
+
+def test_errors():
+    assert port_errors == [(2, "port 'in' must have a unique name")]
+    assert node_errors == []
+    assert sch.dg.nodes['out']['min_viscosity'] == pymf.Fluid('default').min_viscosity
+    assert surrogate_errors == [(1, "node 'bad junction' droplet_surrogate must be True or a path")]
+    assert junctions.dg.nodes['junction']['droplet_surrogate'] == 'table.npz'
+    assert sch.dg.nodes['middle node']['droplet_surrogate'] is False
+    assert [row for row, _ in channel_errors] == [2, 2]
+
+
+def test_answer():
+    assert model.status == solution.SAT
+
+
+def test_numpy_scalars():
+    assert scalar_errors == []
+    assert scalars.dg.nodes['a']['min_x'] == 2
+    assert scalars.dg.nodes['b']['min_x'] is None
@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import src.pymanifold as pymf
+from src import cli, solution
+
+library = tempfile.mkdtemp()
+cache_dir = tempfile.mkdtemp()
+results_dir = tempfile.mkdtemp()
+summary_path = os.path.join(tempfile.mkdtemp(), 'summary.json')
+for idx in range(3):
+    sch = pymf.Schematic([0, 0, 10, 10])
+    sch.port('in', 'input', min_pressure=1 + idx)
+    sch.port('out', 'output')
+    sch.channel('in', 'out')
+    sch.save(os.path.join(library, 'design%s.npz' % idx), include_model=False)
+# A Manifold IR design in a subdirectory
+os.makedirs(os.path.join(library, 'ir'))
+sch.to_json(os.path.join(library, 'ir', 'design.json'))
+with open(os.path.join(library, 'broken.json'), 'w') as outfile:
+    outfile.write('{"nodes": ')
+
+exit_code = cli.main([library, '--jobs', '2', '--timeout', '60', '--dim', '0', '0', '10', '10',
+                      '--cache-dir', cache_dir, '--results-dir', results_dir,
+                      '--summary', summary_path])
+with open(summary_path) as infile:
+    summary = json.load(infile)
+again = cli.solve_batch([os.path.join(library, '*.npz')], jobs=1, dim=[0, 0, 10, 10],
+                        cache_dir=cache_dir)
+
+
+def test_summary():
+    statuses = {os.path.basename(record['path']): record['status']
+                for record in summary['designs']}
+    assert statuses == {'design0.npz': solution.SAT, 'design1.npz': solution.SAT,
+                        'design2.npz': solution.SAT, 'design.json': solution.SAT,
+                        'broken.json': cli.ERROR}
+    assert summary['counts'][solution.SAT] == 4
+    assert exit_code == 1
+    for record in summary['designs']:
+        assert 'wall_time' in record
+        if record['status'] == solution.SAT:
+            with open(record['result']) as infile:
+                assert 'in_out_length' in json.load(infile)
+
+
+def test_cached():
+    assert summary['cached'] == 0
+    assert again['cached'] == 3
+    assert [record['status'] for record in again['designs']] == [solution.SAT] * 3
+
+
+def test_key_changes_with_source():
+    path = os.path.join(library, 'design0.npz')
+    options = {'dim': None, 'normalize': None, 'scale': None}
+    key = cli.cache_key(path, options)
+    assert cli.source_hash() == cli.source_hash()
+    saved = cli._source_digest
+    cli._source_digest = '0' * 64
+    try:
+        assert cli.cache_key(path, options) != key
+    finally:
+        cli._source_digest = saved
+    assert cli.cache_key(path, options) == key
@@ -0,0 +1,100 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import src.pymanifold as pymf
+from src import diagnosis, solution
+
+sch = pymf.Schematic([0, 0, 10, 10])
+sch.port('in', 'input', min_pressure=1)
+sch.port('out', 'output')
+sch.node('middle node')
+sch.channel('in', 'middle node', min_width=0.001, min_height=0.0001)
+sch.channel('middle node', 'out', min_width=0.001)
+groups = diagnosis.group_expressions(sch)
+report = sch.diagnose(processes=1)
+parallel = sch.diagnose(processes=2)
+
+broken = pymf.Schematic([0, 0, 10, 10])
+broken.port('in', 'input', min_pressure=1)
+broken.port('out', 'output')
+broken.channel('in', 'out', min_width=0.001, min_height=0.002)
+rules = broken.diagnose(processes=1)
+
+# Pressure can't rise from 1kPa to 2kPa along the channels to out, the side
+# branch plays no part in it
+uphill = pymf.Schematic([0, 0, 10, 10])
+uphill.port('in', 'input', min_pressure=1000)
+uphill.port('out', 'output', min_pressure=2000)
+uphill.port('side', 'output')
+uphill.node('middle node')
+uphill.channel('in', 'middle node')
+uphill.channel('middle node', 'out')
+uphill.channel('middle node', 'side')
+conflicting = uphill.diagnose(processes=1)
+conflicting_parallel = uphill.diagnose(processes=2)
+
+# Groups 2 and 5 conflict with each other, every other group is satisfiable
+calls = []
+
+
+def check_many(subsets, remaining):
+    calls.append(len(subsets))
+    return [solution.UNSAT if {2, 5} <= subset else solution.SAT for subset in subsets]
+
+
+search = diagnosis.ConflictSearch(check_many)
+conflict = search.minimize(8)
+timed_out = diagnosis.ConflictSearch(check_many, deadline=time.perf_counter() - 1).minimize(8)
+
+
+def test_groups():
+    # Every expression is attributed to the component that emitted it
+    assert set(groups) == {'in', 'out', 'middle node', ('in', 'middle node'),
+                           ('middle node', 'out')}
+    assert sum(len(exprs) for exprs in groups.values()) == len(sch.exprs)
+    assert any('in_middle node_width' in str(expr) for expr in groups[('in', 'middle node')])
+
+
+def test_groups_in_threads():
+    # Nothing global is patched while grouping so schematics can be grouped at once
+    with ThreadPoolExecutor(2) as executor:
+        uphill_groups, broken_groups = executor.map(diagnosis.group_expressions,
+                                                    [uphill, broken])
+    assert set(broken_groups) == {'in', 'out', ('in', 'out')}
+    assert ('middle node', 'side') in uphill_groups
+
+
+def test_satisfiable():
+    assert report['status'] == solution.SAT
+    assert report['components'] == []
+    assert report['solver_calls'] == 1
+    assert parallel['status'] == solution.SAT
+    assert parallel['groups'] == len(groups)
+
+
+def test_design_rules():
+    assert rules['status'] == solution.UNSAT
+    assert rules['components'] == [('in', 'out')]
+    assert rules['parameters'][('in', 'out')]['min_height'] == 0.002
+    assert rules['parameters'][('in', 'out')]['min_width'] == 0.001
+    assert rules['violations'][0].rule == 'height_below_width'
+
+
+def test_conflict():
+    expected = {'in', ('in', 'middle node'), 'middle node', ('middle node', 'out'), 'out'}
+    for result in (conflicting, conflicting_parallel):
+        assert result['status'] == solution.UNSAT
+        assert result['violations'] == []
+        assert result['minimal']
+        assert result['groups'] == 7
+        assert set(result['components']) == expected
+        assert result['parameters']['in'] == {'min_pressure': 1000}
+        assert result['parameters']['out'] == {'min_pressure': 2000}
+        assert result['solver_calls'] > 1
+
+
+def test_minimize():
+    assert conflict == ([2, 5], True)
+    # Subsets implied by earlier results weren't solved again
+    assert search.cache_hits > 0
+    assert search.solver_calls == sum(calls)
+    assert timed_out == (list(range(8)), False)
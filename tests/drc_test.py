@@ -0,0 +1,59 @@
+import networkx as nx
+import src.pymanifold as pymf
+from src import drc, solution
+
+sch = pymf.Schematic([0, 0, 10, 10])
+sch.port('in', 'input', min_pressure=1, x=12, y=5)
+sch.port('out', 'output', x=1, y=1)
+sch.node('middle node')
+sch.channel('in', 'middle node', min_width=0.001, min_height=0.002)
+sch.channel('middle node', 'out', min_width=0.001, min_resolution=0.0005)
+model = sch.solve()
+
+# A large design is checked in one pass over each column
+large = pymf.Schematic([0, 0, 10, 10])
+large.port('in', 'input', min_pressure=1)
+for idx in range(2000):
+    large.port('out%s' % idx, 'output')
+    large.channel('in', 'out%s' % idx, min_width=0.001, min_height=0.0001 * (idx % 20))
+large_violations = large.check_design()
+
+# Electrophoretic crosses given constants outside of (0, 1)
+crosses = nx.DiGraph()
+crosses.add_node('zero_c', kind='ep_cross', c=0, p=0.5, qf=0.9)
+crosses.add_node('negative_p', kind='ep_cross', c=0.4, p=-0.5, qf=0.9)
+crosses.add_node('valid', kind='ep_cross', c=0.4, p=0.5, qf=0.9)
+
+
+def short_channel(channels, dim):
+    return channels['min_length'] < 0.001
+
+
+def test_report():
+    assert model.status == solution.UNSAT
+    assert not sch.exprs
+    broken = {(violation.rule, violation.component) for violation in model.violations}
+    assert broken == {('height_below_width', ('in', 'middle node')),
+                      ('width_below_resolution', ('middle node', 'out')),
+                      ('position_on_chip', 'in')}
+
+
+def test_vectorized():
+    # Heights of 10 to 19 tenths of a mm reach the 1mm width
+    assert len(large_violations) == 1000
+
+
+def test_ep_cross_constants():
+    broken = {violation.component for violation in drc.check(crosses, [0, 0, 10, 10])}
+    assert broken == {'zero_c', 'negative_p'}
+
+
+def test_user_rule():
+    drc.register('short_channel', 'channels', "Channel %s is shorter than 1mm")(short_channel)
+    try:
+        sch.channel('in', 'out', min_length=0.0005, min_width=0.001)
+        assert ('short_channel', ('in', 'out')) in \
+            {(violation.rule, violation.component) for violation in sch.check_design()}
+    finally:
+        drc.unregister('short_channel')
+    assert 'short_channel' not in [rule.name for rule in drc.rules()]
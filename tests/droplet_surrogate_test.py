@@ -0,0 +1,57 @@
+import os
+import tempfile
+import numpy as np
+from dreal.symbolic import Variable
+import src.pymanifold as pymf
+from src import solution, surrogate
+
+table = surrogate.DropletSurrogate.build(degree=4, samples=17)
+path = os.path.join(tempfile.mkdtemp(), 'droplet_surrogate.npz')
+table.save(path)
+loaded = surrogate.DropletSurrogate.load(path)
+
+# Same circuit as t_junction_test using the table for the droplet volume
+sch = pymf.Schematic([0, 0, 10, 10])
+sch.port('continuous', 'input', min_pressure=1)
+sch.port('dispersed', 'input', min_pressure=1)
+sch.port('out', 'output')
+sch.node('t_j', 1, 0, kind='tjunc', droplet_surrogate=path)
+sch.channel('t_j', 'out', phase='output')
+sch.channel('continuous', 't_j', phase='continuous')
+sch.channel('dispersed', 't_j', phase='dispersed')
+model = sch.solve()
+
+
+def test_error_bound():
+    rng = np.random.default_rng(0)
+    points = [rng.uniform(*table.domain[key], 100000) for key in surrogate.DIMENSIONS]
+    assert np.abs(surrogate.exact_alpha(*points) - table(*points)).max() <= table.error
+
+
+def test_outside_domain():
+    h, w, wIn, epsilon, qD, qC, volume = [Variable(name) for name in
+                                          ('h', 'w', 'wIn', 'epsilon', 'qD', 'qC', 'volume')]
+    limited = table.constraints('t', h, w, wIn, epsilon, qD, qC, volume)
+    exact = table.constraints('t', h, w, wIn, epsilon, qD, qC, volume, exact=volume * 2)
+    # The bounds on the ratios only apply to the fit when the exact volume is given
+    assert len(limited) == len(surrogate.DIMENSIONS) * 3 + 4
+    assert len(exact) == len(surrogate.DIMENSIONS) + 2
+
+
+def test_volume():
+    # The exact formula with the same dimensions as algorithms.calculate_droplet_volume
+    h, w, wIn, epsilon, qD, qC = 0.2, 1.0, 0.9, 0.1, 2.0, 3.0
+    exact = (h * w * w) * (surrogate.v_fill(h / w) +
+                           surrogate.exact_alpha(h / w, wIn / w, epsilon / w) * qD / qC)
+    fit = (h * w * w) * (surrogate.v_fill(h / w) + table(h / w, wIn / w, epsilon / w) * qD / qC)
+    assert abs(exact - fit) <= h * w * w * table.error * qD / qC
+
+
+def test_load():
+    assert np.array_equal(loaded.coefficients, table.coefficients)
+    assert loaded.error == table.error
+    assert loaded.domain == table.domain
+
+
+def test_answer():
+    assert model.status == solution.SAT
@@ -0,0 +1,36 @@
+from dreal import Interval
+import src.pymanifold as pymf
+
+# Same circuit as t_junction_test with its dimensions filled in
+sch = pymf.Schematic([0, 0, 10, 10])
+sch.port('continuous', 'input', min_pressure=2000)
+sch.port('dispersed', 'input', min_pressure=2000)
+sch.port('out', 'output', min_pressure=100)
+sch.node('t_j', 1, 0, kind='tjunc')
+sch.channel('t_j', 'out', phase='output', min_length=0.01, min_width=0.0001,
+            min_height=0.00005)
+sch.channel('continuous', 't_j', phase='continuous', min_length=0.01, min_width=0.0001,
+            min_height=0.00005)
+sch.channel('dispersed', 't_j', phase='dispersed', min_length=0.01, min_width=0.0001,
+            min_height=0.00005)
+model = {'_'.join([*channel_name, 'viscosity']): Interval(0.001, 0.001)
+         for channel_name in sch.dg.edges}
+
+result = sch.simulate_droplets(2, model=model)
+without_feedback = sch.simulate_droplets(2, model=model, droplet_resistance=0)
+generator = result['generators']['t_j']
+
+
+def test_train():
+    assert generator['count'] > 20
+    assert abs(generator['frequency'] * generator['period'] - 1) < 1e-6
+    # Every droplet that left went out of the only output
+    exits = [port for port in result['droplets']['exit_port'] if port is not None]
+    assert exits and set(exits) == {'out'}
+    assert result['channels'][('t_j', 'out')]['mean_droplets'] > 0
+
+
+def test_feedback():
+    # Droplets slow the flow so fewer are made
+    assert generator['count'] < without_feedback['generators']['t_j']['count']
+    assert result['channels'][('t_j', 'out')]['added_resistance'] > 0
@@ -0,0 +1,53 @@
+import numpy as np
+import src.pymanifold as pymf
+from src import electrical
+
+sch = pymf.Schematic([0, 0, 10, 10])
+sch.elec_port('cathode', 'input', voltage=0, min_pressure=1, fluid_name='water')
+sch.elec_port('anode', 'output', voltage=2, fluid_name='water')
+sch.port('in', 'input', min_pressure=1, fluid_name='water')
+sch.port('out', 'output')
+sch.node('cross', 1, 1)
+for port_from, port_to, length in [('cathode', 'cross', 0.01), ('cross', 'anode', 0.03),
+                                   ('in', 'cross', 0.01), ('cross', 'out', 0.01)]:
+    sch.channel(port_from, port_to, min_length=length, min_width=0.0001, min_height=0.00005)
+
+# The stored voltages, then the anode at 4V and the anode left floating
+result = sch.analyze_electrical([{'cathode': 0, 'anode': 2}, {'cathode': 0, 'anode': 4},
+                                 {'cathode': 1, 'anode': None}])
+table = sch.analyze_electrical(np.array([[0, 2]]), resistivity=1000)
+stored = sch.analyze_electrical(apply=True)
+channels = result['channels']
+
+
+def test_nodal_analysis():
+    voltages = result['voltages']
+    cross = result['nodes'].index('cross')
+    # The cross divides the voltage by the length of each side
+    assert np.allclose(voltages[:2, cross], [0.5, 1])
+    # Branches without an electrode at their other end carry no current
+    assert np.allclose(voltages[:2, result['nodes'].index('out')], [0.5, 1])
+    assert np.allclose(result['currents'][:, channels.index(('in', 'cross'))], 0)
+    # With one electrode the whole chip is at its voltage
+    assert np.allclose(voltages[2], 1)
+    assert np.allclose(result['power'][2], 0)
+
+
+def test_channels():
+    conductance = 0.0001 * 0.00005 / (18200 * 0.03)
+    separation = channels.index(('cross', 'anode'))
+    assert np.isclose(result['conductance'][separation], conductance)
+    assert np.isclose(result['fields'][0, separation], -1.5 / 0.03)
+    assert np.isclose(result['currents'][0, separation], -1.5 * conductance)
+    assert np.isclose(result['power'][1, separation], 3 ** 2 * conductance)
+    # Current flows in at the anode and out at the cathode
+    assert np.allclose(result['electrode_currents'][0], [-1.5 * conductance, 1.5 * conductance])
+    assert np.allclose(table['voltages'], result['voltages'][:1])
+    assert np.isclose(table['conductance'][separation], conductance * 18.2)
+
+
+def test_apply():
+    assert electrical.field_bounds(result)[('cross', 'anode')] == [-100, 0]
+    assert electrical.field_bounds(result, [0, 1])[('cross', 'anode')] == [-100, -50]
+    assert sch.dg.edges['cross', 'anode']['field_bounds'] == [-50, -50]
+    assert ('cross', 'out') in stored['channels']
@@ -0,0 +1,52 @@
+import numpy as np
+from dreal import Interval
+import src.pymanifold as pymf
+from src import numeric
+
+# Two analytes arriving at 1 s and 2 s
+result = numeric.electropherogram(C0=[1, 0.5], D=[1e-9, 1e-9], W=1e-4, v=[0.01, 0.005],
+                                  x_detector=0.01, n_samples=5000)
+
+# Dozens of analytes over thousands of time samples
+many = numeric.electropherogram(C0=np.ones(50), D=np.full(50, 1e-9), W=1e-4,
+                                v=np.linspace(0.001, 0.01, 50), x_detector=0.01,
+                                n_samples=5000)
+
+sch = pymf.Schematic([0, 0, 10, 10])
+sch.elec_port('cathode', 'input', voltage=0, min_pressure=1)
+sch.elec_port('anode', 'output', voltage=2)
+sch.port('in', 'input', min_pressure=1, fluid_name='ep_cross_test_sample')
+sch.port('out', 'output')
+sch.node('ep_c', 1, 1, kind='ep_cross')
+sch.channel('cathode', 'ep_c', min_length=1, min_width=1, phase='tail')
+sch.channel('ep_c', 'anode', min_length=1, min_width=1, phase='separation')
+sch.channel('in', 'ep_c', min_length=1, min_width=1)
+sch.channel('ep_c', 'out', min_length=1, min_width=1)
+model = {'ep_c_anode_x_detector': Interval(0.5, 0.5),
+         'ep_c_anode_viscosity': Interval(0.001, 0.001)}
+simulated = numeric.simulate_ep_cross(sch, 'ep_c', model)
+
+
+def test_erf():
+    x = np.linspace(-3, 3, 13)
+    assert np.allclose(numeric.erf_approximation(x), -numeric.erf_approximation(-x))
+    assert abs(numeric.erf_approximation(1) - 0.8427) < 1e-3
+
+
+def test_peaks():
+    assert np.allclose(result['t_peak'], [1, 2])
+    assert np.allclose(result['times'][result['concentrations'].argmax(axis=1)], [1, 2],
+                       atol=1e-3)
+    assert 1 < result['t_min'][0] < 2
+    assert result['valley_ratio'][0] < 0.01
+    assert result['resolution'][0] > 1.5
+
+
+def test_many_analytes():
+    assert many['concentrations'].shape == (50, 5000)
+
+
+def test_simulate():
+    # 2 V across the 2 m between the electrodes
+    v = numeric.mobility([-1, -2, -3, -4], [0.05] * 4, 0.001) * 2 / 2
+    assert np.allclose(simulated['t_peak'], 0.5 / v)
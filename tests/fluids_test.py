@@ -0,0 +1,97 @@
+import json
+import os
+import pickle
+import tempfile
+import numpy as np
+import src.pymanifold as pymf
+from src import fluids
+
+water = fluids.Fluid('water')
+warm = fluids.Fluid('water', 303.15)
+between = fluids.Fluid('water', 300)
+
+# Thousands of ports at a handful of temperatures
+temperatures = np.tile([293.15, 300, np.nan, 343.15], 1000)
+port_fluids = fluids.lookup(['water'] * len(temperatures), temperatures)
+
+path = os.path.join(tempfile.mkdtemp(), 'fluids.json')
+with open(path, 'w') as outfile:
+    json.dump({'fluids': {'glycerol': {'density': 1261, 'resistivity': False,
+                                       'viscosity': 1.41,
+                                       'tables': {'temperature': [283.15, 303.15],
+                                                  'viscosity': [3.9, 0.612]}}}}, outfile)
+added = fluids.load(path)
+
+sch = pymf.Schematic([0, 0, 10, 10])
+sch.port('in', 'input', fluid_name='water', temperature=343.15)
+sch.port('glycerol in', 'input', fluid_name='glycerol')
+errors = sch.add_ports({'name': ['a', 'b', 'c'],
+                        'kind': ['input', 'input', 'input'],
+                        'fluid_name': ['water', 'mineraloil', 'water'],
+                        'temperature': [313.15, 300, 400]})
+
+
+def test_shared():
+    assert fluids.Fluid('water') is water
+    assert fluids.Fluid('water', 303.15) is warm
+    assert pickle.loads(pickle.dumps(warm)) is warm
+    assert len({id(fluid) for fluid in port_fluids}) == 4
+    assert port_fluids[1] is between
+    assert port_fluids[2] is water
+
+
+def test_immutable():
+    try:
+        water.min_viscosity = 1
+        assert False
+    except AttributeError:
+        pass
+    custom = water.with_properties(min_density=1000, min_viscosity=0.002)
+    assert custom is not water
+    assert custom.min_viscosity == 0.002
+    assert water.min_viscosity == 0.001
+    # Updating in place can't work on a shared fluid so it isn't silently ignored
+    try:
+        water.updateFluidProperties(min_viscosity=0.002)
+        assert False
+    except AttributeError:
+        pass
+
+
+def test_bounded_instances():
+    for temperature in np.linspace(280, 370, fluids.MAX_INSTANCES + 10):
+        fluids.Fluid('water', temperature)
+    assert len(fluids._instances) == fluids.MAX_INSTANCES
+
+
+def test_interpolation():
+    # Nominal values are unchanged, table entries are returned exactly
+    assert water.min_viscosity == 0.001
+    assert np.isclose(warm.min_viscosity, 0.000798)
+    assert np.isclose(warm.min_density, 995.65)
+    assert 0.000798 < between.min_viscosity < 0.000890
+    assert warm.min_resistivity == water.min_resistivity
+    try:
+        fluids.Fluid('water', 400)
+        assert False
+    except ValueError:
+        pass
+    try:
+        fluids.Fluid('mineraloil', 300)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_library():
+    assert added == ['glycerol']
+    assert 'glycerol' in fluids.names()
+    assert fluids.Fluid('glycerol', 293.15).min_density == 1261
+    assert fluids.temperature_range('glycerol') == (283.15, 303.15)
+    assert sch.dg.nodes['in']['min_viscosity'] == fluids.Fluid('water', 343.15).min_viscosity
+    assert sch.dg.nodes['glycerol in']['min_viscosity'] == 1.41
+
+
+def test_bulk():
+    assert [row for row, _ in errors] == [1, 2]
+    assert sch.dg.nodes['a']['min_density'] == 992.22
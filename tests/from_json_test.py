@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import src.pymanifold as pymf
+from src import fluids, solution
+
+# Circuit of node_test in Manifold's intermediate representation
+manifold_ir = {"name": "Json Data",
+               "userDefinedTypes": {},
+               "portTypes": {},
+               "nodeTypes": {},
+               "constraintTypes": {},
+               "nodes": {"pT0": {"type": "input",
+                                 "portAttrs": "in",
+                                 "attributes": {"id": "in", "min_x": 3, "min_y": 3,
+                                                "fluid_name": "water", "temperature": 303.15,
+                                                "min_resistivity": 1000}},
+                         "pT1": {"type": "output",
+                                 "portAttrs": "out",
+                                 "attributes": {"id": "out", "min_x": 1, "min_y": 1}},
+                         "pT2": {"type": "node",
+                                 "portAttrs": "middle node",
+                                 "attributes": {"id": "middle node", "x": 3, "y": 1}}},
+               "connections": {"ch0": {"from": "in", "to": "middle node",
+                                       "attributes": {"min_length": 2, "min_width": 0.9}},
+                               "ch1": {"from": "middle node", "to": "out",
+                                       "attributes": {"min_width": 0.9,
+                                                      "length": [1.9, 2.1]}}},
+               "constraints": {"graph": {"scale": True, "unknown": 1}}
+               }
+path = os.path.join(tempfile.mkdtemp(), 'node_test.json')
+with open(path, 'w') as outfile:
+    json.dump(manifold_ir, outfile)
+
+# One node at a time so every batch boundary is crossed
+sch = pymf.Schematic.from_json(path, [0, 0, 10, 10], batch_size=1)
+settings = pymf.Schematic.from_json(path, [0, 0, 10, 10], solve_settings=True)
+
+# Connections listed before the nodes wait for them
+reordered = {"connections": manifold_ir["connections"], "nodes": manifold_ir["nodes"]}
+reordered_path = os.path.join(tempfile.mkdtemp(), 'reordered.json')
+with open(reordered_path, 'w') as outfile:
+    json.dump(reordered, outfile)
+early = pymf.Schematic.from_json(reordered_path, [0, 0, 10, 10], batch_size=1)
+model = sch.solve()
+print(model)
+
+
+def test_parameters():
+    assert sch.dg.nodes['in']['min_viscosity'] == fluids.Fluid('water', 303.15).min_viscosity
+    assert sch.dg.nodes['in']['min_resistivity'] == 1000
+    assert sch.dg.nodes['middle node']['droplet_surrogate'] is False
+    assert sch.dg.nodes['middle node']['min_x'] == 3
+    assert sch.dg.edges['in', 'middle node']['min_length'] == 2
+    # Solved intervals are not user parameters
+    assert not sch.dg.edges['middle node', 'out']['min_length']
+
+
+def test_connections_first():
+    assert sorted(early.dg.edges) == sorted(sch.dg.edges)
+    assert early.dg.edges['in', 'middle node']['min_length'] == 2
+
+
+def test_solve_settings():
+    assert dict(sch.dg.graph) == {}
+    assert dict(settings.dg.graph) == {'scale': True}
+
+
+def test_answer():
+    assert model.status == solution.SAT
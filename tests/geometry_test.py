@@ -0,0 +1,63 @@
+import src.pymanifold as pymf
+from dreal import Interval
+from src import algorithms, geometry
+
+# A row of straight channels between placed ports, far enough apart that
+# only neighbours can come near each other
+row = pymf.Schematic(dim=[0, 0, 0.1, 0.01])
+for i in range(20):
+    row.port('in%s' % i, 'input', min_pressure=2000, x=0.005 * i + 0.001, y=0.001)
+    row.port('out%s' % i, 'output', min_pressure=500, x=0.005 * i + 0.008, y=0.009)
+    row.channel('in%s' % i, 'out%s' % i)
+row_pairs = geometry.candidate_pairs(row.dg, row.dim)
+
+# Two channels forming an X, one end of the second is free to move
+cross = pymf.Schematic(dim=[0, 0, 0.01, 0.01])
+cross.port('a', 'input', min_pressure=2000, x=0.001, y=0.001)
+cross.port('b', 'output', min_pressure=500, x=0.009, y=0.009)
+cross.port('c', 'input', min_pressure=2000, x=0.001, y=0.009)
+cross.port('d', 'output', min_pressure=500)
+cross.channel('a', 'b')
+cross.channel('c', 'd')
+cross_exprs = geometry.translate_non_crossing(cross.dg, cross.dim)
+
+# Two channels apart from each other once an earlier solve put the free end
+# of the second in the far corner
+apart = pymf.Schematic(dim=[0, 0, 0.01, 0.01])
+apart.port('a', 'input', min_pressure=2000, x=0.001, y=0.001)
+apart.port('b', 'output', min_pressure=500, x=0.002, y=0.009)
+apart.port('c', 'input', min_pressure=2000, x=0.008, y=0.001)
+apart.port('d', 'output', min_pressure=500)
+apart.channel('a', 'b')
+apart.channel('c', 'd')
+apart_model = {algorithms.retrieve(apart.dg, 'd', 'x'): Interval(0.008, 0.009),
+               algorithms.retrieve(apart.dg, 'd', 'y'): Interval(0.008, 0.009)}
+apart_exprs = geometry.translate_non_crossing(apart.dg, apart.dim, apart_model)
+
+
+def test_grid_prunes_distant_channels():
+    # All pairs would be 190, only channels in neighbouring cells are compared
+    assert 0 < len(row_pairs) < 40
+    for first, second in row_pairs:
+        assert abs(int(first[0][2:]) - int(second[0][2:])) == 1
+    # Placed channels that don't cross need no constraints
+    assert geometry.translate_non_crossing(row.dg, row.dim) == []
+
+
+def test_possible_crossing():
+    assert geometry.candidate_pairs(cross.dg, cross.dim) == [(('a', 'b'), ('c', 'd'))]
+    assert len(cross_exprs) == 1
+    # Channels sharing a node meet there by design
+    cross.channel('a', 'd')
+    assert (('a', 'd'), ('c', 'd')) not in geometry.candidate_pairs(cross.dg, cross.dim)
+
+
+def test_model_prunes_and_bounds():
+    assert len(geometry.translate_non_crossing(apart.dg, apart.dim)) == 1
+    # The pair is pruned and d is kept within the box it was pruned with
+    assert geometry.candidate_pairs(apart.dg, apart.dim, apart_model) == []
+    assert [str(expr) for expr in apart_exprs] == \
+        [str(expr) for expr in (algorithms.retrieve(apart.dg, 'd', 'x') >= 0.008,
+                                algorithms.retrieve(apart.dg, 'd', 'x') <= 0.009,
+                                algorithms.retrieve(apart.dg, 'd', 'y') >= 0.008,
+                                algorithms.retrieve(apart.dg, 'd', 'y') <= 0.009)]
@@ -0,0 +1,47 @@
+import src.pymanifold as pymf
+from src import hierarchy, solution
+
+sch = pymf.Schematic(dim=[0, 0, 10, 10])
+
+#  in---a---b---out
+#  \_____/ \_____/
+#   first   second subcircuit
+sch.port('in', 'input', x=1, y=1, fluid_name='water')
+sch.node('a', x=3, y=1)
+sch.node('b', x=5, y=1)
+sch.port('out', 'output', x=7, y=1)
+sch.channel('in', 'a', min_width=0.9)
+sch.channel('a', 'b', min_width=0.9)
+sch.channel('b', 'out', min_width=0.9)
+model = sch.solve_hierarchical([['in', 'a'], ['b', 'out']], processes=1, cache_dir=False)
+print(model)
+
+# Each subcircuit on its own picks the pressure of its interface node, a for
+# the first and b for the second, without knowing the channel between them
+# has to drop the pressure from a to b
+split = pymf.Schematic(dim=[0, 0, 10, 10])
+split.port('in', 'input', x=1, y=1, min_pressure=2000, fluid_name='water')
+split.node('a', x=3, y=1)
+split.node('b', x=5, y=1)
+split.port('out', 'output', x=7, y=1, min_pressure=100)
+split.channel('in', 'a', min_width=0.9)
+split.channel('a', 'b', min_width=0.9)
+split.channel('b', 'out', min_width=0.9)
+split_model = split.solve_hierarchical([['in', 'a'], ['b', 'out']], processes=1,
+                                       cache_dir=False)
+
+
+def test_answer():
+    assert model.status == solution.SAT
+
+
+def test_witnesses_disagree():
+    assert split_model.status == solution.SAT
+    # The subcircuits still have solutions at the interface values returned
+    spec_nodes, spec_edges = split.to_plain(['b', 'out'])
+    spec_nodes = [(name, dict(attrs, kind='input') if name == 'b' else attrs)
+                  for name, attrs in spec_nodes]
+    pins = {'b': {'pressure': list(split_model.bounds('b', 'pressure'))}}
+    assert hierarchy.solve_subcircuit({'dim': split.dim, 'nodes': spec_nodes,
+                                       'edges': spec_edges, 'interface': ['b'],
+                                       'pins': pins}) is not None
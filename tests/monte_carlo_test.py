@@ -0,0 +1,48 @@
+import numpy as np
+from dreal import Interval
+import src.pymanifold as pymf
+
+# Same circuit as node_test with the solved values filled in by hand
+sch = pymf.Schematic(dim=[0, 0, 10, 10])
+sch.port('in', 'input', x=3, y=3, min_pressure=2, fluid_name='water')
+sch.port('out', 'output', x=1, y=1, min_pressure=1)
+sch.node('middle node', x=3, y=1)
+sch.channel('in', 'middle node', min_length=2, min_width=0.9, min_height=0.1)
+sch.channel('middle node', 'out', min_length=2, min_width=0.9, min_height=0.1)
+model = {'in_middle node_viscosity': Interval(0.001, 0.001),
+         'middle node_out_viscosity': Interval(0.001, 0.001)}
+
+nominal = sch.monte_carlo(10, {}, model=model)
+# Wide enough that some channels end up taller than they are wide
+wide = sch.monte_carlo(1000, {'height': 2}, model=model, seed=0)
+result = sch.monte_carlo(10**6, {'width': 0.02, 'height': 0.05, 'viscosity': 0.01},
+                         limits={'middle node_pressure': (1.45, 1.55)}, model=model, seed=0)
+
+
+def test_nominal():
+    assert nominal['yield'] == 1
+    assert np.allclose(nominal['samples']['middle node_pressure'], 1.5)
+
+
+def test_yield():
+    pressure = result['samples']['middle node_pressure']
+    assert len(pressure) == 10**6
+    assert abs(result['statistics']['middle node_pressure']['p50'] - 1.5) < 1e-3
+    assert result['yield'] == ((pressure >= 1.45) & (pressure <= 1.55)).mean()
+    assert 0 < result['yield'] < 1
+
+
+def test_invalid_samples():
+    assert 0 < wide['invalid'] < 1
+    statistics = wide['statistics']['in_middle node_resistance']
+    assert not np.isnan(statistics['mean'])
+    # Negative heights give negative resistances which are left out
+    assert statistics['min'] > 0
+
+
+def test_unknown_tolerance():
+    try:
+        sch.monte_carlo(10, {'depth': 0.1}, model=model)
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,60 @@
+import src.pymanifold as pymf
+from dreal.symbolic import Variable
+from src import normalize, solution, translate
+
+
+def build():
+    # Same circuit as t_junction_test
+    sch = pymf.Schematic([0, 0, 10, 10])
+    sch.port('continuous', 'input', min_pressure=1)
+    sch.port('dispersed', 'input', min_pressure=1)
+    sch.port('out', 'output')
+    sch.node('t_j', 1, 0, kind='tjunc')
+    sch.channel('t_j', 'out', phase='output')
+    sch.channel('continuous', 't_j', phase='continuous')
+    sch.channel('dispersed', 't_j', phase='dispersed')
+    return sch
+
+
+sch = build()
+model = sch.solve(normalize=True)
+formula = ' '.join(str(expr) for expr in sch.exprs)
+results = normalize.benchmark(build)
+
+
+def test_answer():
+    assert model.status == solution.SAT
+
+
+def test_polynomial():
+    assert 't_j_sqrt_0' in formula
+    assert '0.5' not in formula
+    # Both translations of the junction share one auxiliary
+    assert [name for name in model.names if name == 't_j_sqrt_0'] == ['t_j_sqrt_0']
+
+
+def test_benchmark():
+    # The square root's two constraints are added each time the junction is
+    # translated, once from each input, on the same auxiliary
+    assert results['normalized']['expressions'] == results['original']['expressions'] + 4
+    assert results['original']['solved'] and results['normalized']['solved']
+
+
+def test_positive():
+    # The channels from the inputs are translated with their bounds, the
+    # junction discards those of its own and of the channel leaving it
+    assert translate.positive(sch.dg, ('continuous', 't_j'), 'height')
+    assert translate.positive(sch.dg, ('continuous', 't_j'), 'flow_rate')
+    assert not translate.positive(sch.dg, ('t_j', 'out'), 'width')
+    assert not translate.positive(sch.dg, 't_j', 'pressure')
+
+
+def test_divide():
+    radicals = normalize.Radicals(sch.dg, 't_j')
+    quotient = radicals.divide(Variable('n'), Variable('d'), nonzero=True)
+    assert str(quotient) == 't_j_ratio_0'
+    assert [str(expr) for expr in radicals.exprs] == [str(quotient * Variable('d') ==
+                                                          Variable('n'))]
+    # Without proof the denominator isn't 0 the division is kept
+    assert not isinstance(radicals.divide(Variable('n'), Variable('d'), nonzero=False),
+                          Variable)
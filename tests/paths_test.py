@@ -0,0 +1,56 @@
+import gc
+import weakref
+import src.pymanifold as pymf
+from src import paths
+
+# Two separation lanes sharing a cathode, the second lane is longer
+sch = pymf.Schematic(dim=[0, 0, 10, 10])
+sch.elec_port('cathode', 'input', voltage=0)
+sch.elec_port('anode 1', 'output', voltage=10)
+sch.elec_port('anode 2', 'output', voltage=10)
+sch.node('split')
+sch.node('bend')
+sch.channel(min_length=1, min_width=0.1, port_from='cathode', port_to='split')
+sch.channel(min_length=1, min_width=0.1, port_from='split', port_to='anode 1')
+sch.channel(min_length=1, min_width=0.1, port_from='split', port_to='bend')
+sch.channel(min_length=1, min_width=0.1, port_from='bend', port_to='anode 2')
+electrode_paths = sch.electrode_paths()
+first_paths = sch.paths._cache
+channels = sch.paths.channels('anode 1', 'cathode')
+
+# Adding a shortcut changes the topology so the cached paths are dropped
+sch.channel(min_length=5, min_width=0.1, port_from='cathode', port_to='anode 2')
+shortest = sch.paths.path('cathode', 'anode 2')
+by_length = sch.paths.path('cathode', 'anode 2', by_length=True)
+# Editing a length or swapping a channel keeps the size of the graph, a
+# length edited directly has to drop the cache by hand
+sch.dg.edges['split', 'bend']['min_length'] = 10
+sch.paths.invalidate()
+longer = sch.paths.path('cathode', 'anode 2', by_length=True)
+sch.dg.remove_edge('split', 'anode 1')
+sch.channel(min_length=1, min_width=0.1, port_from='bend', port_to='anode 1')
+swapped = sch.paths.path('cathode', 'anode 1', by_length=True)
+
+
+def test_paths():
+    assert electrode_paths[('cathode', 'anode 1')] == ['cathode', 'split', 'anode 1']
+    assert electrode_paths[('anode 2', 'cathode')] == ['anode 2', 'bend', 'split', 'cathode']
+    assert electrode_paths[('anode 1', 'anode 2')] == ['anode 1', 'split', 'bend', 'anode 2']
+    assert channels == [('split', 'anode 1'), ('cathode', 'split')]
+
+
+def test_invalidate():
+    assert sch.paths._cache is not first_paths
+    assert shortest == ['cathode', 'anode 2']
+    assert by_length == ['cathode', 'split', 'bend', 'anode 2']
+    assert longer == ['cathode', 'anode 2']
+    assert swapped == ['cathode', 'anode 2', 'bend', 'anode 1']
+
+
+def test_collected():
+    dg = pymf.Schematic(dim=[0, 0, 10, 10]).dg
+    assert dg in paths._services
+    graph = weakref.ref(dg)
+    del dg
+    gc.collect()
+    assert graph() is None
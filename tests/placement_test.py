@@ -0,0 +1,35 @@
+import math
+import src.pymanifold as pymf
+from src import solution
+
+sch = pymf.Schematic(dim=[0, 0, 0.01, 0.01])
+sch.port('oil', 'input', min_pressure=2000, fluid_name='mineraloil', x=0.001, y=0.005)
+sch.port('water', 'input', min_pressure=2000, fluid_name='water')
+sch.port('out', 'output', min_pressure=500)
+sch.node('T', kind='tjunc')
+sch.channel('oil', 'T', min_length=0.003, phase='continuous')
+sch.channel('water', 'T', phase='dispersed')
+sch.channel('T', 'out', phase='output')
+placed = sch.place(seed=0)
+model = sch.solve()
+
+
+def distance(a, b):
+    return math.hypot(sch.dg.nodes[a]['min_x'] - sch.dg.nodes[b]['min_x'],
+                      sch.dg.nodes[a]['min_y'] - sch.dg.nodes[b]['min_y'])
+
+
+def test_placed():
+    # Only nodes without a position are moved
+    assert set(placed) == {'water', 'out', 'T'}
+    assert sch.dg.nodes['oil']['min_x'] == 0.001
+    for x, y in placed.values():
+        assert 0 < x < 0.01 and 0 < y < 0.01
+    assert abs(distance('oil', 'T') - 0.003) < 1e-8
+    # Continuous and output channels are in a straight line
+    assert abs(distance('oil', 'T') + distance('T', 'out') - distance('oil', 'out')) < 1e-8
+
+
+def test_fixed_in_formula():
+    assert model.status == solution.SAT
+    assert any(str(expr) == str(sch.dg.nodes['T']['x'] == placed['T'][0]) for expr in sch.exprs)
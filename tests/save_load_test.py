@@ -0,0 +1,41 @@
+import os
+import tempfile
+import numpy as np
+import src.pymanifold as pymf
+from src import solution
+
+sch = pymf.Schematic(dim=[0, 0, 10, 10])
+
+sch.port('in', 'input', x=3, y=3, fluid_name='water')
+sch.port('out', 'output', x=1, y=1)
+sch.node('middle node', x=3, y=1)
+sch.channel('in', 'middle node', min_length=2, min_width=0.9)
+sch.channel('middle node', 'out', min_width=0.9)
+sch.solve()
+
+path = os.path.join(tempfile.mkdtemp(), 'node_test.npz')
+sch.save(path)
+loaded = pymf.Schematic.load(path)
+# The model stored with the schematic, before solving replaces it
+stored = loaded.model
+model = loaded.solve()
+print(model)
+
+
+def test_attributes():
+    assert list(loaded.dg.nodes) == list(sch.dg.nodes)
+    assert list(loaded.dg.edges) == list(sch.dg.edges)
+    assert loaded.dg.nodes['in']['min_viscosity'] == sch.dg.nodes['in']['min_viscosity']
+    assert loaded.dg.edges['in', 'middle node']['min_length'] == 2
+
+
+def test_stored_model():
+    assert stored.status == solution.SAT
+    assert stored.names == sch.model.names
+    assert np.array_equal(stored.lb, sch.model.lb)
+    assert np.array_equal(stored.ub, sch.model.ub)
+    assert stored.bounds('in', 'pressure') == sch.model.bounds('in', 'pressure')
+
+
+def test_answer():
+    assert model.status == solution.SAT
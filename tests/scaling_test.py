@@ -0,0 +1,30 @@
+import src.pymanifold as pymf
+from src import algorithms, scaling, solution
+
+# Micrometre channels carrying mineral oil
+sch = pymf.Schematic(dim=[0, 0, 0.01, 0.01])
+sch.port('in', 'input', min_pressure=2000, fluid_name='mineraloil')
+sch.port('out', 'output', min_pressure=500)
+sch.channel('in', 'out', min_length=0.002, min_width=0.0001, min_height=0.00002)
+scales = scaling.characteristic_scales(sch.dg, sch.dim)
+model = sch.solve(scale=True)
+formula = scaling.scale_formula(sch.dg, sch.dim, sch.exprs)[0]
+
+
+def test_scales():
+    assert scales['length'] == 1e-4
+    assert scales['pressure'] == 1e3
+    assert scales['viscosity'] == 1e-4
+    assert scales['flow'] == 1e-5
+    assert scales['resistance'] == 1e8
+
+
+def test_answer():
+    assert model.status == solution.SAT
+    # The model is given for the original Variables
+    length = algorithms.retrieve(sch.dg, ('in', 'out'), 'length')
+    assert length in model
+    assert str(length) in str(formula)
+    # and in SI units, dReal's precision applies to the scaled value
+    assert abs(model.value(('in', 'out'), 'length') - 0.002) <= scaling.DELTA * scales['length']
+    assert abs(model.value('in', 'pressure') - 2000) <= scaling.DELTA * scales['pressure']
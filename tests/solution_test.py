@@ -0,0 +1,41 @@
+import pickle
+import numpy as np
+from dreal import Interval
+import src.pymanifold as pymf
+from src import solution
+
+sch = pymf.Schematic(dim=[0, 0, 10, 10])
+sch.port('in', 'input', min_pressure=2000)
+sch.port('out', 'output', min_pressure=500)
+sch.node('middle node')
+sch.channel('in', 'middle node')
+sch.channel('middle node', 'out')
+box = {sch.dg.edges[('in', 'middle node')]['width']: Interval(1e-4, 3e-4),
+       sch.dg.edges[('middle node', 'out')]['width']: Interval(2e-4, 2e-4),
+       sch.dg.nodes['middle node']['pressure']: Interval(1000, 1200)}
+sol = solution.Solution.from_box(box, sch.dg)
+shipped = pickle.loads(pickle.dumps(sol))
+
+
+def test_lookup():
+    assert sol.status == solution.SAT and sol
+    assert np.isclose(sol.channel('in', 'middle node').width, 2e-4)
+    assert sol.channel('in', 'middle node').interval('width') == (1e-4, 3e-4)
+    assert sol.node('middle node').pressure == 1100
+    assert 'middle node_pressure' in sol
+
+
+def test_vectorized():
+    assert np.allclose(sol.midpoints('width'), [2e-4, 2e-4])
+    assert np.allclose(sol.widths('width'), [2e-4, 0], atol=1e-12)
+    assert np.isnan(sol.midpoints('length')).all()
+
+
+def test_pickle():
+    assert shipped.channel('middle node', 'out').width == 2e-4
+    assert shipped.names == sol.names
+
+
+def test_unsat():
+    unsat = solution.Solution(solution.UNSAT)
+    assert unsat.status == solution.UNSAT and not unsat
@@ -0,0 +1,47 @@
+import numpy as np
+import src.pymanifold as pymf
+from src import solution
+
+sch = pymf.Schematic([0, 0, 10, 10])
+sch.port('in', 'input', min_pressure=1)
+sch.port('out', 'output')
+sch.node('middle node')
+sch.channel('in', 'middle node', min_width=0.001, min_height=0.0001)
+sch.channel('middle node', 'out', min_width=0.001)
+pressures = np.linspace(1, 500, 500)
+result = sch.sweep('in', 'pressure', pressures)
+# Translated once with a stand in for the swept pressure
+shared = [str(expr) for expr in sch.exprs]
+heights = sch.sweep(('middle node', 'out'), 'height', [0.0005, 0.002], warm_start=False)
+
+# Same circuit solved in scaled units, the solutions are converted back to SI
+scaled_sch = pymf.Schematic([0, 0, 10, 10])
+scaled_sch.port('in', 'input', min_pressure=1)
+scaled_sch.port('out', 'output')
+scaled_sch.node('middle node')
+scaled_sch.channel('in', 'middle node', min_width=0.001, min_height=0.0001)
+scaled_sch.channel('middle node', 'out', min_width=0.001)
+scaled = scaled_sch.sweep('in', 'pressure', [100, 200], scale=True)
+
+
+def test_sweep():
+    assert result['status'] == [solution.SAT] * 500
+    # Every point after the first started from the previous solution
+    assert result['warm_starts'] == 499
+    assert 'in_pressure' in result['solutions'][0]
+    assert 'in_pressure_sweep' not in result['solutions'][0]
+    # The user's value is left as it was
+    assert sch.dg.nodes['in']['min_pressure'] == 1
+    assert any('in_pressure_sweep' in expr for expr in shared)
+
+
+def test_design_rules():
+    assert heights['status'] == [solution.SAT, solution.UNSAT]
+    assert heights['solutions'][1].violations[0].rule == 'height_below_width'
+
+
+def test_scaled():
+    assert scaled['status'] == [solution.SAT] * 2
+    assert scaled_sch.dg.graph['scale']
+    for value, sol in zip([100, 200], scaled['solutions']):
+        assert abs(sol.value('in', 'pressure') - value) < 1
@@ -1,4 +1,5 @@
 import src.pymanifold as pymf
+from src import solution
 
 sch = pymf.Schematic([0, 0, 10, 10])
 #       D
@@ -32,4 +33,4 @@ print(model)
 
 
 def test_answer():
-    assert model != "No solution found"
+    assert model.status == solution.SAT
@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+import src.pymanifold as pymf
+from src import telemetry
+
+sink = telemetry.JsonlSink(os.path.join(tempfile.mkdtemp(), 'telemetry.jsonl'),
+                           max_bytes=800, backups=2)
+telemetry.set_sink(sink)
+for pressure in range(1, 6):
+    sch = pymf.Schematic([0, 0, 10, 10])
+    sch.port('in', 'input', min_pressure=pressure)
+    sch.port('out', 'output')
+    sch.channel('in', 'out')
+    sch.solve()
+# Failing to record an event never stops the solve
+telemetry.set_sink(lambda event: json.dumps(object()))
+unrecorded = sch.solve()
+telemetry.set_sink(None)
+events = telemetry.read_events(sink)
+summary = telemetry.summarize(sink, kind='solve', by=None)
+
+
+def test_events():
+    solves = [event for event in events if event['event'] == 'solve']
+    assert solves
+    for event in solves:
+        assert event['nodes'] == 2 and event['channels'] == 1
+        assert event['status'] == 'sat'
+        assert event['variables'] > 0 and event['expressions'] > 0
+        assert event['solve_time'] >= 0
+    # Each design has its own fingerprint
+    assert len({event['fingerprint'] for event in solves}) == len(solves)
+    assert unrecorded.status == 'sat'
+
+
+def test_rotation():
+    # Older events were rotated out, but never more than backups files are kept
+    assert len(sink.paths()) == 3
+    assert len(events) < 10
+    for path in sink.paths():
+        assert os.path.getsize(path) <= 800
+
+
+def test_summary():
+    stats = summary[None]['solve_time']
+    assert stats['count'] == len([event for event in events if event['event'] == 'solve'])
+    assert stats['p50'] <= stats['p90'] <= stats['p99']
@@ -0,0 +1,21 @@
+import src.pymanifold as pymf
+
+sch = pymf.Schematic(dim=[0, 0, 10, 10])
+sch.port('in', 'input')
+sch.port('dead end', 'input')
+sch.node('middle node')
+sch.port('out', 'output')
+sch.channel(min_length=2, min_width=0.9, port_from='in', port_to='middle node')
+sch.channel(min_length=2, min_width=0.9, port_from='middle node', port_to='out')
+sch.node('loose node')
+sch.channel(min_length=2, min_width=0.9, port_from='dead end', port_to='loose node')
+try:
+    sch.validate()
+    errors = []
+except ValueError as e:
+    errors = str(e).split('\n')
+
+
+def test_errors():
+    assert errors == ['Schematic input dead end has no output',
+                      'No output can be reached from node loose node']
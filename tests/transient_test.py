@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+import src.pymanifold as pymf
+
+# Two identical channels in series with a compliant node between them
+sch = pymf.Schematic(dim=[0, 0, 10, 10])
+sch.port('in', 'input', min_pressure=1000, fluid_name='water')
+sch.port('out', 'output', min_pressure=100)
+sch.node('middle node')
+sch.channel('in', 'middle node', min_length=0.01, min_width=0.001, min_height=0.0001)
+sch.channel('middle node', 'out', min_length=0.01, min_width=0.001, min_height=0.0001)
+
+step = sch.simulate(0.01, sources={'in': ('pressure', 1000)}, compliance={'middle node': 1e-15},
+                    initial={'middle node': 0})
+resistance = step['resistance'][('in', 'middle node')]
+tau = 1e-15 * resistance / 2
+
+# Without compliance the network follows a pressure ramp instantly
+ramp = sch.simulate(1, sources={'in': ('pressure', lambda t: 1000 * t)}, n_points=11)
+
+
+def test_step():
+    # Charges from 0 towards the steady state halfway between the ports
+    expected = 550 * (1 - np.exp(-step['t'] / tau))
+    assert np.allclose(step['pressure']['middle node'], expected, rtol=1e-3, atol=1e-2)
+
+
+def test_ramp():
+    assert np.allclose(ramp['pressure']['middle node'], (1000 * ramp['t'] + 100) / 2)
+    flow = ramp['flow_rate'][('in', 'middle node')]
+    assert np.allclose(flow, ramp['flow_rate'][('middle node', 'out')])
+
+
+def test_initial_without_compliance():
+    with pytest.raises(ValueError):
+        sch.simulate(0.01, initial={'middle node': 0})
@@ -0,0 +1,72 @@
+import src.pymanifold as pymf
+from src import paths, solution
+
+sch = pymf.Schematic([0, 0, 10, 10])
+sch.port('in', 'input', min_pressure=1)
+sch.port('out', 'output')
+sch.node('middle node')
+sch.channel('in', 'middle node', min_width=0.001, min_height=0.0001)
+sch.channel('middle node', 'out', min_width=0.001)
+model = sch.solve()
+
+wider = sch.fork()
+wider.dg.edges['in', 'middle node']['min_width'] = 0.002
+branched = wider.fork()
+branched.port('extra', 'input', min_pressure=2)
+branched.channel('extra', 'middle node', min_width=0.001)
+branched_model = branched.solve()
+# Changes to the original after forking aren't seen by its variants
+sch.dg.nodes['in']['min_pressure'] = 5
+later = sch.fork()
+
+pressures = [sch.fork() for _ in range(1000)]
+for idx, variant in enumerate(pressures):
+    variant.dg.nodes['in']['min_pressure'] = idx + 1
+
+# Two routes from a to d, the one through b is shorter until a fork
+# lengthens it
+diamond = pymf.Schematic([0, 0, 10, 10])
+diamond.port('a', 'input', min_pressure=1)
+diamond.node('b')
+diamond.node('c')
+diamond.port('d', 'output')
+for port_from, port_to, length in (('a', 'b', 1), ('b', 'd', 1), ('a', 'c', 2), ('c', 'd', 2)):
+    diamond.channel(port_from, port_to, min_length=length)
+shortest = paths.service(diamond.dg).path('a', 'd', by_length=True)
+longer = diamond.fork()
+longer.dg.edges['a', 'b']['min_length'] = 100
+longer.paths.invalidate()
+
+
+def test_independent():
+    assert sch.dg.edges['in', 'middle node']['min_width'] == 0.001
+    assert wider.dg.edges['in', 'middle node']['min_width'] == 0.002
+    # Channel attributes are the same whichever end they're looked up from
+    assert wider.dg.pred['middle node']['in']['min_width'] == 0.002
+    assert branched.dg.edges['in', 'middle node']['min_width'] == 0.002
+    assert wider.dg.nodes['in']['min_pressure'] == 1
+    assert later.dg.nodes['in']['min_pressure'] == 5
+    assert [variant.dg.nodes['in']['min_pressure'] for variant in pressures[:3]] == [1, 2, 3]
+
+
+def test_topology():
+    assert list(sch.dg.nodes) == ['in', 'out', 'middle node']
+    assert list(branched.dg.nodes) == ['in', 'out', 'middle node', 'extra']
+    assert sch.dg.number_of_edges() == 2
+    assert branched.dg.number_of_edges() == 3
+    assert list(branched.dg.pred['middle node']) == ['in', 'extra']
+
+
+def test_shared():
+    # The solver Variables are shared rather than copied
+    assert wider.dg.nodes['in']['pressure'] is sch.dg.nodes['in']['pressure']
+    assert wider.model is model
+    assert branched_model.status == solution.SAT
+    assert 'extra_pressure' in branched_model
+
+
+def test_fork_paths():
+    assert shortest == ['a', 'b', 'd']
+    assert paths.service(longer.dg).path('a', 'd', by_length=True) == ['a', 'c', 'd']
+    assert paths.service(diamond.dg).path('a', 'd', by_length=True) == ['a', 'b', 'd']
+
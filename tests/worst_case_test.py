@@ -0,0 +1,91 @@
+import itertools
+import numpy as np
+from dreal import Interval
+import src.pymanifold as pymf
+from src import numeric, solution, tolerance
+
+# Same circuit as monte_carlo_test
+sch = pymf.Schematic(dim=[0, 0, 10, 10])
+sch.port('in', 'input', x=3, y=3, min_pressure=2, fluid_name='water')
+sch.port('out', 'output', x=1, y=1, min_pressure=1)
+sch.node('middle node', x=3, y=1)
+sch.channel('in', 'middle node', min_length=2, min_width=0.9, min_height=0.1, min_depth=0.2)
+sch.channel('middle node', 'out', min_length=2, min_width=0.9, min_height=0.1, min_depth=0.2)
+model = {'in_middle node_viscosity': Interval(0.001, 0.001),
+         'middle node_out_viscosity': Interval(0.001, 0.001)}
+
+tolerances = {'width': 0.02, 'viscosity': 0.1, 'pressure': 0.05}
+limits = {'middle node_pressure': (1, 2)}
+result = sch.worst_case(tolerances, limits, model=model, processes=1)
+flows = sch.worst_case(tolerances, model=model, processes=2)
+# The same corners have solutions, only the limit can't be met
+tight = sch.worst_case(tolerances, {'middle node_pressure': (None, 1.2)}, model=model,
+                       processes=1)
+# Longer and shorter channels can't stay between the placed nodes
+lengths = sch.worst_case({'length': 0.05}, model=model, processes=1)
+
+# Every combination of the parameters at their ends
+network = tolerance._Network(sch, model)
+params = tolerance._parameters(network, tolerances)
+signs = np.array(list(itertools.product([-1, 1], repeat=len(params))), dtype=float)
+exhaustive, _ = tolerance._evaluate_corners(network, params, signs)
+
+
+def test_dominating_corners():
+    assert result['parameters'] == ['in_middle node_width', 'middle node_out_width',
+                                    'viscosity', 'in_pressure']
+    assert result['solver_calls'] == 2
+    assert result['exhaustive_corners'] == 16
+    lower, upper = result['constraints']
+    # The viscosity scales every resistance together so it doesn't matter
+    assert result['corners'][upper['corner']]['parameters'] == {
+        'in_middle node_width': 'high', 'middle node_out_width': 'low', 'in_pressure': 'high'}
+    pressure = exhaustive['middle node_pressure']
+    assert np.isclose(lower['value'], pressure.min())
+    assert np.isclose(upper['value'], pressure.max())
+    assert np.isclose(upper['margin'], (2 - pressure.max()) / 1.5)
+
+
+def test_report():
+    assert result['certified']
+    assert all(corner['status'] == solution.SAT and corner['valid']
+               for corner in result['corners'])
+    assert result['limiting']['margin'] == min(report['margin']
+                                               for report in result['constraints'])
+    # By default each channel's flow rate must stay positive
+    assert [report['output'] for report in flows['constraints']] == \
+        ['in_middle node_flow_rate', 'middle node_out_flow_rate']
+    assert flows['certified']
+
+
+def test_limit():
+    assert not tight['certified']
+    assert tight['limiting']['output'] == 'middle node_pressure'
+    assert tight['limiting']['bound'] == 'upper'
+    assert tight['limiting']['status'] == solution.UNSAT
+    assert tight['limiting']['margin'] < 0
+    assert all(corner['valid'] for corner in tight['corners'])
+
+
+def test_lengths():
+    assert lengths['certified']
+    values = numeric.box_values(model)
+    network = tolerance._Network(sch, model)
+    params = tolerance._parameters(network, {'length': 0.05})
+    plain = sch.to_plain()
+    moved = tolerance._corner_spec(sch, plain, values, network, params,
+                                   np.ones(len(params)), {})
+    assert all(not attrs['min_x'] and not attrs['min_y'] for _, attrs in moved['nodes'])
+    assert moved['graph']['scale']
+    # At the nominal lengths the nodes stay where they were placed
+    nominal = tolerance._corner_spec(sch, plain, values, network, params,
+                                     np.zeros(len(params)), {})
+    assert dict(nominal['nodes'])['in']['min_x'] == 3
+
+
+def test_unknown_tolerance():
+    try:
+        sch.worst_case({'depth': 0.1}, model=model)
+        assert False
+    except ValueError:
+        pass